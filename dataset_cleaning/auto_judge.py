@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+"""
+Suggest judge scores for every episode from its action and observation.state columns.
+
+Only meta/ and data/ are downloaded; no video is decoded. For each episode the
+following signals are computed with numpy over the whole trajectory at once:
+
+- length: number of frames, flagged when it is a robust (median/MAD) outlier within its repo
+- idle_fraction: fraction of frames where no joint moves more than --idle_threshold
+- velocity_spikes: frames where an action jumps more than --spike_threshold in one step
+- jerk_rms: RMS of the third difference of the actions, flagged when it is a robust
+  outlier above the other episodes of its repo
+- gripper_events: number of gripper open/close transitions
+- tracking_error: mean |action[t] - state[t+1]|, how well the follower tracked the leader
+
+A judge of 0 (unusable), 1 (maybe useful) or 2 (good) is suggested together with
+the reasons, in the same judge.jsonl format used by data_cleaning.py.
+
+Usage:
+    python auto_judge.py --repo_ids "DanqingZ/so100_test_pick_green_4,DanqingZ/so100_test_pick_green_5" --output_file judge.jsonl
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from tqdm import tqdm
+
+from episode_io import episode_data_path, load_info, read_episode_columns
+from generate_judge import load_all_meta
+
+# Thresholds are in the units of the dataset (degrees for so100 recordings)
+DEFAULT_THRESHOLDS = {
+    "idle_threshold": 0.5,
+    "spike_threshold": 20.0,
+    "tracking_error_soft": 5.0,
+    "tracking_error_hard": 15.0,
+    "idle_fraction_soft": 0.5,
+    "idle_fraction_hard": 0.8,
+    "length_outlier_z": 3.5,
+    "jerk_outlier_z": 3.5,
+}
+
+
+def gripper_dim(info: dict) -> int:
+    names = info["features"]["observation.state"].get("names") or []
+    if isinstance(names, dict):
+        names = next(iter(names.values()))
+    for i, name in enumerate(names):
+        if "gripper" in name.lower():
+            return i
+    return info["features"]["observation.state"]["shape"][0] - 1
+
+
+def episode_signals(dataset_root, info: dict, ep_idx: int, thresholds: dict) -> dict:
+    """Compute quality signals of one episode, vectorized over all frames"""
+    columns = read_episode_columns(episode_data_path(dataset_root, info, ep_idx), ["action", "observation.state"])
+    action = columns["action"].astype(np.float64)
+    state = columns["observation.state"].astype(np.float64)
+    length = len(action)
+    if length < 4:
+        return {"length": length}
+
+    state_step = np.abs(np.diff(state, axis=0)).max(axis=1)
+    action_step = np.abs(np.diff(action, axis=0))
+    jerk = np.diff(action, n=3, axis=0)
+
+    gripper = state[:, gripper_dim(info)]
+    midpoint = (gripper.min() + gripper.max()) / 2
+    gripper_range = gripper.max() - gripper.min()
+    closed = gripper < midpoint
+    gripper_events = int(np.count_nonzero(closed[1:] != closed[:-1])) if gripper_range > thresholds["idle_threshold"] else 0
+
+    return {
+        "length": length,
+        "idle_fraction": float(np.mean(state_step < thresholds["idle_threshold"])),
+        "velocity_spikes": int(np.count_nonzero(action_step.max(axis=1) > thresholds["spike_threshold"])),
+        "jerk_rms": float(np.sqrt(np.mean(jerk**2))),
+        "gripper_events": gripper_events,
+        "tracking_error": float(np.mean(np.abs(action[:-1] - state[1:]))),
+    }
+
+
+def suggest_judge(signals: dict, length_z: float, jerk_z: float, thresholds: dict) -> tuple[int, list[str]]:
+    """Turn episode signals into a 0/1/2 judge and the reasons behind it"""
+    if signals["length"] < 4:
+        return 0, ["episode too short"]
+
+    hard, soft = [], []
+    if signals["idle_fraction"] > thresholds["idle_fraction_hard"]:
+        hard.append(f"robot idle {signals['idle_fraction']:.0%} of the episode")
+    elif signals["idle_fraction"] > thresholds["idle_fraction_soft"]:
+        soft.append(f"robot idle {signals['idle_fraction']:.0%} of the episode")
+    if signals["gripper_events"] == 0:
+        hard.append("gripper never opened or closed")
+    if signals["tracking_error"] > thresholds["tracking_error_hard"]:
+        hard.append(f"follower did not track actions (error {signals['tracking_error']:.1f})")
+    elif signals["tracking_error"] > thresholds["tracking_error_soft"]:
+        soft.append(f"high action tracking error ({signals['tracking_error']:.1f})")
+    if signals["velocity_spikes"] > 0:
+        soft.append(f"{signals['velocity_spikes']} action velocity spikes")
+    if jerk_z > thresholds["jerk_outlier_z"]:
+        soft.append(f"jerky actions (jerk RMS {signals['jerk_rms']:.1f}, z={jerk_z:.1f})")
+    if abs(length_z) > thresholds["length_outlier_z"]:
+        soft.append(f"episode length {signals['length']} is an outlier (z={length_z:.1f})")
+
+    if hard:
+        return 0, hard + soft
+    if soft:
+        return 1, soft
+    return 2, []
+
+
+def robust_z_scores(values: np.ndarray) -> np.ndarray:
+    median = np.median(values)
+    mad = np.median(np.abs(values - median)) * 1.4826
+    if mad == 0:
+        return np.zeros_like(values, dtype=np.float64)
+    return (values - median) / mad
+
+
+def _signals_job(args):
+    dataset_root, info, ep_idx, thresholds = args
+    return episode_signals(dataset_root, info, ep_idx, thresholds)
+
+
+def score_repo(repo_id: str, ds_meta, thresholds: dict, num_workers: int) -> list[dict]:
+    """Download the parquet data of a repo and score all of its episodes in parallel"""
+    ds_meta.pull_from_repo(allow_patterns="data/")
+    info = load_info(ds_meta.root)
+    jobs = [(ds_meta.root, info, ep_idx, thresholds) for ep_idx in range(ds_meta.total_episodes)]
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        all_signals = list(tqdm(executor.map(_signals_job, jobs, chunksize=8), total=len(jobs), desc=repo_id))
+
+    length_z = robust_z_scores(np.array([signals["length"] for signals in all_signals]))
+    # Episodes too short for a third difference have no jerk_rms and get z = 0
+    jerk_z = np.zeros(len(all_signals))
+    has_jerk = np.array(["jerk_rms" in signals for signals in all_signals], dtype=bool)
+    if has_jerk.any():
+        jerk_z[has_jerk] = robust_z_scores(np.array([signals["jerk_rms"] for signals in all_signals if "jerk_rms" in signals]))
+    results = []
+    for ep_idx, (signals, z, jz) in enumerate(zip(all_signals, length_z, jerk_z)):
+        judge, reasons = suggest_judge(signals, float(z), float(jz), thresholds)
+        results.append({
+            "repo_id": repo_id,
+            "episode_id": ep_idx,
+            "judge": judge,
+            "reasons": reasons,
+            "signals": signals,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggest judge scores for LeRobot episodes without decoding video")
+    parser.add_argument(
+        "--repo_ids",
+        type=str,
+        required=True,
+        help="Comma-separated list of repository IDs (e.g., 'repo1,repo2,repo3')"
+    )
+    parser.add_argument(
+        "--output_file",
+        type=str,
+        default="judge.jsonl",
+        help="Output JSONL file name (default: judge.jsonl)"
+    )
+    parser.add_argument("--overwrite", action="store_true", help="Overwrite the output file if it already exists")
+    parser.add_argument("--num_workers", type=int, default=8, help="Number of worker processes (default: 8)")
+    for name, default in DEFAULT_THRESHOLDS.items():
+        parser.add_argument(f"--{name}", type=float, default=default, help=f"(default: {default})")
+    args = parser.parse_args()
+
+    repo_ids = [repo_id.strip() for repo_id in args.repo_ids.split(',') if repo_id.strip()]
+    if not repo_ids:
+        print("Error: No valid repository IDs provided")
+        return
+    if os.path.exists(args.output_file) and not args.overwrite:
+        print(f"Judge file {args.output_file} already exists, use --overwrite to replace it")
+        return
+
+    thresholds = {name: getattr(args, name) for name in DEFAULT_THRESHOLDS}
+    results = []
+    for repo_id, ds_meta, error in load_all_meta(repo_ids, num_workers=args.num_workers):
+        if error is not None:
+            print(f"✗ Error processing {repo_id}: {error}")
+            continue
+        results.extend(score_repo(repo_id, ds_meta, thresholds, args.num_workers))
+
+    with open(args.output_file, 'w') as f:
+        for result in results:
+            f.write(json.dumps(result) + '\n')
+
+    counts = {judge: sum(r["judge"] == judge for r in results) for judge in [0, 1, 2]}
+    print(f"\nSuggested judge distribution over {len(results)} episodes:")
+    for judge, count in counts.items():
+        print(f"Judge = {judge}: {count}")
+    print(f"Generated {args.output_file}, review the episodes with judge 0 and 1 before running data_cleaning.py")
+
+
+if __name__ == "__main__":
+    main()
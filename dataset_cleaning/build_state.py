@@ -0,0 +1,222 @@
+"""
+Content-addressed job state for incremental builds of a filtered dataset.
+
+Every selected source episode is staged once under <dataset_root>.build/episodes/<key>/
+(its source parquet file plus one mp4 per camera), with the per-episode transforms
+applied to the staged copy ({"trim_idle": {...}} and {"transcode": {...}}, see
+trim_idle.py and transcode.py). The key hashes the source episode (repo id,
+episode index, parquet and video content), the transforms and their parameters,
+and BUILD_CONFIG. The judge score only decides which episodes are selected, so it
+is not part of the key. <dataset_root>.build/state.json records the staged
+episodes, their stats and what every output episode was last assembled from, so a
+rerun of generate_dataset only stages added or changed episodes, only rewrites
+output episodes whose source or indices moved, and drops episodes no longer
+selected.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from episode_io import (
+    episode_data_path,
+    episode_video_path,
+    file_sha256,
+    load_json,
+    video_keys,
+    write_json,
+)
+from transcode import transcode_video
+from trim_idle import trim_staged_episode
+
+# Bump the version whenever the way an output episode is derived from its source changes
+BUILD_CONFIG = {"version": 2}
+BUILD_STATE_FILE = "state.json"
+STAGED_DIR = "episodes"
+
+
+def build_dir(dataset_root: Path) -> Path:
+    """Directory of the staged episodes and job state, next to (not inside) the dataset so it is never pushed"""
+    dataset_root = Path(dataset_root)
+    return dataset_root.with_name(dataset_root.name + ".build")
+
+
+def load_build_state(build_root: Path) -> dict:
+    path = Path(build_root) / BUILD_STATE_FILE
+    state = load_json(path) if path.exists() else {}
+    if state.get("config") != BUILD_CONFIG:
+        state = {"config": BUILD_CONFIG, "source_hashes": {}, "episodes": {}, "output": []}
+    return state
+
+
+def save_build_state(build_root: Path, state: dict):
+    tmp_path = Path(build_root) / (BUILD_STATE_FILE + ".tmp")
+    write_json(state, tmp_path)
+    os.replace(tmp_path, Path(build_root) / BUILD_STATE_FILE)
+
+
+def cached_sha256(state: dict, path: Path) -> str:
+    """file_sha256 memoized on (size, mtime) so unchanged source files are not re-read on every run"""
+    stat = path.stat()
+    cached = state["source_hashes"].get(str(path))
+    if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return cached[2]
+    digest = file_sha256(path)
+    state["source_hashes"][str(path)] = [stat.st_size, stat.st_mtime_ns, digest]
+    return digest
+
+
+def episode_key(repo_id: str, episode_id: int, source_sha256: str, source_videos: dict[str, str], transforms: dict) -> str:
+    payload = {
+        "repo_id": repo_id,
+        "episode_id": episode_id,
+        "source_parquet_sha256": source_sha256,
+        "source_video_sha256": source_videos,
+        "transforms": transforms,
+        "config": BUILD_CONFIG,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def fetch_source_files(ds_meta, episode_ids: list[int]):
+    """Download the parquet and mp4 files of the given episodes that are not cached locally yet"""
+    info = ds_meta.info
+    paths = [episode_data_path(ds_meta.root, info, ep_id) for ep_id in episode_ids]
+    paths += [episode_video_path(ds_meta.root, info, ep_id, key) for ep_id in episode_ids for key in video_keys(info)]
+    missing = [str(path.relative_to(ds_meta.root)) for path in paths if not path.exists()]
+    if missing:
+        ds_meta.pull_from_repo(allow_patterns=missing)
+
+
+def stage_episode(build_root: Path, key: str, repo_id: str, source_root: Path, source_info: dict, episode_id: int,
+                  tasks: dict[int, str], source_sha256: str, source_videos: dict[str, str], transforms: dict) -> dict:
+    """Copy one source episode into the staging area and apply the transforms to it, return its state entry"""
+    staged_dir = Path(build_root) / STAGED_DIR / key
+    tmp_dir = staged_dir.with_name(key + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    shutil.copyfile(episode_data_path(source_root, source_info, episode_id), tmp_dir / "data.parquet")
+    for vid_key in video_keys(source_info):
+        shutil.copyfile(episode_video_path(source_root, source_info, episode_id, vid_key), tmp_dir / f"{vid_key}.mp4")
+    num_rows = pq.ParquetFile(tmp_dir / "data.parquet").metadata.num_rows
+
+    entry = {}
+    videos = dict(source_videos)
+    if "trim_idle" in transforms:
+        _, start, end = trim_staged_episode(tmp_dir, source_info, **transforms["trim_idle"])
+        if (start, end) != (0, num_rows):
+            entry["trim"] = {"start": start, "end": end}
+            videos = {vid_key: file_sha256(tmp_dir / f"{vid_key}.mp4") for vid_key in video_keys(source_info)}
+    if "transcode" in transforms:
+        # Episodes are staged in parallel, so let each ffmpeg pick its own thread count
+        videos = {
+            vid_key: transcode_video(tmp_dir / f"{vid_key}.mp4", transforms["transcode"], threads=0)
+            for vid_key in video_keys(source_info)
+        }
+        entry["transcoded"] = transforms["transcode"]
+
+    task_index = pq.read_table(tmp_dir / "data.parquet", columns=["task_index"]).column("task_index")
+    shutil.rmtree(staged_dir, ignore_errors=True)
+    os.replace(tmp_dir, staged_dir)
+    return {
+        "repo_id": repo_id,
+        "source_root": str(source_root),
+        "episode_id": episode_id,
+        "length": len(task_index),
+        "task": tasks[task_index[0].as_py()],
+        "videos": videos,
+        "source": {"num_rows": num_rows, "parquet_sha256": source_sha256, "videos": source_videos},
+        **entry,
+        "stats": None,
+    }
+
+
+def link_file(src: Path, dst: Path):
+    """Hard link src to dst (copy across filesystems), replacing dst atomically"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists() and os.path.samefile(src, dst):
+        return
+    tmp_path = dst.with_name(dst.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def assemble_episode(dataset_root: Path, info: dict, build_root: Path, record: dict, ep_idx: int) -> str:
+    """Write output episode ep_idx from its staged source with the new indices, return the parquet hash"""
+    staged_dir = Path(build_root) / STAGED_DIR / record["key"]
+    table = pq.read_table(staged_dir / "data.parquet")
+    num_rows = len(table)
+    new_columns = {
+        "episode_index": np.full(num_rows, ep_idx),
+        "index": np.arange(record["index_offset"], record["index_offset"] + num_rows),
+        "task_index": np.full(num_rows, record["task_index"]),
+    }
+    for name, values in new_columns.items():
+        col_idx = table.schema.get_field_index(name)
+        if col_idx >= 0:
+            field = table.schema.field(col_idx)
+            table = table.set_column(col_idx, field, pa.array(values, type=field.type))
+
+    data_path = episode_data_path(dataset_root, info, ep_idx)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = data_path.with_name(data_path.name + ".tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, data_path)
+
+    # Videos need no rewrite: hard links to the staged files (tools editing videos replace the file, never the inode)
+    for vid_key in video_keys(info):
+        link_file(staged_dir / f"{vid_key}.mp4", episode_video_path(dataset_root, info, ep_idx, vid_key))
+    return file_sha256(data_path)
+
+
+def is_assembled(dataset_root: Path, info: dict, build_root: Path, record: dict, previous: dict | None, ep_idx: int) -> bool:
+    """Whether output episode ep_idx is still exactly what assembling record would write"""
+    if previous is None or any(previous.get(k) != record[k] for k in ("key", "index_offset", "task_index")):
+        return False
+    data_path = episode_data_path(dataset_root, info, ep_idx)
+    if not data_path.exists() or file_sha256(data_path) != previous.get("parquet_sha256"):
+        return False
+    staged_dir = Path(build_root) / STAGED_DIR / record["key"]
+    for vid_key in video_keys(info):
+        video_path = episode_video_path(dataset_root, info, ep_idx, vid_key)
+        if not video_path.exists() or not os.path.samefile(staged_dir / f"{vid_key}.mp4", video_path):
+            return False
+    return True
+
+
+def remove_stale_outputs(dataset_root: Path, num_episodes: int):
+    """Delete parquet and mp4 files of episodes past the end of the dataset"""
+    stale = [
+        path for pattern in ("data/**/episode_*.parquet", "videos/**/episode_*.mp4")
+        for path in Path(dataset_root).glob(pattern)
+        if int(path.stem.split("_")[1]) >= num_episodes
+    ]
+    for path in stale:
+        path.unlink()
+    return len(stale)
+
+
+def remove_unused_staged(build_root: Path, state: dict, keys: set[str]) -> int:
+    """Drop staged episodes that are no longer selected"""
+    unused = [key for key in state["episodes"] if key not in keys]
+    for key in unused:
+        shutil.rmtree(Path(build_root) / STAGED_DIR / key, ignore_errors=True)
+        del state["episodes"][key]
+    staged_root = Path(build_root) / STAGED_DIR
+    if staged_root.exists():
+        for path in staged_root.iterdir():
+            if path.name not in state["episodes"]:
+                shutil.rmtree(path, ignore_errors=True)
+    return len(unused)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""
+Recompute episode and aggregate statistics of a local LeRobot v2.1 dataset.
+
+Per-episode min/max/mean/std/count (and quantiles) are computed with numpy over
+the Arrow columns of each episode parquet file. Image and video features are
+estimated from a sample of frames, downsampled and normalized to [0, 1] like
+LeRobot does. Episodes are processed in a process pool and their stats are
+merged into the aggregate as they complete using Chan's parallel variance
+formula, so the whole dataset is never held in memory.
+
+Writes meta/episodes_stats.jsonl and meta/stats.json.
+
+Usage:
+    python compute_stats.py --dataset_root ./filtered_dataset/so100_filtered_pick_green
+"""
+
+import argparse
+import io
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import av
+import numpy as np
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from episode_io import (
+    EPISODES_FILE,
+    EPISODES_STATS_FILE,
+    column_to_numpy,
+    episode_data_path,
+    episode_video_path,
+    load_info,
+    load_jsonlines,
+    write_json,
+    write_jsonlines,
+)
+
+STATS_FILE = "meta/stats.json"
+QUANTILES = [0.01, 0.10, 0.50, 0.90, 0.99]
+NON_NUMERIC_DTYPES = ["string", "image", "video"]
+
+
+def quantile_key(q: float) -> str:
+    return f"q{round(q * 100):02d}"
+
+
+def estimate_num_samples(dataset_len: int, min_num_samples: int = 100, max_num_samples: int = 10_000, power: float = 0.75) -> int:
+    """Same heuristic as LeRobot: sample more frames for longer episodes, sublinearly"""
+    if dataset_len < min_num_samples:
+        min_num_samples = dataset_len
+    return max(min_num_samples, min(int(dataset_len**power), max_num_samples))
+
+
+def sample_indices(data_len: int) -> np.ndarray:
+    num_samples = estimate_num_samples(data_len)
+    return np.round(np.linspace(0, data_len - 1, num_samples)).astype(int)
+
+
+def downsampled_size(height: int, width: int, target_size: int = 150, max_size_threshold: int = 300) -> tuple[int, int]:
+    if max(width, height) < max_size_threshold:
+        return height, width
+    factor = max(1, int(min(width, height) / target_size))
+    return height // factor, width // factor
+
+
+def feature_stats(values: np.ndarray, axis, keepdims: bool, quantiles: list[float]) -> dict[str, np.ndarray]:
+    """min/max/mean/std/count (+ quantiles) of values reduced over axis"""
+    values = values.astype(np.float64, copy=False)
+    stats = {
+        "min": np.min(values, axis=axis, keepdims=keepdims),
+        "max": np.max(values, axis=axis, keepdims=keepdims),
+        "mean": np.mean(values, axis=axis, keepdims=keepdims),
+        "std": np.std(values, axis=axis, keepdims=keepdims),
+        "count": np.array([len(values)]),
+    }
+    if quantiles:
+        qs = np.quantile(values, quantiles, axis=axis, keepdims=keepdims)
+        for q, q_values in zip(quantiles, qs):
+            stats[quantile_key(q)] = q_values
+    return stats
+
+
+def sample_video_frames(video_path: Path, indices: np.ndarray) -> np.ndarray:
+    """Decode the requested frames of a video as (N, H, W, 3) uint8, downsampled for stats"""
+    wanted = set(indices.tolist())
+    last = int(indices.max())
+    frames = []
+    with av.open(str(video_path)) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        height, width = downsampled_size(stream.codec_context.height, stream.codec_context.width)
+        for i, frame in enumerate(container.decode(stream)):
+            if i in wanted:
+                frames.append(frame.to_ndarray(format="rgb24", width=width, height=height))
+            if i >= last:
+                break
+    return np.stack(frames)
+
+
+def sample_image_column(column, indices: np.ndarray) -> np.ndarray:
+    """Decode the requested frames of an image feature stored in parquet as (N, H, W, 3) uint8"""
+    from PIL import Image
+
+    frames = []
+    for i in indices:
+        item = column[int(i)].as_py()
+        image = Image.open(io.BytesIO(item["bytes"])).convert("RGB")
+        height, width = downsampled_size(image.height, image.width)
+        frames.append(np.asarray(image.resize((width, height))))
+    return np.stack(frames)
+
+
+def image_stats(frames: np.ndarray, quantiles: list[float]) -> dict[str, np.ndarray]:
+    """Per-channel stats of (N, H, W, C) uint8 frames, normalized to [0, 1] with shape (C, 1, 1)"""
+    channels_first = np.moveaxis(frames, -1, 0).reshape(frames.shape[-1], -1) / 255.0
+    stats = feature_stats(channels_first.T, axis=0, keepdims=False, quantiles=quantiles)
+    count = np.array([len(frames)])
+    stats = {k: v.reshape(-1, 1, 1) for k, v in stats.items() if k != "count"}
+    stats["count"] = count
+    return stats
+
+
+def compute_episode_stats(dataset_root: Path, info: dict, ep_idx: int, quantiles: list[float] = QUANTILES) -> dict:
+    """Compute the stats of every numeric, image and video feature of one episode"""
+    features = info["features"]
+    table = pq.read_table(episode_data_path(dataset_root, info, ep_idx))
+    ep_stats = {}
+
+    for key, ft in features.items():
+        if ft["dtype"] in NON_NUMERIC_DTYPES or key not in table.column_names:
+            continue
+        values = column_to_numpy(table.column(key))
+        if values.ndim == 1:
+            values = values[:, None]
+        ep_stats[key] = feature_stats(values, axis=0, keepdims=False, quantiles=quantiles)
+
+    indices = sample_indices(len(table))
+    for key, ft in features.items():
+        if ft["dtype"] == "video":
+            frames = sample_video_frames(episode_video_path(dataset_root, info, ep_idx, key), indices)
+        elif ft["dtype"] == "image":
+            frames = sample_image_column(table.column(key), indices)
+        else:
+            continue
+        ep_stats[key] = image_stats(frames, quantiles)
+
+    return ep_stats
+
+
+class StatsAccumulator:
+    """Streaming aggregate of per-episode stats using Chan et al.'s parallel mean/variance update"""
+
+    def __init__(self):
+        self.stats = {}
+
+    def update(self, ep_stats: dict):
+        for key, stats in ep_stats.items():
+            if key not in self.stats:
+                self.stats[key] = {k: np.asarray(v, dtype=np.float64).copy() for k, v in stats.items()}
+                self.stats[key]["m2"] = self.stats[key]["std"] ** 2 * stats["count"]
+                continue
+
+            agg = self.stats[key]
+            n_a, n_b = agg["count"], stats["count"].astype(np.float64)
+            n = n_a + n_b
+            delta = stats["mean"] - agg["mean"]
+            m2_b = stats["std"] ** 2 * n_b
+            agg["mean"] = agg["mean"] + delta * n_b / n
+            agg["m2"] = agg["m2"] + m2_b + delta**2 * n_a * n_b / n
+            agg["min"] = np.minimum(agg["min"], stats["min"])
+            agg["max"] = np.maximum(agg["max"], stats["max"])
+            # Exact quantiles are not mergeable, use the count-weighted average of episode quantiles
+            for k in stats:
+                if k.startswith("q"):
+                    agg[k] = (agg[k] * n_a + stats[k] * n_b) / n
+            agg["count"] = n
+
+    def result(self) -> dict:
+        result = {}
+        for key, agg in self.stats.items():
+            stats = {k: v for k, v in agg.items() if k != "m2"}
+            stats["std"] = np.sqrt(agg["m2"] / agg["count"])
+            stats["count"] = agg["count"].astype(np.int64)
+            result[key] = stats
+        return result
+
+
+def serialize_stats(stats: dict) -> dict:
+    return {key: {k: np.asarray(v).tolist() for k, v in ft_stats.items()} for key, ft_stats in stats.items()}
+
+
+def deserialize_stats(stats: dict) -> dict:
+    return {key: {k: np.asarray(v) for k, v in ft_stats.items()} for key, ft_stats in stats.items()}
+
+
+def _episode_stats_job(dataset_root: Path, info: dict, ep_idx: int, quantiles: list[float]):
+    return ep_idx, compute_episode_stats(dataset_root, info, ep_idx, quantiles)
+
+
+def compute_dataset_stats(dataset_root: Path, num_workers: int = 8, quantiles: list[float] = QUANTILES, write: bool = True):
+    """Recompute episodes_stats.jsonl and stats.json of a local dataset, return (episodes_stats, stats)"""
+    dataset_root = Path(dataset_root)
+    info = load_info(dataset_root)
+    episode_indices = [ep["episode_index"] for ep in load_jsonlines(dataset_root / EPISODES_FILE)]
+
+    episodes_stats = {}
+    accumulator = StatsAccumulator()
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(_episode_stats_job, dataset_root, info, ep_idx, quantiles)
+            for ep_idx in episode_indices
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Computing stats"):
+            ep_idx, ep_stats = future.result()
+            episodes_stats[ep_idx] = ep_stats
+            accumulator.update(ep_stats)
+
+    stats = accumulator.result()
+    if write:
+        write_jsonlines(
+            [{"episode_index": ep_idx, "stats": serialize_stats(episodes_stats[ep_idx])} for ep_idx in episode_indices],
+            dataset_root / EPISODES_STATS_FILE,
+        )
+        write_json(serialize_stats(stats), dataset_root / STATS_FILE)
+        print(f"✓ Wrote stats for {len(episodes_stats)} episodes and {len(stats)} features")
+
+    return episodes_stats, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute episode and aggregate stats of a local LeRobot dataset")
+    parser.add_argument("--dataset_root", type=str, required=True, help="Root directory of the local dataset")
+    parser.add_argument("--num_workers", type=int, default=8, help="Number of worker processes (default: 8)")
+    parser.add_argument("--no_quantiles", action="store_true", help="Skip quantile stats (q01, q10, q50, q90, q99)")
+    args = parser.parse_args()
+
+    compute_dataset_stats(
+        Path(args.dataset_root),
+        num_workers=args.num_workers,
+        quantiles=[] if args.no_quantiles else QUANTILES,
+    )
+
+
+if __name__ == "__main__":
+    main()
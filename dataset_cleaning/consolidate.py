@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+Pack the per-episode parquet files of a local LeRobot dataset into a few large files.
+
+Whole episodes are appended to row groups of about --row_group_size rows (an
+episode is never split across row groups) and files are rolled over after about
+--rows_per_file rows. meta/packed_index.json maps every episode to
+(file, row group, offset, length), so PackedEpisodeReader fetches any episode by
+reading a single row group. The packed files live in packed/, next to the
+standard data/ layout, which LeRobotDataset and the hub keep using.
+
+Usage:
+    python consolidate.py --dataset_root ./filtered_dataset/so100_filtered_pick_green
+    python consolidate.py --dataset_root ./filtered_dataset/so100_filtered_pick_green --benchmark
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from episode_io import EPISODES_FILE, episode_data_path, load_info, load_json, load_jsonlines, write_json
+
+PACKED_DIR = "packed"
+PACKED_INDEX_FILE = "meta/packed_index.json"
+
+
+def pack_dataset(dataset_root: Path, row_group_size: int = 16_384, rows_per_file: int = 1_000_000) -> dict:
+    """Write packed/file-XXX.parquet and meta/packed_index.json from the per-episode parquet files"""
+    dataset_root = Path(dataset_root)
+    info = load_info(dataset_root)
+    episode_indices = [ep["episode_index"] for ep in load_jsonlines(dataset_root / EPISODES_FILE)]
+    packed_dir = dataset_root / PACKED_DIR
+    packed_dir.mkdir(parents=True, exist_ok=True)
+    for old_file in packed_dir.glob("file-*.parquet"):
+        old_file.unlink()
+
+    index = {"row_group_size": row_group_size, "files": [], "episodes": {}}
+    writer, file_rows, row_group, row_group_rows, num_row_groups = None, 0, [], 0, 0
+
+    def flush_row_group():
+        nonlocal row_group, row_group_rows, num_row_groups
+        if row_group:
+            table = pa.concat_tables(row_group)
+            writer.write_table(table, row_group_size=len(table))
+            num_row_groups += 1
+        row_group, row_group_rows = [], 0
+
+    def close_file():
+        nonlocal writer, file_rows, num_row_groups
+        flush_row_group()
+        if writer is not None:
+            writer.close()
+        writer, file_rows, num_row_groups = None, 0, 0
+
+    for ep_idx in episode_indices:
+        table = pq.read_table(episode_data_path(dataset_root, info, ep_idx))
+        if writer is not None and file_rows + len(table) > rows_per_file:
+            close_file()
+        if writer is None:
+            file_name = f"{PACKED_DIR}/file-{len(index['files']):03d}.parquet"
+            index["files"].append(file_name)
+            writer = pq.ParquetWriter(dataset_root / file_name, table.schema)
+        if row_group and row_group_rows + len(table) > row_group_size:
+            flush_row_group()
+
+        index["episodes"][str(ep_idx)] = {
+            "file": len(index["files"]) - 1,
+            "row_group": num_row_groups,
+            "offset": row_group_rows,
+            "length": len(table),
+        }
+        row_group.append(table)
+        row_group_rows += len(table)
+        file_rows += len(table)
+    close_file()
+
+    write_json(index, dataset_root / PACKED_INDEX_FILE)
+    print(f"✓ Packed {len(episode_indices)} episodes into {len(index['files'])} files under {dataset_root / PACKED_DIR}")
+    return index
+
+
+class PackedEpisodeReader:
+    """Read episodes of a packed dataset, one row group read per episode"""
+
+    def __init__(self, dataset_root: Path):
+        self.dataset_root = Path(dataset_root)
+        self.index = load_json(self.dataset_root / PACKED_INDEX_FILE)
+        self._files = {}
+
+    def _file(self, file_idx: int) -> pq.ParquetFile:
+        if file_idx not in self._files:
+            self._files[file_idx] = pq.ParquetFile(self.dataset_root / self.index["files"][file_idx])
+        return self._files[file_idx]
+
+    @property
+    def episode_indices(self) -> list[int]:
+        return [int(ep_idx) for ep_idx in self.index["episodes"]]
+
+    def read_episode(self, ep_idx: int, columns: list[str] | None = None) -> pa.Table:
+        location = self.index["episodes"][str(ep_idx)]
+        table = self._file(location["file"]).read_row_group(location["row_group"], columns=columns)
+        return table.slice(location["offset"], location["length"])
+
+    def iter_row_groups(self, columns: list[str] | None = None):
+        """Sequential full scan, one row group at a time"""
+        for file_idx in range(len(self.index["files"])):
+            parquet_file = self._file(file_idx)
+            for row_group in range(parquet_file.num_row_groups):
+                yield parquet_file.read_row_group(row_group, columns=columns)
+
+
+def benchmark(dataset_root: Path, num_samples: int = 200, seed: int = 0):
+    """Compare random episode access and full-scan throughput of the per-episode and packed layouts"""
+    dataset_root = Path(dataset_root)
+    info = load_info(dataset_root)
+    reader = PackedEpisodeReader(dataset_root)
+    episode_indices = reader.episode_indices
+    rng = random.Random(seed)
+    samples = [rng.choice(episode_indices) for _ in range(num_samples)]
+
+    def timed(fn):
+        start = time.perf_counter()
+        rows = fn()
+        return time.perf_counter() - start, rows
+
+    results = {
+        "random access, per-episode files": timed(
+            lambda: sum(len(pq.read_table(episode_data_path(dataset_root, info, ep))) for ep in samples)),
+        "random access, packed": timed(lambda: sum(len(reader.read_episode(ep)) for ep in samples)),
+        "full scan, per-episode files": timed(
+            lambda: sum(len(pq.read_table(episode_data_path(dataset_root, info, ep))) for ep in episode_indices)),
+        "full scan, packed": timed(lambda: sum(len(table) for table in reader.iter_row_groups())),
+    }
+
+    print(f"\n=== Layout benchmark ({len(episode_indices)} episodes, {num_samples} random reads) ===")
+    for name, (elapsed, rows) in results.items():
+        episodes = num_samples if name.startswith("random") else len(episode_indices)
+        print(f"{name:35s}: {episodes / elapsed:10.1f} episodes/s | {rows / elapsed:12.0f} rows/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack per-episode parquet files into large row-grouped files")
+    parser.add_argument("--dataset_root", type=str, required=True, help="Root directory of the local dataset")
+    parser.add_argument("--row_group_size", type=int, default=16_384,
+                        help="Target rows per row group, episodes are never split (default: 16384)")
+    parser.add_argument("--rows_per_file", type=int, default=1_000_000, help="Target rows per packed file (default: 1000000)")
+    parser.add_argument("--benchmark", action="store_true", help="Benchmark the packed layout against per-episode files")
+    parser.add_argument("--num_samples", type=int, default=200, help="Random episode reads in the benchmark (default: 200)")
+    args = parser.parse_args()
+
+    dataset_root = Path(args.dataset_root)
+    pack_dataset(dataset_root, args.row_group_size, args.rows_per_file)
+    if args.benchmark:
+        benchmark(dataset_root, args.num_samples)
+
+
+if __name__ == "__main__":
+    main()
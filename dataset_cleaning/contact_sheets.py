@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""
+Contact sheets and a static HTML review page for setting judge scores.
+
+For every episode listed in judge.jsonl, a few evenly spaced frames of each
+camera are decoded in a process pool and tiled into one JPEG strip per video.
+Strips are cached in <output_dir>/sheets/ under the hash of the video they were
+cut from, so rerunning only decodes new or changed videos.
+
+<output_dir>/index.html shows every episode with its strips, current judge and
+auto_judge reasons. Scores are picked with the radio buttons (kept in the
+browser's local storage) and "Download judge.jsonl" saves the updated file, to
+be used with data_cleaning.py --judge_file.
+
+Usage:
+    python contact_sheets.py --judge_file judge.jsonl --output_dir ./review --num_frames 8
+"""
+
+import argparse
+import html
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+from build_state import cached_sha256, fetch_source_files
+from compute_stats import sample_video_frames
+from episode_io import episode_video_path, load_json, load_jsonlines, video_keys, write_json
+from generate_judge import load_all_meta
+
+SHEETS_DIR = "sheets"
+HASHES_FILE = "video_hashes.json"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Episode review</title>
+<style>
+body {{ font-family: sans-serif; margin: 20px; }}
+.episode {{ border: 1px solid #ccc; margin-bottom: 12px; padding: 8px; }}
+.episode.judge-0 {{ background: #fdecea; }}
+.episode.judge-1 {{ background: #fff8e1; }}
+.episode.judge-2 {{ background: #e8f5e9; }}
+.episode img {{ display: block; max-width: 100%; margin: 4px 0; }}
+.reasons {{ color: #a00; font-size: 0.9em; }}
+#toolbar {{ position: sticky; top: 0; background: white; padding: 8px 0; border-bottom: 1px solid #ccc; }}
+</style>
+</head>
+<body>
+<div id="toolbar">
+  <button onclick="downloadJudge()">Download judge.jsonl</button>
+  <span id="counts"></span>
+</div>
+{episodes}
+<script>
+const RECORDS = {records};
+const STORAGE_KEY = "judge:" + {page_id};
+
+function loadSaved() {{
+  return JSON.parse(localStorage.getItem(STORAGE_KEY) || "{{}}");
+}}
+
+function setJudge(i, value) {{
+  const saved = loadSaved();
+  saved[i] = value;
+  localStorage.setItem(STORAGE_KEY, JSON.stringify(saved));
+  render();
+}}
+
+function currentJudge(i) {{
+  const saved = loadSaved();
+  return i in saved ? saved[i] : RECORDS[i].judge;
+}}
+
+function render() {{
+  const counts = {{0: 0, 1: 0, 2: 0}};
+  RECORDS.forEach((record, i) => {{
+    const judge = currentJudge(i);
+    counts[judge] = (counts[judge] || 0) + 1;
+    const card = document.getElementById("episode-" + i);
+    card.className = "episode judge-" + judge;
+    card.querySelectorAll("input").forEach(input => {{ input.checked = Number(input.value) === judge; }});
+  }});
+  document.getElementById("counts").textContent =
+    `judge 0: ${{counts[0]}} | judge 1: ${{counts[1]}} | judge 2: ${{counts[2]}}`;
+}}
+
+function downloadJudge() {{
+  const lines = RECORDS.map((record, i) => JSON.stringify({{...record, judge: currentJudge(i)}}));
+  const blob = new Blob([lines.join("\\n") + "\\n"], {{type: "application/jsonl"}});
+  const link = document.createElement("a");
+  link.href = URL.createObjectURL(blob);
+  link.download = "judge.jsonl";
+  link.click();
+}}
+
+render();
+</script>
+</body>
+</html>
+"""
+
+
+def contact_sheet(video_path: Path, length: int, num_frames: int, sheet_path: Path) -> Path:
+    """Decode num_frames evenly spaced frames and save them side by side as one JPEG"""
+    indices = np.unique(np.round(np.linspace(0, length - 1, num_frames)).astype(int))
+    frames = sample_video_frames(video_path, indices)
+    tmp_path = sheet_path.with_name(sheet_path.name + ".tmp.jpg")
+    Image.fromarray(np.concatenate(list(frames), axis=1)).save(tmp_path, quality=80)
+    tmp_path.replace(sheet_path)
+    return sheet_path
+
+
+def episode_card(i: int, record: dict, sheets: dict[str, str]) -> str:
+    radios = " ".join(
+        f'<label><input type="radio" name="judge-{i}" value="{value}" onclick="setJudge({i}, {value})"> {value}</label>'
+        for value in (0, 1, 2)
+    )
+    reasons = "; ".join(record.get("reasons", []))
+    images = "\n".join(
+        f'<div>{html.escape(vid_key)}</div><img loading="lazy" src="{html.escape(src)}">' for vid_key, src in sheets.items()
+    )
+    return (
+        f'<div class="episode" id="episode-{i}">\n'
+        f'<b>{html.escape(record["repo_id"])} episode {record["episode_id"]}</b> {radios}\n'
+        f'<div class="reasons">{html.escape(reasons)}</div>\n{images}\n</div>'
+    )
+
+
+def build_review_page(judge_file: Path, output_dir: Path, num_frames: int = 8, num_workers: int = 8) -> Path:
+    """Generate the missing contact sheets and write index.html for every episode of judge_file"""
+    output_dir = Path(output_dir)
+    sheets_dir = output_dir / SHEETS_DIR
+    sheets_dir.mkdir(parents=True, exist_ok=True)
+    records = load_jsonlines(judge_file)
+
+    repo_ids = list(dict.fromkeys(record["repo_id"] for record in records))
+    metas = {}
+    for repo_id, ds_meta, error in load_all_meta(repo_ids, num_workers):
+        if error is not None:
+            print(f"✗ Error loading {repo_id}: {error}")
+            continue
+        metas[repo_id] = ds_meta
+        # Episode files missing from the local cache are downloaded (parquet files come along, they are small)
+        fetch_source_files(ds_meta, [r["episode_id"] for r in records if r["repo_id"] == repo_id])
+
+    # Video hashes are memoized on (size, mtime) so reruns do not re-read unchanged videos
+    hashes_path = output_dir / HASHES_FILE
+    hash_state = {"source_hashes": load_json(hashes_path) if hashes_path.exists() else {}}
+    card_sheets, jobs = [], {}
+    for record in records:
+        ds_meta = metas.get(record["repo_id"])
+        sheets = {}
+        if ds_meta is not None:
+            for vid_key in video_keys(ds_meta.info):
+                video_path = episode_video_path(ds_meta.root, ds_meta.info, record["episode_id"], vid_key)
+                if not video_path.exists():
+                    continue
+                sheet_path = sheets_dir / f"{cached_sha256(hash_state, video_path)}_{num_frames}.jpg"
+                if not sheet_path.exists():
+                    jobs[sheet_path] = (video_path, ds_meta.episodes[record["episode_id"]]["length"])
+                sheets[vid_key] = f"{SHEETS_DIR}/{sheet_path.name}"
+        card_sheets.append(sheets)
+    write_json(hash_state["source_hashes"], hashes_path)
+
+    print(f"{len(jobs)} contact sheets to generate, the others are cached in {sheets_dir}")
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(contact_sheet, video_path, length, num_frames, sheet_path)
+            for sheet_path, (video_path, length) in jobs.items()
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Contact sheets"):
+            future.result()
+
+    page = PAGE_TEMPLATE.format(
+        episodes="\n".join(episode_card(i, record, sheets) for i, (record, sheets) in enumerate(zip(records, card_sheets))),
+        records=json.dumps(records).replace("</", "<\\/"),
+        page_id=json.dumps(str(Path(judge_file).resolve())),
+    )
+    page_path = output_dir / "index.html"
+    page_path.write_text(page, encoding="utf-8")
+    print(f"✓ Review page for {len(records)} episodes: {page_path}")
+    return page_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate contact sheets and an HTML page to review judge scores")
+    parser.add_argument("--judge_file", type=str, default="judge.jsonl", help="Path to the judge JSONL file (default: judge.jsonl)")
+    parser.add_argument("--output_dir", type=str, default="./review", help="Directory of the review page and sheets (default: ./review)")
+    parser.add_argument("--num_frames", type=int, default=8, help="Frames per camera per episode (default: 8)")
+    parser.add_argument("--num_workers", type=int, default=8, help="Number of decoding processes (default: 8)")
+    args = parser.parse_args()
+
+    build_review_page(Path(args.judge_file), Path(args.output_dir), args.num_frames, args.num_workers)
+
+
+if __name__ == "__main__":
+    main()
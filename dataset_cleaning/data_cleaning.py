@@ -1,25 +1,16 @@
 #!/usr/bin/env python
 
-from lerobot.common.datasets.lerobot_dataset import (
-    LeRobotDataset,
-    LeRobotDatasetMetadata,
-)
+from lerobot.common.datasets.lerobot_dataset import LeRobotDataset
+import copy
 import json
 import os
 import shutil
 import argparse
-from collections import Counter, defaultdict
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-import torch
-import numpy as np
-import datasets
-import pyarrow.compute as pc
-import pyarrow.parquet as pq
 from tqdm import tqdm
-import os
-import re
-import glob
-import pandas as pd
 from lerobot.common.datasets.utils import (
     DEFAULT_CHUNK_SIZE,
     DEFAULT_PARQUET_PATH,
@@ -32,7 +23,31 @@ from lerobot.common.datasets.utils import (
     write_jsonlines,
 )
 from huggingface_hub import HfApi
-from lerobot.common.datasets.utils import write_episode_stats
+from build_state import (
+    assemble_episode,
+    build_dir,
+    cached_sha256,
+    episode_key,
+    fetch_source_files,
+    is_assembled,
+    load_build_state,
+    remove_stale_outputs,
+    remove_unused_staged,
+    save_build_state,
+    stage_episode,
+)
+from compute_stats import STATS_FILE, StatsAccumulator, compute_episode_stats, deserialize_stats, serialize_stats
+from consolidate import pack_dataset
+from episode_io import EPISODES_FILE, EPISODES_STATS_FILE, INFO_FILE, TASKS_FILE, episode_data_path, episode_video_path
+from generate_judge import load_all_meta, load_judged_episodes
+from manifest import MANIFEST_FILE
+from transcode import update_video_features
+from virtual_dataset import create_virtual_dataset, remap_episode_stats
+
+DEFAULT_DATASET_ROOT = Path("./filtered_dataset") / "so100_filtered_pick_green"
+
+# Only the LeRobot layout is pushed: packed/, meta/packed_index.json and the local manifest stay on disk
+HUB_ALLOW_PATTERNS = ["data/**", "videos/**", INFO_FILE, EPISODES_FILE, TASKS_FILE, EPISODES_STATS_FILE, STATS_FILE]
 
 def validate_dataset_structure(dataset_root: Path, expected_episodes: int, video_keys: list[str]) -> bool:
     """Validate that all required dataset files exist without loading through LeRobotDataset"""
@@ -82,237 +97,208 @@ def validate_dataset_structure(dataset_root: Path, expected_episodes: int, video
     return True
 
 
-def copy_video_files(original_episode_mappings, video_keys, dataset_root):
-    """Copy video files from source datasets to filtered dataset"""
-    print("Copying video files...")
-    
-    successful_copies = 0
-    total_expected = len(original_episode_mappings) * len(video_keys)
-    
-    # Copy videos for each episode
-    for mapping in original_episode_mappings:
-        new_ep_idx = mapping["new_episode_idx"]
-        original_repo_id = mapping["original_repo_id"]
-        original_ep_idx = mapping["original_episode_idx"]
-        
-        if not original_repo_id:
-            continue
-            
-        try:
-            source_dataset = LeRobotDataset(original_repo_id)
-            new_ep_chunk = new_ep_idx // DEFAULT_CHUNK_SIZE
-            
-            for vid_key in video_keys:
-                try:
-                    # Source video path
-                    source_video_path = source_dataset.root / source_dataset.meta.get_video_file_path(original_ep_idx, vid_key)
-                    
-                    # Destination video path
-                    dest_video_dir = dataset_root / f"videos/chunk-{new_ep_chunk:03d}/{vid_key}"
-                    dest_video_dir.mkdir(parents=True, exist_ok=True)
-                    dest_video_path = dest_video_dir / f"episode_{new_ep_idx:06d}.mp4"
-                    
-                    # Copy video file if it exists
-                    if source_video_path.exists():
-                        shutil.copy2(source_video_path, dest_video_path)
-                        successful_copies += 1
-                        if new_ep_idx % 10 == 0:  # Log every 10th episode to avoid spam
-                            print(f"Copied video: {vid_key} episode {new_ep_idx}")
-                    else:
-                        print(f"Warning: Source video not found: {source_video_path}")
-                        
-                except Exception as e:
-                    print(f"Error copying video {vid_key} for episode {new_ep_idx}: {e}")
-                    continue
-                    
-        except Exception as e:
-            print(f"Error loading source dataset {original_repo_id}: {e}")
-            continue
-    
-    print(f"Video copy complete: {successful_copies}/{total_expected} videos copied successfully")
+def generate_dataset(judge_jsonl_path, repo_ids, num_workers=8, rebuild=False, trim_idle=None, transcode=None):
+    """Create or incrementally update the filtered dataset, only redoing episodes that changed since the last run
 
-
-def generate_dataset(judge_jsonl_path, repo_ids):
-    """Create filtered dataset with proper video handling"""
+    trim_idle, if given, holds the threshold/padding/min_length of trim_idle.py and trims every staged episode.
+    transcode, if given, holds the params of transcode.py and re-encodes the videos of every staged episode.
+    """
+    start_time = time.perf_counter()
+    transforms = {}
+    if trim_idle:
+        transforms["trim_idle"] = trim_idle
+    if transcode:
+        transforms["transcode"] = transcode
     
     # Get judge=2 episodes
-    judge2_episodes = defaultdict(list)
-    with open(judge_jsonl_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                data = json.loads(line)
-                if data.get('judge') == 2:
-                    judge2_episodes[data['repo_id']].append(data['episode_id'])
+    judge2_episodes = load_judged_episodes(judge_jsonl_path, judge=2)
     
     print("\n=== Creating filtered dataset with judge=2 episodes ===")
     
-    # Collect all data
-    all_data = []
-    episode_info = []
-    original_episode_mappings = []
-    new_episode_index = 0
+    dataset_root = DEFAULT_DATASET_ROOT
+    build_root = build_dir(dataset_root)
+    if rebuild:
+        print(f"Removing existing directories: {dataset_root}, {build_root}")
+        shutil.rmtree(dataset_root, ignore_errors=True)
+        shutil.rmtree(build_root, ignore_errors=True)
+    build_root.mkdir(parents=True, exist_ok=True)
+    state = load_build_state(build_root)
+    
+    # Only metadata is loaded, episode files are fetched when they are not cached locally
+    repo_metas = []
+    for repo_id, ds_meta, error in load_all_meta(repo_ids, num_workers=num_workers):
+        if error is not None:
+            print(f"✗ Error loading {repo_id}: {error}")
+        elif repo_id in judge2_episodes:
+            repo_metas.append((repo_id, ds_meta))
+    
+    if not repo_metas:
+        print("Error: No judge=2 episodes found in the given repositories!")
+        return None, None
     
-    # Get source dataset info for video handling
-    source_dataset = LeRobotDataset(repo_ids[0])
-    has_videos = len(source_dataset.meta.video_keys) > 0
-    video_keys = source_dataset.meta.video_keys
+    source_meta = repo_metas[0][1]
+    video_keys = source_meta.video_keys
+    has_videos = len(video_keys) > 0
     
     print(f"Source dataset has videos: {has_videos}")
     if has_videos:
         print(f"Video keys: {video_keys}")
     
-    episodes_stats = []
-    for repo_id in repo_ids:
-        if repo_id not in judge2_episodes:
-            continue
-            
-        dataset = LeRobotDataset(repo_id)
-        
+    # Resolve every selected episode to its content key
+    selected = []
+    for repo_id, ds_meta in repo_metas:
+        fetch_source_files(ds_meta, judge2_episodes[repo_id])
         for ep_id in judge2_episodes[repo_id]:
-            print(f"Collecting {repo_id} episode {ep_id}")
-            episodes_stats.append(dataset.meta.episodes_stats[ep_id])
-            
-            episode_data = []
-            for i in range(len(dataset.hf_dataset)):
-                row = dataset.hf_dataset[i]
-                if row['episode_index'].item() == ep_id:
-                    # Convert all tensors to numpy/python types and update indices
-                    row_dict = {}
-                    for k, v in row.items():
-                        if isinstance(v, torch.Tensor):
-                            if v.dim() == 0:  # scalar tensor
-                                row_dict[k] = v.item()
-                            else:  # multi-dimensional tensor
-                                row_dict[k] = v.numpy()
-                        else:
-                            row_dict[k] = v
-                    
-                    # Update episode_index and index for new dataset
-                    row_dict['episode_index'] = new_episode_index
-                    row_dict['index'] = len(all_data) + len(episode_data)
-                    episode_data.append(row_dict)
-            
-            if len(episode_data) == 0:
+            source_path = episode_data_path(ds_meta.root, ds_meta.info, ep_id)
+            video_paths = {key: episode_video_path(ds_meta.root, ds_meta.info, ep_id, key) for key in ds_meta.video_keys}
+            if not source_path.exists() or not all(path.exists() for path in video_paths.values()):
                 print(f"Warning: No data found for {repo_id} episode {ep_id}")
                 continue
-            
-            print(f"  Collected {len(episode_data)} frames from episode {ep_id}")
-            if len(episode_data) > 0:
-                print(f"  Sample keys: {list(episode_data[0].keys())}")
-                
-            all_data.extend(episode_data)
-            episode_info.append({
-                "episode_index": new_episode_index,
-                "tasks": [dataset.meta.tasks[episode_data[0]['task_index']]],
-                "length": len(episode_data)
-            })
-            
-            # Track original episode mapping for video copying
-            original_episode_mappings.append({
-                "new_episode_idx": new_episode_index,
-                "original_repo_id": repo_id,
-                "original_episode_idx": ep_id
-            })
-            
-            new_episode_index += 1
-    
-    if len(all_data) == 0:
+            source_sha256 = cached_sha256(state, source_path)
+            source_videos = {key: cached_sha256(state, path) for key, path in video_paths.items()}
+            key = episode_key(repo_id, ep_id, source_sha256, source_videos, transforms)
+            selected.append((key, repo_id, ds_meta, ep_id, source_sha256, source_videos))
+    
+    if len(selected) == 0:
         print("Error: No data collected from any episodes!")
         return None, None
     
+    # Stage added or changed episodes (trimmed here when trim_idle is set), saving the job state after each one so an interrupted run resumes
+    to_stage = {item[0]: item for item in selected if item[0] not in state["episodes"]}
+    print(f"{len(selected) - len(to_stage)}/{len(selected)} episodes unchanged since the last run, {len(to_stage)} to stage")
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = {
+            executor.submit(stage_episode, build_root, key, repo_id, ds_meta.root, ds_meta.info, ep_id, ds_meta.tasks,
+                            source_sha256, source_videos, transforms): key
+            for key, repo_id, ds_meta, ep_id, source_sha256, source_videos in to_stage.values()
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Staging episodes"):
+            state["episodes"][futures[future]] = future.result()
+            save_build_state(build_root, state)
+    
+    # Tasks are collected in output order so task_index is remapped before any parquet file is written
+    task_to_index = {}
+    episode_info = []
+    records = []
+    total_frames = 0
+    for new_ep_idx, (key, *_) in enumerate(selected):
+        entry = state["episodes"][key]
+        task_index = task_to_index.setdefault(entry["task"], len(task_to_index))
+        records.append({"key": key, "index_offset": total_frames, "task_index": task_index})
+        episode_info.append({"episode_index": new_ep_idx, "tasks": [entry["task"]], "length": entry["length"]})
+        total_frames += entry["length"]
+    
     print(f"\n=== Data Collection Summary ===")
-    print(f"Total frames collected: {len(all_data)}")
+    print(f"Total frames collected: {total_frames}")
     print(f"Total episodes: {len(episode_info)}")
-    print(f"Columns in dataset: {list(all_data[0].keys())}")
-    print(f"Episodes stats: {episodes_stats}")
-    
-    # Verify we have all essential columns
-    essential_columns = ['action', 'observation.state', 'timestamp', 'frame_index', 'episode_index', 'index', 'task_index']
-    missing_columns = [col for col in essential_columns if col not in all_data[0].keys()]
-    if missing_columns:
-        print(f"WARNING: Missing essential columns: {missing_columns}")
-    else:
-        print("✓ All essential columns present")
-    
-    # Create output directory
-    output_dir = Path("./filtered_dataset")
-    dataset_name = "so100_filtered_pick_green"
-    dataset_root = output_dir / dataset_name
-
-    # Remove existing directory if it exists, then create fresh one
-    if dataset_root.exists():
-        print(f"Removing existing directory: {dataset_root}")
-        import shutil
-        shutil.rmtree(dataset_root)
-
-    print(f"Creating fresh directory: {dataset_root}")
-    dataset_root.mkdir(parents=True, exist_ok=True)
-    
-    # Create videos directory if needed
-    if has_videos:
-        (dataset_root / "videos").mkdir(exist_ok=True)
-    
-    # Create HF dataset and save as parquet files
-    hf_data = {key: [row[key] for row in all_data] for key in all_data[0].keys()}
-    hf_dataset = datasets.Dataset.from_dict(hf_data, split="train")
-    
-    # Save each episode as separate parquet file
-    for ep_info in episode_info:
-        ep_idx = ep_info["episode_index"]
-        ep_chunk = ep_idx // DEFAULT_CHUNK_SIZE
-        
-        # Create chunk directory
-        chunk_dir = f"data/chunk-{ep_chunk:03d}"
-        (dataset_root / chunk_dir).mkdir(parents=True, exist_ok=True)
-        
-        # Filter and save episode data
-        ep_table = hf_dataset.data.table.filter(pc.equal(hf_dataset.data.table["episode_index"], ep_idx))
-        output_file = dataset_root / f"{chunk_dir}/episode_{ep_idx:06d}.parquet"
-        pq.write_table(ep_table, output_file)
-    
-    # Copy video files if they exist
-    if has_videos:
-        copy_video_files(original_episode_mappings, video_keys, dataset_root)
     
     # Create metadata files
     total_episodes = len(episode_info)
-    total_frames = len(all_data)
     total_chunks = (total_episodes // DEFAULT_CHUNK_SIZE) + (1 if total_episodes % DEFAULT_CHUNK_SIZE else 0)
     
-    # tasks.jsonl
-    tasks = [{"task_index": 0, "task": "Grasp the green cube and put it in the bin."}]
-    write_jsonlines(tasks, dataset_root / TASKS_PATH)
-    
-    # episodes.jsonl
-    write_jsonlines(episode_info, dataset_root / EPISODES_PATH)
-    
     # info.json with proper video handling
     metadata = {
         "codebase_version": "v2.1",
-        "robot_type": source_dataset.meta.robot_type,
+        "robot_type": source_meta.robot_type,
         "total_episodes": total_episodes,
         "total_frames": total_frames,
-        "total_tasks": 1,
+        "total_tasks": len(task_to_index),
         "total_videos": total_episodes * len(video_keys) if has_videos else 0,
         "total_chunks": total_chunks,
         "chunks_size": DEFAULT_CHUNK_SIZE,
-        "fps": source_dataset.meta.fps,
+        "fps": source_meta.fps,
         "splits": {"train": f"0:{total_episodes}"},
         "data_path": DEFAULT_PARQUET_PATH,
         "video_path": DEFAULT_VIDEO_PATH if has_videos else None,
-        "features": source_dataset.meta.features,
+        "features": copy.deepcopy(source_meta.features),
     }
+    if transcode:
+        update_video_features(metadata, transcode)
+    dataset_root.mkdir(parents=True, exist_ok=True)
     write_json(metadata, dataset_root / INFO_PATH)
-
-    for ep_idx in tqdm(range(total_episodes)):
-        write_episode_stats(ep_idx, episodes_stats[ep_idx], dataset_root)
     
-    print(f"✓ Created dataset: {total_episodes} episodes, {total_frames} frames")
+    # Rewrite only the output episodes whose source, task or index offset changed (or that were edited since)
+    previous = state["output"]
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        up_to_date = list(executor.map(
+            lambda i: is_assembled(dataset_root, metadata, build_root, records[i], previous[i] if i < len(previous) else None, i),
+            range(total_episodes),
+        ))
+        stale = [i for i in range(total_episodes) if not up_to_date[i]]
+        for ep_idx, parquet_sha256 in zip(stale, executor.map(
+            lambda i: assemble_episode(dataset_root, metadata, build_root, records[i], i), stale
+        )):
+            records[ep_idx]["parquet_sha256"] = parquet_sha256
+    for ep_idx in range(total_episodes):
+        records[ep_idx].setdefault("parquet_sha256", previous[ep_idx]["parquet_sha256"] if up_to_date[ep_idx] else None)
+    removed = remove_stale_outputs(dataset_root, total_episodes)
+    print(f"✓ Rewrote {len(stale)}/{total_episodes} episodes, removed {removed} files of dropped episodes")
+    
+    # tasks.jsonl
+    tasks = [{"task_index": task_index, "task": task} for task, task_index in task_to_index.items()]
+    write_jsonlines(tasks, dataset_root / TASKS_PATH)
+    
+    # episodes.jsonl
+    write_jsonlines(episode_info, dataset_root / EPISODES_PATH)
+    
+    # Stats are computed once per staged episode, only the re-indexed columns are patched for its new position
+    missing_stats = {}
+    for ep_idx, record in enumerate(records):
+        if state["episodes"][record["key"]]["stats"] is None:
+            missing_stats.setdefault(record["key"], ep_idx)
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = {
+            executor.submit(compute_episode_stats, dataset_root, metadata, ep_idx): key
+            for key, ep_idx in missing_stats.items()
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Computing stats"):
+            state["episodes"][futures[future]]["stats"] = serialize_stats(future.result())
+    
+    episodes_stats = []
+    accumulator = StatsAccumulator()
+    for ep_idx, record in enumerate(records):
+        entry = state["episodes"][record["key"]]
+        ep_stats = remap_episode_stats(
+            deserialize_stats(entry["stats"]), ep_idx, record["task_index"], record["index_offset"], entry["length"]
+        )
+        accumulator.update(ep_stats)
+        episodes_stats.append({"episode_index": ep_idx, "stats": serialize_stats(ep_stats)})
+    write_jsonlines(episodes_stats, dataset_root / EPISODES_STATS_PATH)
+    write_json(serialize_stats(accumulator.result()), dataset_root / STATS_FILE)
+    
+    # Record provenance and content hashes so `validate.py --verify` can detect drift later
+    manifest = []
+    for ep_idx, record in enumerate(records):
+        entry = state["episodes"][record["key"]]
+        manifest.append({
+            "episode_index": ep_idx,
+            "source_repo_id": entry["repo_id"],
+            "source_root": entry["source_root"],
+            "source_episode_index": entry["episode_id"],
+            "num_rows": entry["length"],
+            "parquet_sha256": record["parquet_sha256"],
+            "videos": entry["videos"],
+            "source": entry["source"],
+            **({"trim": entry["trim"]} if "trim" in entry else {}),
+            **({"transcoded": entry["transcoded"]} if "transcoded" in entry else {}),
+        })
+    write_jsonlines(manifest, dataset_root / MANIFEST_FILE)
+    
+    state["output"] = records
+    removed = remove_unused_staged(build_root, state, {record["key"] for record in records})
+    used_sources = set()
+    for _, _, ds_meta, ep_id, _, _ in selected:
+        used_sources.add(str(episode_data_path(ds_meta.root, ds_meta.info, ep_id)))
+        used_sources.update(str(episode_video_path(ds_meta.root, ds_meta.info, ep_id, key)) for key in ds_meta.video_keys)
+    state["source_hashes"] = {path: value for path, value in state["source_hashes"].items() if path in used_sources}
+    save_build_state(build_root, state)
+    
+    print(f"✓ Created dataset: {total_episodes} episodes, {total_frames} frames in {time.perf_counter() - start_time:.1f}s")
     print(f"✓ Video support: {has_videos}")
     if has_videos:
-        print(f"✓ Videos copied to: {dataset_root}/videos/")
-    print(f"✓ Created episodes_stats.jsonl with {len(episodes_stats)} episode statistics")
+        print(f"✓ Videos linked from the staging area: {build_root}")
+    print(f"✓ Dropped {removed} staged episodes that are no longer selected")
+    print(f"✓ Created episodes_stats.jsonl with {len(episodes_stats)} episode statistics and stats.json")
     
     # Validate dataset structure without loading through LeRobotDataset
     print(f"\nValidating dataset structure...")
@@ -325,83 +311,6 @@ def generate_dataset(judge_jsonl_path, repo_ids):
         print("⚠️  Dataset validation found some issues, but files were created")
         return False, dataset_root
 
-def update_task_index(dataset_root):
-    print(dataset_root)
-    episodes_path = dataset_root / "meta" / "episodes.jsonl"
-    print(episodes_path)
-    all_tasks = []
-    with open(episodes_path, 'r') as f:
-        for line in f:
-            episode = json.loads(line.strip())
-            all_tasks.extend(episode['tasks'])
-
-    # Create unique task list
-    unique_tasks = list(dict.fromkeys(all_tasks))
-
-    # Create mappings
-    task_to_id = {task: i for i, task in enumerate(unique_tasks)}
-    id_to_task = {i: task for i, task in enumerate(unique_tasks)}
-    print(task_to_id, id_to_task)
-
-    tasks_path = dataset_root / "meta" / "tasks.jsonl"
-    with open(tasks_path, 'w') as f:
-        for k, v in task_to_id.items():
-            f.write(json.dumps({"task_index": v, "task": k}) + '\n')
-
-    episodes_task_mapping = {}
-    with open(episodes_path, 'r') as f:
-        for line in f:
-            episode = json.loads(line.strip())
-            episode_id = episode['episode_index']
-            task = episode['tasks'][0]
-            episodes_task_mapping[episode_id] = task_to_id[task]
-    print(episodes_task_mapping)
-
-    updated_episodes = []
-    episodes_stats_path = dataset_root / "meta" / "episodes_stats.jsonl"
-    with open(episodes_stats_path, 'r') as f:
-        for line in f:
-            episode_stats = json.loads(line.strip())
-            episode_id = episode_stats['episode_index']
-            
-            print(episode_id)
-            print(episodes_task_mapping[episode_id])
-            print(episode_stats['stats']['task_index'])
-            
-            # Update the task_index stats with the mapped task value
-            mapped_task = episodes_task_mapping[episode_id]
-            episode_stats['stats']['task_index']['min'] = [mapped_task]
-            episode_stats['stats']['task_index']['max'] = [mapped_task]
-            episode_stats['stats']['task_index']['mean'] = [float(mapped_task)]  # Ensure it's a float for mean
-            
-            print(episode_stats['stats']['task_index'])
-            
-            # Add the modified episode to our list
-            updated_episodes.append(episode_stats)
-
-    # Write the updated data back to the file
-    with open(episodes_stats_path, 'w') as f:
-        for episode_stats in updated_episodes:
-            json_line = json.dumps(episode_stats)
-            f.write(json_line + '\n')
-
-    data_folder = dataset_root / "data"
-    parquet_files = glob.glob(os.path.join(data_folder, "**/*.parquet"), recursive=True)
-
-    print("All parquet files:")
-    for file in parquet_files:
-        print(file)
-        episode_match = re.search(r'episode_(\d+)', file)
-        if episode_match:
-            episode_id = episode_match.group(1)
-            episode_id = int(episode_id)
-            print(f"Episode ID: {episode_id}")
-            print(episodes_task_mapping[episode_id])
-            # update the task_index in the parquet file
-            df = pd.read_parquet(file)
-            df['task_index'] = episodes_task_mapping[episode_id]
-            df.to_parquet(file, index=False)
-
 def main():
     """Main execution function"""
     # Parse command line arguments
@@ -424,6 +333,73 @@ def main():
         default="DanqingZ/so100_filtered_pick_green",
         help="Hugging Face Hub repository ID for pushing the dataset (default: DanqingZ/so100_filtered_pick_green)"
     )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=8,
+        help="Number of worker processes used to compute dataset stats (default: 8)"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Discard the incremental build state and rebuild the dataset from scratch"
+    )
+    parser.add_argument(
+        "--trim_idle",
+        action="store_true",
+        help="Trim static frames at the start and end of every staged episode (cached by the incremental build)"
+    )
+    parser.add_argument(
+        "--trim_threshold",
+        type=float,
+        default=0.5,
+        help="Per-frame joint motion below which a frame is idle, in dataset units (default: 0.5)"
+    )
+    parser.add_argument(
+        "--trim_padding",
+        type=int,
+        default=5,
+        help="Idle frames kept before and after the motion (default: 5)"
+    )
+    parser.add_argument(
+        "--trim_min_length",
+        type=int,
+        default=30,
+        help="Never trim an episode below this length (default: 30)"
+    )
+    parser.add_argument(
+        "--transcode",
+        action="store_true",
+        help="Re-encode the videos of every staged episode for fast random access (cached by the incremental build)"
+    )
+    parser.add_argument(
+        "--transcode_width",
+        type=int,
+        default=320,
+        help="Transcoded video width (default: 320)"
+    )
+    parser.add_argument(
+        "--transcode_height",
+        type=int,
+        default=240,
+        help="Transcoded video height (default: 240)"
+    )
+    parser.add_argument(
+        "--transcode_gop",
+        type=int,
+        default=2,
+        help="Transcoded keyframe interval in frames (default: 2)"
+    )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="Also write the consolidated packed/ layout with its episode index (see consolidate.py)"
+    )
+    parser.add_argument(
+        "--virtual",
+        action="store_true",
+        help="Only create a zero-copy virtual dataset (meta/ only), materialize it later with virtual_dataset.py"
+    )
     
     args = parser.parse_args()
     
@@ -461,19 +437,40 @@ def main():
     print(f"Judge = 1: {judge_counts.get(1, 0)}")
     print(f"Judge = 2: {judge_counts.get(2, 0)}")
 
+    if args.virtual:
+        view_root = DEFAULT_DATASET_ROOT.with_name(DEFAULT_DATASET_ROOT.name + "_view")
+        create_virtual_dataset(judge_jsonl, repo_ids, view_root, num_workers=args.num_workers)
+        print(f"Materialize it with: python virtual_dataset.py materialize --root {view_root} --output_root {DEFAULT_DATASET_ROOT}")
+        return
+
     # Step 4: Create filtered dataset
-    success, dataset_root = generate_dataset(judge_jsonl_path=judge_jsonl, repo_ids=repo_ids)
+    trim_idle = None
+    if args.trim_idle:
+        trim_idle = {"threshold": args.trim_threshold, "padding": args.trim_padding, "min_length": args.trim_min_length}
+    transcode = None
+    if args.transcode:
+        transcode = {
+            "width": args.transcode_width,
+            "height": args.transcode_height,
+            "encoder": "libsvtav1",
+            "gop": args.transcode_gop,
+            "crf": 30,
+            "pix_fmt": "yuv420p",
+        }
+    success, dataset_root = generate_dataset(judge_jsonl_path=judge_jsonl, repo_ids=repo_ids, num_workers=args.num_workers,
+                                             rebuild=args.rebuild, trim_idle=trim_idle, transcode=transcode)
     if not success and dataset_root is None:
         print("Failed to create dataset")
         return
 
-    update_task_index(dataset_root)
+    if args.pack:
+        pack_dataset(dataset_root)
 
     # Automatically push to Hugging Face Hub with default settings
     hub_repo_id = args.hub_repo_id
     print(f"Dataset root: {dataset_root}")  
     dataset = LeRobotDataset(repo_id=hub_repo_id, root=dataset_root)
-    dataset.push_to_hub()
+    dataset.push_to_hub(allow_patterns=HUB_ALLOW_PATTERNS)
 
 
 if __name__ == "__main__":
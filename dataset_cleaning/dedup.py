@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Find near-duplicate episodes across several LeRobot datasets.
+
+Every episode is fingerprinted by resampling its observation.state and action
+trajectories to a fixed number of points (optionally with a few tiny grayscale
+frame thumbnails per camera). Fingerprints are indexed with Euclidean
+locality-sensitive hashing (p-stable random projections, several tables), so
+only episodes sharing a bucket are compared exactly instead of all pairs.
+Candidate pairs closer than --radius are merged into duplicate clusters.
+
+By default the clusters are only reported. With --judge_file, the episode of each
+cluster with the highest existing judge (the first one on ties) is kept and every
+other member is set to judge 0 with a "near-duplicate of" reason.
+
+Usage:
+    python dedup.py --repo_ids "DanqingZ/so100_test_pick_green_4,DanqingZ/so100_test_pick_green_5"
+    python dedup.py --repo_ids "..." --judge_file judge.jsonl
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from tqdm import tqdm
+
+from compute_stats import sample_video_frames
+from episode_io import episode_data_path, episode_video_path, load_info, read_episode_columns, video_keys
+from generate_judge import load_all_meta
+
+THUMBNAIL_SIZE = 8
+
+
+def resample(values: np.ndarray, num_points: int) -> np.ndarray:
+    """Linearly resample a (T, D) trajectory to (num_points, D) over normalized time"""
+    positions = np.linspace(0, len(values) - 1, num_points)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, len(values) - 1)
+    weight = (positions - lower)[:, None]
+    return values[lower] * (1 - weight) + values[upper] * weight
+
+
+def thumbnails(video_path, length: int, num_frames: int) -> np.ndarray:
+    """A few evenly spaced frames reduced to tiny grayscale thumbnails in [0, 1]"""
+    indices = np.round(np.linspace(0, length - 1, num_frames)).astype(int)
+    frames = sample_video_frames(video_path, indices).mean(axis=-1) / 255.0
+    rows = np.linspace(0, frames.shape[1] - 1, THUMBNAIL_SIZE).astype(int)
+    cols = np.linspace(0, frames.shape[2] - 1, THUMBNAIL_SIZE).astype(int)
+    return frames[:, rows][:, :, cols].ravel()
+
+
+def episode_fingerprint(args) -> tuple[np.ndarray, np.ndarray | None]:
+    dataset_root, info, ep_idx, num_points, num_thumbnails = args
+    columns = read_episode_columns(episode_data_path(dataset_root, info, ep_idx), ["observation.state", "action"])
+    trajectory = np.concatenate([columns["observation.state"], columns["action"]], axis=1).astype(np.float64)
+    fingerprint = np.concatenate([resample(trajectory, num_points).ravel(), [np.log(len(trajectory))]])
+
+    images = None
+    if num_thumbnails:
+        images = np.concatenate([
+            thumbnails(episode_video_path(dataset_root, info, ep_idx, vid_key), len(trajectory), num_thumbnails)
+            for vid_key in video_keys(info)
+        ])
+    return fingerprint, images
+
+
+class EuclideanLSH:
+    """p-stable LSH: h(v) = floor((a . v + b) / w), num_hashes concatenated per table"""
+
+    def __init__(self, dim: int, num_tables: int = 8, num_hashes: int = 6, bucket_width: float = 1.0, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.num_tables = num_tables
+        self.num_hashes = num_hashes
+        self.bucket_width = bucket_width
+        self.projections = rng.standard_normal((dim, num_tables * num_hashes))
+        self.offsets = rng.uniform(0, bucket_width, num_tables * num_hashes)
+
+    def candidate_pairs(self, vectors: np.ndarray) -> set[tuple[int, int]]:
+        """Pairs of rows that share a bucket in at least one table"""
+        codes = np.floor((vectors @ self.projections + self.offsets) / self.bucket_width).astype(np.int64)
+        pairs = set()
+        for t in range(self.num_tables):
+            table_codes = codes[:, t * self.num_hashes:(t + 1) * self.num_hashes]
+            _, bucket_ids = np.unique(table_codes, axis=0, return_inverse=True)
+            buckets = defaultdict(list)
+            for row, bucket_id in enumerate(bucket_ids.ravel()):
+                buckets[bucket_id].append(row)
+            for rows in buckets.values():
+                for i in range(len(rows)):
+                    for j in range(i + 1, len(rows)):
+                        pairs.add((rows[i], rows[j]))
+        return pairs
+
+
+def cluster_pairs(num_items: int, pairs) -> list[list[int]]:
+    """Union-find over duplicate pairs, return clusters with more than one member"""
+    parent = list(range(num_items))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    clusters = defaultdict(list)
+    for i in range(num_items):
+        clusters[find(i)].append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def find_duplicates(fingerprints: np.ndarray, radius: float, num_tables: int, num_hashes: int, seed: int = 0):
+    """Normalize fingerprints, query the LSH index and confirm candidates with exact distances"""
+    scale = fingerprints.std(axis=0)
+    scale[scale == 0] = 1.0
+    vectors = (fingerprints - fingerprints.mean(axis=0)) / scale / np.sqrt(fingerprints.shape[1])
+
+    lsh = EuclideanLSH(vectors.shape[1], num_tables, num_hashes, bucket_width=4 * radius, seed=seed)
+    candidates = np.array(sorted(lsh.candidate_pairs(vectors)), dtype=np.int64).reshape(-1, 2)
+    distances = np.linalg.norm(vectors[candidates[:, 0]] - vectors[candidates[:, 1]], axis=1)
+    duplicates = candidates[distances < radius]
+    print(f"LSH compared {len(candidates)} candidate pairs instead of {len(vectors) * (len(vectors) - 1) // 2}")
+    return cluster_pairs(len(vectors), map(tuple, duplicates))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate episodes across LeRobot datasets")
+    parser.add_argument(
+        "--repo_ids",
+        type=str,
+        required=True,
+        help="Comma-separated list of repository IDs (e.g., 'repo1,repo2,repo3')"
+    )
+    parser.add_argument("--judge_file", type=str, default=None,
+                        help="If set, keep the best-judged episode of each cluster and mark the others as judge 0 in this file")
+    parser.add_argument("--radius", type=float, default=0.05,
+                        help="Normalized fingerprint distance under which two episodes are duplicates (default: 0.05)")
+    parser.add_argument("--num_points", type=int, default=32, help="Trajectory resampling length (default: 32)")
+    parser.add_argument("--thumbnails", type=int, default=0,
+                        help="Number of frame thumbnails per camera added to the fingerprint, downloads videos (default: 0)")
+    parser.add_argument("--num_tables", type=int, default=8, help="Number of LSH tables (default: 8)")
+    parser.add_argument("--num_hashes", type=int, default=6, help="Number of hashes per LSH table (default: 6)")
+    parser.add_argument("--num_workers", type=int, default=8, help="Number of worker processes (default: 8)")
+    args = parser.parse_args()
+
+    repo_ids = [repo_id.strip() for repo_id in args.repo_ids.split(',') if repo_id.strip()]
+    if not repo_ids:
+        print("Error: No valid repository IDs provided")
+        return
+
+    episodes, jobs = [], []
+    for repo_id, ds_meta, error in load_all_meta(repo_ids, num_workers=args.num_workers):
+        if error is not None:
+            print(f"✗ Error processing {repo_id}: {error}")
+            continue
+        ds_meta.pull_from_repo(allow_patterns=["data/", "videos/"] if args.thumbnails else "data/")
+        info = load_info(ds_meta.root)
+        for ep_idx in range(ds_meta.total_episodes):
+            episodes.append((repo_id, ep_idx))
+            jobs.append((ds_meta.root, info, ep_idx, args.num_points, args.thumbnails))
+
+    with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+        results = list(tqdm(executor.map(episode_fingerprint, jobs, chunksize=8), total=len(jobs), desc="Fingerprinting"))
+
+    trajectory_dims = {len(fingerprint) for fingerprint, _ in results}
+    if len(trajectory_dims) != 1:
+        print("Error: datasets have different state/action dimensions, cannot compare them")
+        return
+    fingerprints = np.stack([fingerprint for fingerprint, _ in results])
+    if args.thumbnails:
+        if len({len(images) for _, images in results}) != 1:
+            print("Error: datasets have different numbers of cameras, cannot compare their thumbnails")
+            return
+        fingerprints = np.concatenate([fingerprints, np.stack([images for _, images in results])], axis=1)
+
+    lines, judges = [], {}
+    if args.judge_file:
+        with open(args.judge_file, 'r') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        judges = {(line["repo_id"], line["episode_id"]): line.get("judge", -1) for line in lines}
+
+    clusters = find_duplicates(fingerprints, args.radius, args.num_tables, args.num_hashes)
+
+    print(f"\n=== Found {len(clusters)} duplicate clusters ===")
+    duplicate_of = {}
+    for members in clusters:
+        # max() returns the first member on ties, so without judges the first episode is kept
+        kept = max(members, key=lambda i: judges.get(episodes[i], -1))
+        keep = episodes[kept]
+        others = [i for i in members if i != kept]
+        print(f"Keep {keep[0]} episode {keep[1]}, duplicates: "
+              + ", ".join(f"{episodes[i][0]} episode {episodes[i][1]}" for i in others))
+        for i in others:
+            duplicate_of[episodes[i]] = keep
+    print(f"{len(duplicate_of)} of {len(episodes)} episodes are duplicates")
+
+    if args.judge_file:
+        for line in lines:
+            keep = duplicate_of.get((line["repo_id"], line["episode_id"]))
+            if keep is not None:
+                line["judge"] = 0
+                line.setdefault("reasons", []).append(f"near-duplicate of {keep[0]} episode {keep[1]}")
+        with open(args.judge_file, 'w') as f:
+            for line in lines:
+                f.write(json.dumps(line) + '\n')
+        print(f"✓ Marked {len(duplicate_of)} duplicates as judge 0 in {args.judge_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Lightweight helpers for reading a local LeRobot v2.1 dataset directly from disk.
+
+These only depend on json/pyarrow/numpy so that the cleaning tools can work on
+any local dataset root without constructing a full LeRobotDataset.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+INFO_FILE = "meta/info.json"
+EPISODES_FILE = "meta/episodes.jsonl"
+TASKS_FILE = "meta/tasks.jsonl"
+EPISODES_STATS_FILE = "meta/episodes_stats.jsonl"
+
+
+def load_json(path: Path) -> dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_json(data: dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+def load_jsonlines(path: Path) -> list[dict]:
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_jsonlines(items: list[dict], path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        for item in items:
+            f.write(json.dumps(item) + '\n')
+
+
+def load_info(dataset_root: Path) -> dict:
+    return load_json(Path(dataset_root) / INFO_FILE)
+
+
+def episode_chunk(info: dict, ep_idx: int) -> int:
+    return ep_idx // info["chunks_size"]
+
+
+def episode_data_path(dataset_root: Path, info: dict, ep_idx: int) -> Path:
+    """Path of the parquet file holding one episode"""
+    rel = info["data_path"].format(episode_chunk=episode_chunk(info, ep_idx), episode_index=ep_idx)
+    return Path(dataset_root) / rel
+
+
+def episode_video_path(dataset_root: Path, info: dict, ep_idx: int, video_key: str) -> Path:
+    """Path of the mp4 file holding one camera of one episode"""
+    rel = info["video_path"].format(
+        episode_chunk=episode_chunk(info, ep_idx), video_key=video_key, episode_index=ep_idx
+    )
+    return Path(dataset_root) / rel
+
+
+def video_keys(info: dict) -> list[str]:
+    return [key for key, ft in info["features"].items() if ft["dtype"] == "video"]
+
+
+def image_keys(info: dict) -> list[str]:
+    return [key for key, ft in info["features"].items() if ft["dtype"] in ["image", "video"]]
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Content hash of a file, read in chunks so large videos are never loaded at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def column_to_numpy(column: pa.ChunkedArray | pa.Array) -> np.ndarray:
+    """Convert a scalar or (fixed size) list column to a numpy array without going through python objects"""
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    if pa.types.is_list(column.type) or pa.types.is_fixed_size_list(column.type) or pa.types.is_large_list(column.type):
+        values = column_to_numpy(column.flatten())
+        return values.reshape(len(column), -1) if len(column) else values.reshape(0, 0)
+    return column.to_numpy(zero_copy_only=False)
+
+
+def read_episode_columns(path: Path, columns: list[str] | None = None) -> dict[str, np.ndarray]:
+    """Read the requested columns of an episode parquet file as numpy arrays"""
+    table = pq.read_table(path, columns=columns)
+    return {name: column_to_numpy(table.column(name)) for name in table.column_names}
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+"""
+Export a local LeRobot dataset as tar shards for sequential streaming.
+
+Whole episodes (the parquet file and one mp4 per camera) are appended to tar
+shards, and a shard is closed once it reaches about --shard_size_mb, so every
+shard holds complete episodes. shards.json lists the episodes, frames and
+bytes of each shard together with the dataset tasks and features.
+
+ShardedStreamDataset is an IterableDataset reading the shards front to back:
+the shard order is shuffled per epoch, shards are split across distributed
+ranks and DataLoader workers, episodes are decoded sequentially (no seeking),
+and an optional shuffle buffer mixes frames across episodes.
+
+Usage:
+    python export_shards.py --dataset_root ./filtered_dataset/so100_filtered_pick_green --output_dir ./shards/so100_filtered_pick_green --benchmark
+"""
+
+import argparse
+import io
+import random
+import tarfile
+import time
+from pathlib import Path
+
+import av
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import torch
+from tqdm import tqdm
+
+from episode_io import (
+    EPISODES_FILE,
+    TASKS_FILE,
+    column_to_numpy,
+    episode_data_path,
+    episode_video_path,
+    load_info,
+    load_json,
+    load_jsonlines,
+    video_keys,
+    write_json,
+)
+
+SHARD_INDEX_FILE = "shards.json"
+
+
+def member_name(ep_idx: int, suffix: str) -> str:
+    return f"episode_{ep_idx:06d}.{suffix}"
+
+
+def export_shards(dataset_root: Path, output_dir: Path, shard_size_mb: float = 256) -> dict:
+    """Write shard-XXXXXX.tar files holding whole episodes, plus shards.json"""
+    dataset_root, output_dir = Path(dataset_root), Path(output_dir)
+    info = load_info(dataset_root)
+    episodes = load_jsonlines(dataset_root / EPISODES_FILE)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for old_shard in output_dir.glob("shard-*.tar"):
+        old_shard.unlink()
+
+    index = {
+        "fps": info["fps"],
+        "features": info["features"],
+        "video_keys": video_keys(info),
+        "tasks": {task["task_index"]: task["task"] for task in load_jsonlines(dataset_root / TASKS_FILE)},
+        "shards": [],
+    }
+    max_bytes = shard_size_mb * 1e6
+    tar, shard = None, None
+
+    def close_shard():
+        nonlocal tar, shard
+        if tar is not None:
+            tar.close()
+            shard["bytes"] = (output_dir / shard["file"]).stat().st_size
+            index["shards"].append(shard)
+        tar, shard = None, None
+
+    for episode in tqdm(episodes, desc="Writing shards"):
+        ep_idx = episode["episode_index"]
+        files = [(member_name(ep_idx, "parquet"), episode_data_path(dataset_root, info, ep_idx))]
+        files += [
+            (member_name(ep_idx, f"{vid_key}.mp4"), episode_video_path(dataset_root, info, ep_idx, vid_key))
+            for vid_key in index["video_keys"]
+        ]
+        episode_bytes = sum(path.stat().st_size for _, path in files)
+        if shard is not None and shard["bytes"] + episode_bytes > max_bytes:
+            close_shard()
+        if tar is None:
+            shard = {"file": f"shard-{len(index['shards']):06d}.tar", "episodes": [], "num_frames": 0, "bytes": 0}
+            tar = tarfile.open(output_dir / shard["file"], "w")
+        for name, path in files:
+            tar.add(path, arcname=name)
+        shard["episodes"].append(ep_idx)
+        shard["num_frames"] += episode["length"]
+        shard["bytes"] += episode_bytes
+    close_shard()
+
+    write_json(index, output_dir / SHARD_INDEX_FILE)
+    print(f"✓ Exported {len(episodes)} episodes into {len(index['shards'])} shards under {output_dir}")
+    return index
+
+
+def decode_video_bytes(data: bytes) -> np.ndarray:
+    with av.open(io.BytesIO(data)) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        return np.stack([frame.to_ndarray(format="rgb24") for frame in container.decode(stream)])
+
+
+class ShardedStreamDataset(torch.utils.data.IterableDataset):
+    """Stream frames from tar shards, partitioned across ranks and DataLoader workers"""
+
+    def __init__(self, shard_dir: Path, shuffle: bool = True, shuffle_buffer: int = 0, seed: int = 0,
+                 rank: int = 0, world_size: int = 1, decode_videos: bool = True):
+        self.shard_dir = Path(shard_dir)
+        self.index = load_json(self.shard_dir / SHARD_INDEX_FILE)
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.rank, self.world_size = rank, world_size
+        self.decode_videos = decode_videos
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def worker_shards(self) -> list[dict]:
+        """Shards of this rank and DataLoader worker for the current epoch"""
+        shards = list(self.index["shards"])
+        if self.shuffle:
+            random.Random(self.seed + self.epoch).shuffle(shards)
+        shards = shards[self.rank::self.world_size]
+        worker_info = torch.utils.data.get_worker_info()
+        if worker_info is not None:
+            shards = shards[worker_info.id::worker_info.num_workers]
+        return shards
+
+    def iter_episodes(self, shard: dict):
+        """Yield (parquet table, {video_key: frames}) for every episode of a shard, reading the tar sequentially"""
+        expected = 1 + len(self.index["video_keys"])
+        members = {}
+        with tarfile.open(self.shard_dir / shard["file"], "r|") as tar:
+            for member in tar:
+                ep_name, suffix = member.name.split(".", 1)
+                members.setdefault(ep_name, {})[suffix] = tar.extractfile(member).read()
+                if len(members[ep_name]) == expected:
+                    files = members.pop(ep_name)
+                    table = pq.read_table(pa.BufferReader(files["parquet"]))
+                    videos = {
+                        vid_key: decode_video_bytes(files[f"{vid_key}.mp4"]) if self.decode_videos else None
+                        for vid_key in self.index["video_keys"]
+                    }
+                    yield table, videos
+
+    def iter_frames(self):
+        for shard in self.worker_shards():
+            for table, videos in self.iter_episodes(shard):
+                columns = {name: torch.from_numpy(column_to_numpy(table.column(name))) for name in table.column_names}
+                for i in range(len(table)):
+                    item = {name: column[i] for name, column in columns.items()}
+                    for vid_key, frames in videos.items():
+                        if frames is not None:
+                            item[vid_key] = torch.from_numpy(frames[min(i, len(frames) - 1)]).permute(2, 0, 1).float() / 255
+                    item["task"] = self.index["tasks"][str(item["task_index"].item())]
+                    yield item
+
+    def __iter__(self):
+        if self.shuffle_buffer <= 1:
+            yield from self.iter_frames()
+            return
+        worker_info = torch.utils.data.get_worker_info()
+        worker_id = 0 if worker_info is None else worker_info.id
+        # A distinct stream per (seed, epoch, rank, worker); sums like seed + epoch + rank collide across them
+        rng = random.Random(f"{self.seed}-{self.epoch}-{self.rank}-{worker_id}")
+        buffer = []
+        for item in self.iter_frames():
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(item)
+                continue
+            pos = rng.randrange(len(buffer))
+            yield buffer[pos]
+            buffer[pos] = item
+        rng.shuffle(buffer)
+        yield from buffer
+
+
+def read_bytes(paths: list[Path], chunk_size: int = 1 << 20) -> int:
+    total = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                total += len(chunk)
+    return total
+
+
+def benchmark(dataset_root: Path, shard_dir: Path, decode_frames: bool = True):
+    """Sequential read throughput of the per-episode layout vs the shards (run on a cold page cache for disk numbers)"""
+    dataset_root, shard_dir = Path(dataset_root), Path(shard_dir)
+    info = load_info(dataset_root)
+    episode_indices = [ep["episode_index"] for ep in load_jsonlines(dataset_root / EPISODES_FILE)]
+    episode_files = [episode_data_path(dataset_root, info, ep) for ep in episode_indices]
+    episode_files += [episode_video_path(dataset_root, info, ep, key) for ep in episode_indices for key in video_keys(info)]
+    shard_files = [shard_dir / shard["file"] for shard in load_json(shard_dir / SHARD_INDEX_FILE)["shards"]]
+
+    print(f"\n=== Sequential read benchmark ({len(episode_indices)} episodes) ===")
+    for name, paths in [("per-episode files", episode_files), ("shards", shard_files)]:
+        start = time.perf_counter()
+        num_bytes = read_bytes(paths)
+        elapsed = time.perf_counter() - start
+        print(f"{name:20s}: {len(paths):6d} files | {num_bytes / elapsed / 1e6:10.1f} MB/s")
+
+    if decode_frames:
+        stream = ShardedStreamDataset(shard_dir, shuffle=False)
+        start = time.perf_counter()
+        num_frames = sum(1 for _ in stream)
+        print(f"{'stream frames':20s}: {num_frames / (time.perf_counter() - start):10.1f} frames/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a local LeRobot dataset as tar shards for streaming")
+    parser.add_argument("--dataset_root", type=str, required=True, help="Root directory of the local dataset")
+    parser.add_argument("--output_dir", type=str, required=True, help="Directory of the shards")
+    parser.add_argument("--shard_size_mb", type=float, default=256, help="Target shard size in MB (default: 256)")
+    parser.add_argument("--benchmark", action="store_true", help="Compare sequential reads of both layouts")
+    args = parser.parse_args()
+
+    export_shards(Path(args.dataset_root), Path(args.output_dir), args.shard_size_mb)
+    if args.benchmark:
+        benchmark(Path(args.dataset_root), Path(args.output_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+"""
+Pre-decoded, memory-mapped frame cache for training on a local LeRobot dataset.
+
+Every frame of the selected camera keys is decoded once (optionally resized)
+into a uint8 memmap per camera, laid out in dataset row order, with
+cache_index.json recording the episode -> (first row, length) index. The
+estimated size is printed before anything is decoded.
+
+When the whole dataset does not fit in --max_gb, a partial cache is built
+instead: a fixed number of episode slots managed with an LRU policy, filled
+lazily by decoding on a miss, with separate slot files per DataLoader worker.
+
+CachedFrameDataset wraps a LeRobotDataset and serves camera frames from the
+cache instead of decoding video. --benchmark compares frames/s of both paths.
+
+Usage:
+    python frame_cache.py --repo_id DanqingZ/so100_filtered_pick_green --root ./filtered_dataset/so100_filtered_pick_green --cache_dir ./frame_cache --width 224 --height 224 --benchmark
+"""
+
+import argparse
+import json
+import random
+import shutil
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import av
+import numpy as np
+import torch
+from tqdm import tqdm
+
+from episode_io import EPISODES_FILE, episode_video_path, load_info, load_jsonlines, video_keys
+
+CACHE_INDEX_FILE = "cache_index.json"
+
+
+def decode_all_frames(video_path: Path, width: int | None = None, height: int | None = None) -> np.ndarray:
+    """Decode every frame of a video as (T, H, W, 3) uint8, resized if width/height are given"""
+    with av.open(str(video_path)) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        return np.stack([
+            frame.to_ndarray(format="rgb24", width=width, height=height) for frame in container.decode(stream)
+        ])
+
+
+def frame_shape(info: dict, vid_key: str, width: int | None, height: int | None) -> tuple[int, int, int]:
+    video_info = info["features"][vid_key].get("info", {})
+    return (
+        height or video_info.get("video.height", info["features"][vid_key]["shape"][0]),
+        width or video_info.get("video.width", info["features"][vid_key]["shape"][1]),
+        3,
+    )
+
+
+def estimate_cache_bytes(dataset_root: Path, camera_keys: list[str], width: int | None, height: int | None) -> int:
+    info = load_info(dataset_root)
+    return sum(info["total_frames"] * int(np.prod(frame_shape(info, key, width, height))) for key in camera_keys)
+
+
+def _decode_episode_job(args):
+    """Decode one episode of one camera straight into its rows of the memmap"""
+    cache_file, total_shape, video_path, start, length, width, height = args
+    frames = decode_all_frames(video_path, width, height)[:length]
+    if len(frames) != length:
+        raise ValueError(f"{video_path} decodes to {len(frames)} frames, but its episode has {length}")
+    cache = np.memmap(cache_file, dtype=np.uint8, mode="r+", shape=tuple(total_shape))
+    cache[start:start + len(frames)] = frames
+    cache.flush()
+    return len(frames)
+
+
+def build_cache(dataset_root: Path, cache_dir: Path, camera_keys: list[str] | None = None, width: int | None = None,
+                height: int | None = None, num_workers: int = 8) -> dict:
+    """Decode every frame of the selected cameras into one uint8 memmap per camera"""
+    dataset_root, cache_dir = Path(dataset_root), Path(cache_dir)
+    info = load_info(dataset_root)
+    camera_keys = camera_keys or video_keys(info)
+    episodes = load_jsonlines(dataset_root / EPISODES_FILE)
+
+    index = {"width": width, "height": height, "keys": {}, "episodes": {}}
+    start = 0
+    for episode in episodes:
+        index["episodes"][str(episode["episode_index"])] = [start, episode["length"]]
+        start += episode["length"]
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    jobs = []
+    for vid_key in camera_keys:
+        shape = [start, *frame_shape(info, vid_key, width, height)]
+        cache_file = cache_dir / f"{vid_key}.u8"
+        np.memmap(cache_file, dtype=np.uint8, mode="w+", shape=tuple(shape)).flush()
+        index["keys"][vid_key] = {"file": cache_file.name, "shape": shape}
+        for ep_idx, (ep_start, length) in index["episodes"].items():
+            video_path = episode_video_path(dataset_root, info, int(ep_idx), vid_key)
+            jobs.append((cache_file, shape, video_path, ep_start, length, width, height))
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        decoded = sum(tqdm(executor.map(_decode_episode_job, jobs), total=len(jobs), desc="Decoding frames"))
+
+    with open(cache_dir / CACHE_INDEX_FILE, 'w') as f:
+        json.dump(index, f)
+    print(f"✓ Cached {decoded} frames of {camera_keys} in {cache_dir}")
+    return index
+
+
+class FullFrameCache:
+    """Frames of every episode, row-aligned with the dataset"""
+
+    def __init__(self, cache_dir: Path):
+        cache_dir = Path(cache_dir)
+        with open(cache_dir / CACHE_INDEX_FILE, 'r') as f:
+            self.index = json.load(f)
+        self.arrays = {
+            key: np.memmap(cache_dir / entry["file"], dtype=np.uint8, mode="r", shape=tuple(entry["shape"]))
+            for key, entry in self.index["keys"].items()
+        }
+
+    @property
+    def camera_keys(self) -> list[str]:
+        return list(self.arrays)
+
+    def get(self, vid_key: str, ep_idx: int, frames: np.ndarray) -> np.ndarray:
+        start, _ = self.index["episodes"][str(ep_idx)]
+        return self.arrays[vid_key][start + frames]
+
+
+class LRUFrameCache:
+    """Partial cache: a fixed number of episode slots per camera, evicting the least recently used episode
+
+    Slots are process-local, so every DataLoader worker maps its own `<key>.lru.<worker>.u8` files, created on its
+    first get(). Nothing is mapped before the cache is pickled or forked into the workers.
+    """
+
+    def __init__(self, dataset_root: Path, cache_dir: Path, camera_keys: list[str], num_slots: int,
+                 width: int | None = None, height: int | None = None):
+        self.dataset_root = Path(dataset_root)
+        self.info = load_info(self.dataset_root)
+        self.width, self.height = width, height
+        self.num_slots = num_slots
+        max_length = max(ep["length"] for ep in load_jsonlines(self.dataset_root / EPISODES_FILE))
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.shapes = {
+            key: (num_slots, max_length, *frame_shape(self.info, key, width, height)) for key in camera_keys
+        }
+        self.worker = None
+        self.arrays, self.slots = {}, {}
+        self.hits, self.misses = 0, 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.update(worker=None, arrays={}, slots={})
+        return state
+
+    @property
+    def camera_keys(self) -> list[str]:
+        return list(self.shapes)
+
+    def _open(self):
+        """Map this process' slot files, once per DataLoader worker (or once in the main process)"""
+        worker_info = torch.utils.data.get_worker_info()
+        worker = f"worker{worker_info.id}" if worker_info is not None else "main"
+        if worker == self.worker:
+            return
+        self.arrays = {
+            key: np.memmap(self.cache_dir / f"{key}.lru.{worker}.u8", dtype=np.uint8, mode="w+", shape=shape)
+            for key, shape in self.shapes.items()
+        }
+        # ep_idx -> (slot, number of decoded frames)
+        self.slots = {key: OrderedDict() for key in self.shapes}
+        self.worker = worker
+
+    def get(self, vid_key: str, ep_idx: int, frames: np.ndarray) -> np.ndarray:
+        self._open()
+        slots = self.slots[vid_key]
+        if ep_idx in slots:
+            slots.move_to_end(ep_idx)
+            self.hits += 1
+        else:
+            self.misses += 1
+            slot = len(slots) if len(slots) < self.num_slots else slots.popitem(last=False)[1][0]
+            decoded = decode_all_frames(
+                episode_video_path(self.dataset_root, self.info, ep_idx, vid_key), self.width, self.height
+            )[:self.shapes[vid_key][1]]
+            self.arrays[vid_key][slot, :len(decoded)] = decoded
+            slots[ep_idx] = (slot, len(decoded))
+        slot, length = slots[ep_idx]
+        frames = np.asarray(frames)
+        if frames.size and frames.max() >= length:
+            raise IndexError(f"Frame {frames.max()} of episode {ep_idx} requested, but {vid_key} only has {length} frames")
+        return self.arrays[vid_key][slot, frames]
+
+
+class CachedFrameDataset(torch.utils.data.Dataset):
+    """Wrap a LeRobotDataset so camera frames come from a frame cache instead of video decoding"""
+
+    def __init__(self, dataset, cache):
+        self.dataset = dataset
+        self.cache = cache
+        # episode_data_index follows the order of dataset.episodes, so it is keyed by position, not episode id
+        self.episode_bounds = {
+            int(ep): (int(start), int(end)) for ep, start, end in zip(
+                dataset.episodes or range(dataset.meta.total_episodes),
+                dataset.episode_data_index["from"],
+                dataset.episode_data_index["to"],
+            )
+        }
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx) -> dict:
+        dataset = self.dataset
+        idx = int(idx)
+        item = dataset.hf_dataset[idx]
+        ep_idx = item["episode_index"].item()
+        ep_start, ep_end = self.episode_bounds[ep_idx]
+
+        query_indices = None
+        if dataset.delta_indices is not None:
+            # Same window as LeRobotDataset._get_query_indices, from the bounds of ep_idx in this subset
+            query_indices = {
+                key: [max(ep_start, min(ep_end - 1, idx + delta)) for delta in deltas]
+                for key, deltas in dataset.delta_indices.items()
+            }
+            padding = {
+                f"{key}_is_pad": torch.BoolTensor([not ep_start <= idx + delta < ep_end for delta in deltas])
+                for key, deltas in dataset.delta_indices.items()
+            }
+            query_result = dataset._query_hf_dataset(query_indices)
+            item = {**item, **padding}
+            item.update(query_result)
+
+        for vid_key in self.cache.camera_keys:
+            rows = query_indices[vid_key] if query_indices and vid_key in query_indices else [idx]
+            frames = self.cache.get(vid_key, ep_idx, np.asarray(rows) - ep_start)
+            frames = torch.from_numpy(np.ascontiguousarray(frames)).permute(0, 3, 1, 2).float() / 255
+            item[vid_key] = frames if query_indices and vid_key in query_indices else frames[0]
+
+        if dataset.image_transforms is not None:
+            for cam in dataset.meta.camera_keys:
+                if cam in item:
+                    item[cam] = dataset.image_transforms(item[cam])
+
+        item["task"] = dataset.meta.tasks[item["task_index"].item()]
+        return item
+
+
+def benchmark(dataset, cached_dataset, num_samples: int = 500, seed: int = 0):
+    """Random-access frames/s of the video decoding path vs the cache"""
+    rng = random.Random(seed)
+    indices = [rng.randrange(len(dataset)) for _ in range(num_samples)]
+    results = {}
+    for name, ds in [("video decoding", dataset), ("frame cache", cached_dataset)]:
+        start = time.perf_counter()
+        for idx in indices:
+            ds[idx]
+        results[name] = num_samples / (time.perf_counter() - start)
+        print(f"{name:15s}: {results[name]:8.1f} frames/s")
+    return results
+
+
+def main():
+    from lerobot.common.datasets.lerobot_dataset import LeRobotDataset
+
+    parser = argparse.ArgumentParser(description="Build a memory-mapped frame cache for a local LeRobot dataset")
+    parser.add_argument("--repo_id", type=str, required=True, help="Repository ID of the dataset")
+    parser.add_argument("--root", type=str, required=True, help="Local root directory of the dataset")
+    parser.add_argument("--cache_dir", type=str, required=True, help="Directory of the frame cache")
+    parser.add_argument("--camera_keys", type=str, default=None, help="Comma-separated camera keys (default: all)")
+    parser.add_argument("--width", type=int, default=None, help="Resize frames to this width (default: keep)")
+    parser.add_argument("--height", type=int, default=None, help="Resize frames to this height (default: keep)")
+    parser.add_argument("--max_gb", type=float, default=None,
+                        help="Build an LRU partial cache when the full cache would be larger than this")
+    parser.add_argument("--num_workers", type=int, default=8, help="Number of decoding processes (default: 8)")
+    parser.add_argument("--benchmark", action="store_true", help="Compare frames/s of the video path and the cache")
+    args = parser.parse_args()
+
+    dataset_root, cache_dir = Path(args.root), Path(args.cache_dir)
+    info = load_info(dataset_root)
+    camera_keys = args.camera_keys.split(',') if args.camera_keys else video_keys(info)
+
+    full_bytes = estimate_cache_bytes(dataset_root, camera_keys, args.width, args.height)
+    print(f"Full cache size: {full_bytes / 1e9:.2f} GB for {info['total_frames']} frames x {len(camera_keys)} cameras")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Free disk space in {cache_dir}: {shutil.disk_usage(cache_dir).free / 1e9:.2f} GB")
+
+    dataset = LeRobotDataset(args.repo_id, root=dataset_root)
+    if args.max_gb is not None and full_bytes > args.max_gb * 1e9:
+        bytes_per_slot = full_bytes / info["total_frames"] * max(ep["length"] for ep in dataset.meta.episodes.values())
+        num_slots = max(1, int(args.max_gb * 1e9 // bytes_per_slot))
+        print(f"Building a partial LRU cache with {num_slots}/{info['total_episodes']} episode slots")
+        cache = LRUFrameCache(dataset_root, cache_dir, camera_keys, num_slots, args.width, args.height)
+    else:
+        build_cache(dataset_root, cache_dir, camera_keys, args.width, args.height, args.num_workers)
+        cache = FullFrameCache(cache_dir)
+
+    if args.benchmark:
+        benchmark(dataset, CachedFrameDataset(dataset, cache))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,71 @@
-from lerobot.common.datasets.lerobot_dataset import (
-    LeRobotDataset,
-    LeRobotDatasetMetadata,
-)
+from lerobot.common.datasets.lerobot_dataset import LeRobotDatasetMetadata
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import os
 import json
 import argparse
 
-def repo_meta(repo_id: str):
-    ds_meta = LeRobotDatasetMetadata(repo_id)
+def load_judged_episodes(judge_jsonl_path, judge=2):
+    """Map repo_id -> episode ids with the given judge score, in file order"""
+    episodes = defaultdict(list)
+    with open(judge_jsonl_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                data = json.loads(line)
+                if data.get('judge') == judge:
+                    episodes[data['repo_id']].append(data['episode_id'])
+    return episodes
+
+def load_repo_meta(repo_id: str):
+    """Load only meta/ (info.json, episodes.jsonl, tasks.jsonl) of a dataset, no parquet or video is downloaded"""
+    try:
+        return repo_id, LeRobotDatasetMetadata(repo_id), None
+    except Exception as e:
+        return repo_id, None, e
+
+def load_all_meta(repo_ids, num_workers=8):
+    """Fetch the metadata of many repos concurrently, keeping the input order"""
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        return list(executor.map(load_repo_meta, repo_ids))
+
+def repo_meta(repo_id: str, ds_meta: LeRobotDatasetMetadata):
     total_episodes: int = ds_meta.total_episodes
     print(repo_id)
     print(f"Total number of episodes: {total_episodes}")
-    dataset = LeRobotDataset(repo_id)
-    print(dataset)
+    print(f"Total number of frames: {ds_meta.total_frames}")
     for i in range(total_episodes):
-        task = dataset[i]['task']
-        print(task)
+        print(ds_meta.episodes[i]['tasks'])
 
-def generate_judge_jsonl(repo_ids, output_file):
+def generate_judge_jsonl(repo_metas, output_file):
     """Generate JSONL file with repo_id, episode_id, and judge fields"""
     with open(output_file, 'w') as f:
-        for repo_id in repo_ids:
-            try:
-                print(f"Processing {repo_id}...")
-                ds_meta = LeRobotDatasetMetadata(repo_id)
-                dataset = LeRobotDataset(repo_id)
-                
-                total_episodes = ds_meta.total_episodes
-                print(f"  Total episodes: {total_episodes}")
-                
-                for i in range(total_episodes):
-                    json_obj = {
-                        "repo_id": repo_id,
-                        "episode_id": i,
-                        "judge": 2
-                    }
-                    f.write(json.dumps(json_obj) + '\n')
-                    
-                    if (i + 1) % 10 == 0 or i == total_episodes - 1:
-                        print(f"  Processed {i + 1}/{total_episodes} episodes")
-                
-                print(f"✓ Completed {repo_id}")
-                
-            except Exception as e:
-                print(f"✗ Error processing {repo_id}: {e}")
+        for repo_id, ds_meta, error in repo_metas:
+            if error is not None:
+                print(f"✗ Error processing {repo_id}: {error}")
                 continue
 
+            print(f"Processing {repo_id}...")
+            total_episodes = ds_meta.total_episodes
+            print(f"  Total episodes: {total_episodes}")
+
+            for i in range(total_episodes):
+                json_obj = {
+                    "repo_id": repo_id,
+                    "episode_id": i,
+                    "judge": 2
+                }
+                f.write(json.dumps(json_obj) + '\n')
+
+            print(f"✓ Completed {repo_id}")
+
 def main():
     """Main execution function"""
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Process LeRobot datasets")
     parser.add_argument(
-        "--repo_ids", 
-        type=str, 
+        "--repo_ids",
+        type=str,
         required=True,
         help="Comma-separated list of repository IDs (e.g., 'repo1,repo2,repo3')"
     )
@@ -62,30 +75,38 @@ def main():
         default="judge.jsonl",
         help="Output JSONL file name (default: judge.jsonl)"
     )
-    
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=8,
+        help="Number of repositories whose metadata is fetched concurrently (default: 8)"
+    )
+
     args = parser.parse_args()
-    
+
     # Parse comma-separated repo_ids into a list
     repo_ids = [repo_id.strip() for repo_id in args.repo_ids.split(',') if repo_id.strip()]
-    
+
     if not repo_ids:
         print("Error: No valid repository IDs provided")
         return
-    
+
     print(f"Processing {len(repo_ids)} repositories: {repo_ids}")
-    
+    repo_metas = load_all_meta(repo_ids, num_workers=args.num_workers)
+
     # Step 1: Show original dataset info
     print("=== Original Datasets Info ===")
-    for repo_id in repo_ids:
-        repo_meta(repo_id)
-    
+    for repo_id, ds_meta, error in repo_metas:
+        if error is None:
+            repo_meta(repo_id, ds_meta)
+
     # Step 2: Generate or load judge file
     judge_jsonl = args.output_file
     if not os.path.exists(judge_jsonl):
-        generate_judge_jsonl(repo_ids, judge_jsonl)
+        generate_judge_jsonl(repo_metas, judge_jsonl)
         print(f"Generated {judge_jsonl}")
     else:
         print(f"Judge file {judge_jsonl} already exists, skipping generation")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
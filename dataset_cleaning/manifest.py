@@ -0,0 +1,90 @@
+"""
+Checksum manifest of a filtered dataset.
+
+generate_dataset writes one line per output episode to meta/manifest.jsonl with
+its source (repo id, local root and episode), row count and the content hashes
+of its parquet and mp4 files, both for the output and for the source files it
+was copied from. `python validate.py --verify <dataset_root>` re-checks the
+whole dataset against it.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from episode_io import (
+    episode_data_path,
+    episode_video_path,
+    file_sha256,
+    load_info,
+    load_jsonlines,
+    video_keys,
+    write_jsonlines,
+)
+
+MANIFEST_FILE = "meta/manifest.jsonl"
+
+
+def file_fingerprint(dataset_root: Path, info: dict, ep_idx: int) -> dict:
+    """Row count and content hashes of the parquet and video files of one episode"""
+    data_path = episode_data_path(dataset_root, info, ep_idx)
+    return {
+        "num_rows": pq.ParquetFile(data_path).metadata.num_rows,
+        "parquet_sha256": file_sha256(data_path),
+        "videos": {
+            vid_key: file_sha256(episode_video_path(dataset_root, info, ep_idx, vid_key))
+            for vid_key in video_keys(info)
+        },
+    }
+
+
+def build_manifest_entry(dataset_root: Path, info: dict, mapping: dict, source_root: Path) -> dict:
+    """Manifest line for one output episode, mapping is an entry of original_episode_mappings"""
+    source_info = load_info(source_root)
+    output = file_fingerprint(dataset_root, info, mapping["new_episode_idx"])
+    source = file_fingerprint(source_root, source_info, mapping["original_episode_idx"])
+    return {
+        "episode_index": mapping["new_episode_idx"],
+        "source_repo_id": mapping["original_repo_id"],
+        "source_root": str(source_root),
+        "source_episode_index": mapping["original_episode_idx"],
+        **output,
+        "source": source,
+    }
+
+
+def write_manifest(dataset_root: Path, original_episode_mappings: list[dict], source_roots: dict[str, Path], num_workers: int = 8) -> list[dict]:
+    """Hash every output episode and its source in parallel and write meta/manifest.jsonl"""
+    dataset_root = Path(dataset_root)
+    info = load_info(dataset_root)
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        entries = list(executor.map(
+            lambda mapping: build_manifest_entry(dataset_root, info, mapping, source_roots[mapping["original_repo_id"]]),
+            original_episode_mappings,
+        ))
+    write_jsonlines(entries, dataset_root / MANIFEST_FILE)
+    print(f"✓ Wrote manifest with {len(entries)} episodes to {dataset_root / MANIFEST_FILE}")
+    return entries
+
+
+def load_manifest(dataset_root: Path) -> list[dict]:
+    return load_jsonlines(Path(dataset_root) / MANIFEST_FILE)
+
+
+def refresh_manifest(dataset_root: Path, episode_indices: list[int], changes: dict[int, dict] | None = None, num_workers: int = 8):
+    """Re-hash the output files of episodes that were rewritten in place, optionally recording extra fields"""
+    dataset_root = Path(dataset_root)
+    if not (dataset_root / MANIFEST_FILE).exists():
+        return
+    info = load_info(dataset_root)
+    entries = {entry["episode_index"]: entry for entry in load_manifest(dataset_root)}
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        fingerprints = dict(zip(
+            episode_indices,
+            executor.map(lambda ep_idx: file_fingerprint(dataset_root, info, ep_idx), episode_indices),
+        ))
+    for ep_idx, fingerprint in fingerprints.items():
+        entries[ep_idx].update(fingerprint)
+        entries[ep_idx].update((changes or {}).get(ep_idx, {}))
+    write_jsonlines([entries[ep_idx] for ep_idx in sorted(entries)], dataset_root / MANIFEST_FILE)
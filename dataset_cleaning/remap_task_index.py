@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Remap task_index of a local LeRobot dataset from meta/episodes.jsonl.
+
+generate_dataset already writes the correct task_index, so this is only needed
+for datasets produced elsewhere or edited by hand. Only the task_index column is
+replaced (through Arrow, other columns are passed through untouched), parquet
+files that already hold the right value are skipped, and files are rewritten in
+parallel.
+
+Usage:
+    python remap_task_index.py --dataset_root ./filtered_dataset/so100_filtered_pick_green
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from compute_stats import STATS_FILE, StatsAccumulator, deserialize_stats, serialize_stats
+from episode_io import (
+    EPISODES_FILE,
+    EPISODES_STATS_FILE,
+    INFO_FILE,
+    TASKS_FILE,
+    episode_data_path,
+    load_info,
+    load_jsonlines,
+    write_json,
+    write_jsonlines,
+)
+from manifest import refresh_manifest
+
+
+def build_task_mapping(episodes: list[dict]) -> dict[str, int]:
+    """Assign task indices in order of first appearance in episodes.jsonl"""
+    unique_tasks = list(dict.fromkeys(task for episode in episodes for task in episode["tasks"]))
+    return {task: i for i, task in enumerate(unique_tasks)}
+
+
+def rewrite_task_index_column(parquet_path: Path, task_index: int) -> bool:
+    """Replace the task_index column of one parquet file, return True if the file was rewritten"""
+    table = pq.read_table(parquet_path)
+    col_idx = table.schema.get_field_index("task_index")
+    column = table.column(col_idx)
+    if len(column) and pc.all(pc.equal(column, task_index)).as_py():
+        return False
+
+    new_column = pa.array(np.full(len(table), task_index), type=column.type)
+    table = table.set_column(col_idx, table.schema.field(col_idx), new_column)
+    pq.write_table(table, parquet_path)
+    return True
+
+
+def remap_task_index(dataset_root: Path, num_workers: int = 8) -> dict[int, int]:
+    """Rewrite tasks.jsonl, task_index stats and task_index parquet columns, return episode -> task_index"""
+    dataset_root = Path(dataset_root)
+    info = load_info(dataset_root)
+    episodes = load_jsonlines(dataset_root / EPISODES_FILE)
+
+    task_to_id = build_task_mapping(episodes)
+    write_jsonlines([{"task_index": v, "task": k} for k, v in task_to_id.items()], dataset_root / TASKS_FILE)
+    episodes_task_mapping = {ep["episode_index"]: task_to_id[ep["tasks"][0]] for ep in episodes}
+    print(f"Found {len(task_to_id)} tasks over {len(episodes)} episodes")
+
+    episodes_stats_path = dataset_root / EPISODES_STATS_FILE
+    if episodes_stats_path.exists():
+        episodes_stats = load_jsonlines(episodes_stats_path)
+        for episode_stats in episodes_stats:
+            mapped_task = episodes_task_mapping[episode_stats["episode_index"]]
+            task_stats = episode_stats["stats"]["task_index"]
+            task_stats["min"] = [mapped_task]
+            task_stats["max"] = [mapped_task]
+            task_stats["mean"] = [float(mapped_task)]
+            task_stats["std"] = [0.0]
+            for key in task_stats:
+                if key.startswith("q"):
+                    task_stats[key] = [float(mapped_task)]
+        write_jsonlines(episodes_stats, episodes_stats_path)
+
+        # stats.json aggregates the episode stats, so its task_index entry is re-aggregated from the patched ones
+        accumulator = StatsAccumulator()
+        for episode_stats in episodes_stats:
+            accumulator.update(deserialize_stats(episode_stats["stats"]))
+        write_json(serialize_stats(accumulator.result()), dataset_root / STATS_FILE)
+
+    # pyarrow releases the GIL while reading and writing parquet, so threads are enough here
+    paths = {ep_idx: episode_data_path(dataset_root, info, ep_idx) for ep_idx in episodes_task_mapping}
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        rewritten = list(executor.map(
+            lambda ep_idx: rewrite_task_index_column(paths[ep_idx], episodes_task_mapping[ep_idx]),
+            paths,
+        ))
+
+    refresh_manifest(dataset_root, [ep_idx for ep_idx, changed in zip(paths, rewritten) if changed], num_workers=num_workers)
+
+    info["total_tasks"] = len(task_to_id)
+    write_json(info, dataset_root / INFO_FILE)
+
+    print(f"✓ Rewrote task_index in {sum(rewritten)}/{len(rewritten)} parquet files")
+    return episodes_task_mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remap task_index of a local LeRobot dataset from episodes.jsonl")
+    parser.add_argument("--dataset_root", type=str, required=True, help="Root directory of the local dataset")
+    parser.add_argument("--num_workers", type=int, default=8, help="Number of parallel parquet writers (default: 8)")
+    args = parser.parse_args()
+
+    remap_task_index(Path(args.dataset_root), num_workers=args.num_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+Re-encode the videos of a local LeRobot dataset for fast random-access decoding.
+
+Every mp4 is re-encoded by a pool of ffmpeg workers to a target resolution,
+codec and short GOP (keyframe interval), so seeking to a random frame during
+training only decodes a few frames. info.json video features are updated.
+
+The job is resumable: meta/transcode_state.json records the parameters and the
+hash of every finished output, and each output is written to a temporary file
+and renamed into place, so an interrupted run picks up where it stopped.
+
+Videos of a dataset built by data_cleaning.py are hard links into its staging
+area, and the next build relinks the untranscoded staged videos. Pass
+--transcode to data_cleaning.py instead, which transcodes each staged episode
+once as a build transform.
+
+Usage:
+    python transcode.py --dataset_root ./filtered_dataset/so100_filtered_pick_green --width 320 --height 240 --gop 10
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import av
+import numpy as np
+from tqdm import tqdm
+
+from compute_stats import compute_dataset_stats
+from episode_io import (
+    EPISODES_FILE,
+    INFO_FILE,
+    episode_video_path,
+    file_sha256,
+    load_info,
+    load_json,
+    load_jsonlines,
+    video_keys,
+    write_json,
+)
+from manifest import refresh_manifest
+from trim_idle import run_ffmpeg
+
+STATE_FILE = "meta/transcode_state.json"
+CODECS = {"libsvtav1": "av1", "libx264": "h264", "libx265": "hevc"}
+
+
+def transcode_video(video_path: Path, params: dict, threads: int) -> str:
+    """Re-encode one video in place through a temporary file, return the hash of the result"""
+    tmp_path = video_path.with_suffix(".transcoding.mp4")
+    run_ffmpeg([
+        "-i", str(video_path),
+        "-vf", f"scale={params['width']}:{params['height']}",
+        "-c:v", params["encoder"],
+        "-g", str(params["gop"]),
+        "-keyint_min", str(params["gop"]),
+        "-crf", str(params["crf"]),
+        "-pix_fmt", params["pix_fmt"],
+        "-threads", str(threads),
+        "-an", str(tmp_path),
+    ])
+    os.replace(tmp_path, video_path)
+    return file_sha256(video_path)
+
+
+def update_video_features(info: dict, params: dict):
+    """Set the video features of info to the resolution, codec and pixel format of params"""
+    for vid_key in video_keys(info):
+        feature = info["features"][vid_key]
+        feature["shape"] = [params["height"], params["width"], feature["shape"][-1]]
+        feature.setdefault("info", {}).update({
+            "video.height": params["height"],
+            "video.width": params["width"],
+            "video.codec": CODECS.get(params["encoder"], params["encoder"]),
+            "video.pix_fmt": params["pix_fmt"],
+        })
+
+
+def random_frame_latency(video_paths: list[Path], num_samples: int = 50, seed: int = 0) -> float:
+    """Mean time in ms to seek to and decode a random frame"""
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(num_samples):
+        with av.open(str(rng.choice(video_paths))) as container:
+            stream = container.streams.video[0]
+            target = rng.uniform(0, float(stream.duration * stream.time_base) if stream.duration else 1.0)
+            start = time.perf_counter()
+            container.seek(int(target / stream.time_base), stream=stream, backward=True)
+            for frame in container.decode(stream):
+                if frame.time is not None and frame.time >= target - 1e-3:
+                    frame.to_ndarray(format="rgb24")
+                    break
+            latencies.append(time.perf_counter() - start)
+    return float(np.mean(latencies) * 1000)
+
+
+def save_state(dataset_root: Path, state: dict):
+    tmp_path = dataset_root / (STATE_FILE + ".tmp")
+    write_json(state, tmp_path)
+    os.replace(tmp_path, dataset_root / STATE_FILE)
+
+
+def transcode_dataset(dataset_root: Path, params: dict, num_workers: int = 4, benchmark_samples: int = 50):
+    """Transcode every video of a dataset in a process pool, skipping videos already done with the same params"""
+    dataset_root = Path(dataset_root)
+    info = load_info(dataset_root)
+    episode_indices = [ep["episode_index"] for ep in load_jsonlines(dataset_root / EPISODES_FILE)]
+    videos = {
+        (ep_idx, vid_key): episode_video_path(dataset_root, info, ep_idx, vid_key)
+        for ep_idx in episode_indices for vid_key in video_keys(info)
+    }
+
+    state_path = dataset_root / STATE_FILE
+    state = load_json(state_path) if state_path.exists() else {}
+    if state.get("params") != params:
+        state = {"params": params, "done": {}}
+    for tmp_file in dataset_root.glob("videos/**/*.transcoding.mp4"):
+        tmp_file.unlink()
+
+    def is_done(path: Path) -> bool:
+        rel = str(path.relative_to(dataset_root))
+        return rel in state["done"] and file_sha256(path) == state["done"][rel]
+
+    pending = {key: path for key, path in videos.items() if not is_done(path)}
+    print(f"{len(videos) - len(pending)}/{len(videos)} videos already transcoded, {len(pending)} to go")
+
+    benchmark_paths = list(videos.values())
+    if benchmark_samples and pending:
+        latency_before = random_frame_latency(list(pending.values()), benchmark_samples)
+        print(f"Random frame decode latency before: {latency_before:.1f} ms")
+
+    threads = max(1, (os.cpu_count() or 1) // num_workers)
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = {executor.submit(transcode_video, path, params, threads): path for path in pending.values()}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Transcoding"):
+            path = futures[future]
+            state["done"][str(path.relative_to(dataset_root))] = future.result()
+            save_state(dataset_root, state)
+
+    update_video_features(info, params)
+    write_json(info, dataset_root / INFO_FILE)
+
+    # Always refreshed from everything in state["done"], so a run resumed after a crash (even one that came after
+    # the last video) still records the videos transcoded before it
+    compute_dataset_stats(dataset_root, num_workers=num_workers)
+    transcoded_episodes = sorted({
+        ep_idx for (ep_idx, _), path in videos.items() if str(path.relative_to(dataset_root)) in state["done"]
+    })
+    refresh_manifest(dataset_root, transcoded_episodes, {ep_idx: {"transcoded": params} for ep_idx in transcoded_episodes},
+                     num_workers=num_workers)
+
+    if benchmark_samples:
+        latency_after = random_frame_latency(benchmark_paths, benchmark_samples)
+        print(f"Random frame decode latency after: {latency_after:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcode dataset videos for fast random-access decoding")
+    parser.add_argument("--dataset_root", type=str, required=True, help="Root directory of the local dataset")
+    parser.add_argument("--width", type=int, default=320, help="Target width (default: 320)")
+    parser.add_argument("--height", type=int, default=240, help="Target height (default: 240)")
+    parser.add_argument("--encoder", type=str, default="libsvtav1", choices=list(CODECS), help="ffmpeg encoder (default: libsvtav1)")
+    parser.add_argument("--gop", type=int, default=2, help="Keyframe interval in frames (default: 2)")
+    parser.add_argument("--crf", type=int, default=30, help="Constant rate factor (default: 30)")
+    parser.add_argument("--pix_fmt", type=str, default="yuv420p", help="Pixel format (default: yuv420p)")
+    parser.add_argument("--num_workers", type=int, default=4, help="Number of parallel ffmpeg workers (default: 4)")
+    parser.add_argument("--benchmark_samples", type=int, default=50,
+                        help="Random frame decodes timed before and after, 0 to skip (default: 50)")
+    args = parser.parse_args()
+
+    params = {
+        "width": args.width,
+        "height": args.height,
+        "encoder": args.encoder,
+        "gop": args.gop,
+        "crf": args.crf,
+        "pix_fmt": args.pix_fmt,
+    }
+    transcode_dataset(Path(args.dataset_root), params, args.num_workers, args.benchmark_samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+"""
+Trim static frames at the start and end of every episode of a local LeRobot dataset.
+
+Low-motion prefixes and suffixes are detected from the observation.state and
+action columns. The parquet rows are trimmed and frame_index/timestamp/index
+are re-based, and the matching video segments are cut with ffmpeg: the cut is a
+stream copy when the new start falls on a keyframe, otherwise the kept range is
+re-encoded with the source codec, pixel format and keyframe interval. Every cut
+is checked to have exactly the new episode length in frames. Episode lengths,
+info.json, stats and the manifest are updated afterwards.
+
+Usage:
+    python trim_idle.py --dataset_root ./filtered_dataset/so100_filtered_pick_green
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from compute_stats import compute_dataset_stats
+from episode_io import (
+    EPISODES_FILE,
+    INFO_FILE,
+    episode_data_path,
+    episode_video_path,
+    load_info,
+    load_jsonlines,
+    read_episode_columns,
+    video_keys,
+    write_json,
+    write_jsonlines,
+)
+from manifest import MANIFEST_FILE, load_manifest, refresh_manifest
+
+# ffmpeg encoders for the codec names LeRobot stores in info.json
+ENCODERS = {"av1": "libsvtav1", "h264": "libx264", "hevc": "libx265"}
+
+
+def active_range(columns: dict[str, np.ndarray], threshold: float, padding: int, min_length: int) -> tuple[int, int, int]:
+    """Return (length, start, end) of the frames between the first and last frame with motion"""
+    length = len(columns["action"])
+    if length < 2:
+        return length, 0, length
+
+    motion = np.maximum(
+        np.abs(np.diff(columns["observation.state"], axis=0)).max(axis=1),
+        np.abs(np.diff(columns["action"], axis=0)).max(axis=1),
+    )
+    moving = np.flatnonzero(motion > threshold)
+    if len(moving) == 0:
+        return length, 0, length
+
+    start = max(0, int(moving[0]) - padding)
+    end = min(length, int(moving[-1]) + 2 + padding)
+    if end - start < min_length:
+        return length, 0, length
+    return length, start, end
+
+
+def find_active_range(dataset_root: Path, info: dict, ep_idx: int, threshold: float, padding: int, min_length: int) -> tuple[int, int, int]:
+    columns = read_episode_columns(episode_data_path(dataset_root, info, ep_idx), ["observation.state", "action"])
+    return active_range(columns, threshold, padding, min_length)
+
+
+def slice_episode_table(table: pa.Table, start: int, end: int, fps: int) -> pa.Table:
+    """Rows [start, end) of an episode with frame_index/timestamp re-based to the new first frame"""
+    table = table.slice(start, end - start)
+    if start == 0:
+        return table
+    frame_index = np.arange(len(table))
+    for name, values in {"frame_index": frame_index, "timestamp": frame_index / fps}.items():
+        col_idx = table.schema.get_field_index(name)
+        field = table.schema.field(col_idx)
+        table = table.set_column(col_idx, field, pa.array(values).cast(field.type))
+    return table
+
+
+def keyframe_times(video_path: Path) -> np.ndarray:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+         "-show_entries", "frame=pts_time", "-of", "csv=p=0", str(video_path)],
+        check=True, capture_output=True, text=True,
+    )
+    return np.array([float(line) for line in result.stdout.split() if line.strip()])
+
+
+def probe_stream(video_path: Path, entries: str, count_frames: bool = False) -> dict:
+    """ffprobe entries of the first video stream, e.g. "codec_name,pix_fmt" """
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", *(["-count_frames"] if count_frames else []),
+         "-show_entries", f"stream={entries}", "-of", "json", str(video_path)],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(result.stdout)["streams"][0]
+
+
+def run_ffmpeg(args: list[str]):
+    subprocess.run(["ffmpeg", "-y", "-v", "error", *args], check=True)
+
+
+def cut_video(video_path: Path, start_s: float, num_frames: int, fps: int, video_info: dict):
+    """Replace a video in place by its num_frames frames from start_s
+
+    The cut is a stream copy when start_s is a keyframe. Otherwise the whole kept range is re-encoded with the
+    codec, pixel format and keyframe interval of the source, since splicing a re-encoded GOP onto stream-copied
+    packets produces a stream whose headers do not match. The frame count is checked before the file is replaced.
+    """
+    keyframes = keyframe_times(video_path)
+    half_frame = 0.5 / fps
+    source = probe_stream(video_path, "codec_name,pix_fmt")
+    codec = source.get("codec_name", video_info.get("video.codec"))
+    encoder = ENCODERS.get(codec, "libx264")
+    pix_fmt = source.get("pix_fmt", video_info.get("video.pix_fmt", "yuv420p"))
+    gop = max(1, int(round(np.median(np.diff(keyframes)) * fps))) if len(keyframes) > 1 else 2
+
+    with tempfile.TemporaryDirectory(dir=video_path.parent) as tmp_dir:
+        output = Path(tmp_dir) / "trimmed.mp4"
+        following = keyframes[keyframes >= start_s - half_frame]
+        if len(following) and abs(following[0] - start_s) < half_frame:
+            run_ffmpeg(["-ss", f"{start_s:.6f}", "-i", str(video_path), "-frames:v", str(num_frames),
+                        "-c", "copy", "-avoid_negative_ts", "make_zero", str(output)])
+        else:
+            run_ffmpeg(["-i", str(video_path), "-ss", f"{start_s:.6f}", "-frames:v", str(num_frames),
+                        "-c:v", encoder, "-pix_fmt", pix_fmt, "-g", str(gop), "-r", str(fps), "-an", str(output)])
+
+        written = int(probe_stream(output, "nb_read_frames", count_frames=True)["nb_read_frames"])
+        if written != num_frames:
+            raise RuntimeError(f"Trimmed {video_path} has {written} frames, expected {num_frames}")
+        os.replace(output, video_path)
+
+
+def trim_episode(dataset_root: Path, info: dict, ep_idx: int, start: int, end: int, index_offset: int) -> dict:
+    """Trim the parquet rows and videos of one episode, return the frames and bytes saved"""
+    data_path = episode_data_path(dataset_root, info, ep_idx)
+    paths = [data_path] + [episode_video_path(dataset_root, info, ep_idx, key) for key in video_keys(info)]
+    bytes_before = sum(path.stat().st_size for path in paths)
+
+    table = pq.read_table(data_path)
+    length = len(table)
+    table = slice_episode_table(table, start, end, info["fps"])
+    new_length = len(table)
+    col_idx = table.schema.get_field_index("index")
+    field = table.schema.field(col_idx)
+    table = table.set_column(col_idx, field, pa.array(index_offset + np.arange(new_length)).cast(field.type))
+
+    if (start, end) == (0, length):
+        # Untrimmed episode that only needed its global index re-based
+        pq.write_table(table, data_path)
+        return {"frames_saved": 0, "bytes_saved": 0}
+
+    # The parquet is only rewritten once every video has been cut
+    for vid_key in video_keys(info):
+        cut_video(episode_video_path(dataset_root, info, ep_idx, vid_key), start / info["fps"], new_length,
+                  info["fps"], info["features"][vid_key].get("info", {}))
+    pq.write_table(table, data_path)
+
+    bytes_after = sum(path.stat().st_size for path in paths)
+    return {"frames_saved": length - new_length, "bytes_saved": bytes_before - bytes_after}
+
+
+def trim_staged_episode(staged_dir: Path, info: dict, threshold: float, padding: int, min_length: int) -> tuple[int, int, int]:
+    """Trim an episode staged by build_state (data.parquet plus one <key>.mp4 per camera) in place
+
+    Returns (length, start, end) in source frames. index, episode_index and task_index are left to assembly.
+    """
+    data_path = Path(staged_dir) / "data.parquet"
+    length, start, end = active_range(
+        read_episode_columns(data_path, ["observation.state", "action"]), threshold, padding, min_length
+    )
+    if (start, end) == (0, length):
+        return length, start, end
+
+    for vid_key in video_keys(info):
+        cut_video(Path(staged_dir) / f"{vid_key}.mp4", start / info["fps"], end - start,
+                  info["fps"], info["features"][vid_key].get("info", {}))
+    table = slice_episode_table(pq.read_table(data_path), start, end, info["fps"])
+    pq.write_table(table, data_path)
+    return length, start, end
+
+
+def _range_job(args):
+    return find_active_range(*args)
+
+
+def _trim_job(args):
+    return trim_episode(*args)
+
+
+def trim_dataset(dataset_root: Path, threshold: float = 0.5, padding: int = 5, min_length: int = 30, num_workers: int = 8) -> dict[int, dict]:
+    """Trim idle frames of every episode in place and update the dataset metadata"""
+    dataset_root = Path(dataset_root)
+    info = load_info(dataset_root)
+    episodes = load_jsonlines(dataset_root / EPISODES_FILE)
+    episode_indices = [ep["episode_index"] for ep in episodes]
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        ranges = list(executor.map(
+            _range_job, [(dataset_root, info, ep_idx, threshold, padding, min_length) for ep_idx in episode_indices]
+        ))
+
+    # index is global, so every episode after the first trimmed one has to be re-based
+    jobs, offset, first_trimmed = [], 0, None
+    for ep_idx, (length, start, end) in zip(episode_indices, ranges):
+        if first_trimmed is None and (start, end) != (0, length):
+            first_trimmed = ep_idx
+        if first_trimmed is not None:
+            jobs.append((dataset_root, info, ep_idx, start, end, offset))
+        offset += end - start
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        reports = dict(zip([job[2] for job in jobs], executor.map(_trim_job, jobs)))
+
+    print("\n=== Idle trimming report ===")
+    for ep_idx, report in reports.items():
+        if report["frames_saved"]:
+            print(f"Episode {ep_idx}: {report['frames_saved']} frames, {report['bytes_saved'] / 1e6:.2f} MB saved")
+    total_frames_saved = sum(report["frames_saved"] for report in reports.values())
+    total_bytes_saved = sum(report["bytes_saved"] for report in reports.values())
+    print(f"✓ Trimmed {total_frames_saved} frames, {total_bytes_saved / 1e6:.2f} MB saved in total")
+
+    if not reports:
+        return reports
+
+    for episode, (length, start, end) in zip(episodes, ranges):
+        episode["length"] = end - start
+    write_jsonlines(episodes, dataset_root / EPISODES_FILE)
+    info["total_frames"] = sum(episode["length"] for episode in episodes)
+    write_json(info, dataset_root / INFO_FILE)
+    compute_dataset_stats(dataset_root, num_workers=num_workers)
+
+    # Record the kept source range so `validate.py --verify` compares against the right source rows
+    if (dataset_root / MANIFEST_FILE).exists():
+        entries = {entry["episode_index"]: entry for entry in load_manifest(dataset_root)}
+        changes = {}
+        for ep_idx, (length, start, end) in zip(episode_indices, ranges):
+            previous_start = entries[ep_idx].get("trim", {}).get("start", 0)
+            if (start, end) != (0, length):
+                changes[ep_idx] = {"trim": {"start": previous_start + start, "end": previous_start + end}}
+        refresh_manifest(dataset_root, list(reports), changes, num_workers=num_workers)
+
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trim idle frames at the start and end of episodes")
+    parser.add_argument("--dataset_root", type=str, required=True, help="Root directory of the local dataset")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="Per-frame joint motion below which a frame is idle, in dataset units (default: 0.5)")
+    parser.add_argument("--padding", type=int, default=5, help="Idle frames kept before and after the motion (default: 5)")
+    parser.add_argument("--min_length", type=int, default=30, help="Never trim an episode below this length (default: 30)")
+    parser.add_argument("--num_workers", type=int, default=8, help="Number of worker processes (default: 8)")
+    args = parser.parse_args()
+
+    trim_dataset(Path(args.dataset_root), args.threshold, args.padding, args.min_length, args.num_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,49 +2,200 @@ from lerobot.common.datasets.lerobot_dataset import (
     LeRobotDataset,
     LeRobotDatasetMetadata,
 )
-import torch
-from tqdm import tqdm
+import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from pathlib import Path
 
-def compare_episodes(dataset1, dataset2):
+import av
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from episode_io import EPISODES_FILE, column_to_numpy, episode_data_path, file_sha256, load_info, load_jsonlines
+from manifest import file_fingerprint, load_manifest
+
+# Columns that are expected to differ between a source episode and its copy in a filtered dataset
+REINDEXED_COLUMNS = ["episode_index", "index", "task_index"]
+
+
+def episode_table(dataset):
+    """Read the parquet table of the single episode a LeRobotDataset was loaded with"""
+    ep_idx = dataset.episodes[0]
+    return pq.read_table(dataset.root / dataset.meta.get_data_file_path(ep_idx))
+
+
+def first_mismatch(values1: np.ndarray, values2: np.ndarray):
+    """Index of the first row that differs between two arrays, or None"""
+    if values1.shape != values2.shape:
+        return 0
+    differs = values1 != values2
+    if differs.ndim > 1:
+        differs = differs.reshape(len(differs), -1).any(axis=1)
+    rows = np.flatnonzero(differs)
+    return int(rows[0]) if len(rows) else None
+
+
+def compare_columns(table1: pa.Table, table2: pa.Table) -> list[str]:
+    """Compare all non-video columns in one Arrow call, locate the differing frames only on mismatch"""
+    columns = [c for c in table1.column_names if c not in REINDEXED_COLUMNS]
+    missing = [c for c in columns if c not in table2.column_names]
+    if missing:
+        return [f"Columns missing from second dataset: {missing}"]
+    if len(table1) != len(table2):
+        return [f"Frame counts differ: {len(table1)} vs {len(table2)}"]
+
+    selected1, selected2 = table1.select(columns), table2.select(columns)
     try:
-        # Create progress bar for the comparison
-        with tqdm(total=len(dataset1), desc="Comparing frames", unit="frame") as pbar:
-            for i in range(len(dataset1)):
-                pbar.set_description(f"Checking frame {i}")
-                
-                frame1 = dataset1[i]
-                frame2 = dataset2[i]
-                
-                # Compare actions
-                assert torch.equal(frame1['action'], frame2['action']), \
-                    f"Actions differ at frame {i}"
-                
-                # Compare observations
-                assert torch.equal(frame1['observation.images.laptop'],
-                                  frame2['observation.images.laptop']), \
-                    f"Laptop images differ at frame {i}"
-                
-                assert torch.equal(frame1['observation.images.phone'],
-                                  frame2['observation.images.phone']), \
-                    f"Phone images differ at frame {i}"
-                
-                assert torch.equal(frame1['observation.state'],
-                                  frame2['observation.state']), \
-                    f"States differ at frame {i}"
-                assert frame1['task'] == frame2['task'],\
-                    f"Tasks differ at frame {i}"
-                
-                # Update progress bar
-                pbar.update(1)
-            
-            print("✓ All frames match perfectly!")
-        return True
-            
-    except AssertionError as e:
-        print(f"✗ Comparison failed: {e}")
+        if selected1.equals(selected2.cast(selected1.schema)):
+            return []
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass  # Incompatible column types, fall through to the per-column report
+
+    errors = []
+    for column in columns:
+        values1 = column_to_numpy(table1.column(column))
+        values2 = column_to_numpy(table2.column(column))
+        frame = first_mismatch(values1, values2)
+        if frame is not None:
+            errors.append(f"{column} differs at frame {frame}")
+    return errors
+
+
+def compare_videos(video_path1: Path, video_path2: Path) -> str | None:
+    """Compare two videos by content hash first, decode and compare frames only on a hash mismatch"""
+    if file_sha256(video_path1) == file_sha256(video_path2):
+        return None
+
+    with av.open(str(video_path1)) as container1, av.open(str(video_path2)) as container2:
+        frames1 = container1.decode(video=0)
+        frames2 = container2.decode(video=0)
+        for i, (frame1, frame2) in enumerate(zip_longest(frames1, frames2)):
+            if frame1 is None or frame2 is None:
+                return f"frame counts differ after frame {i - 1}"
+            if not np.array_equal(frame1.to_ndarray(format="rgb24"), frame2.to_ndarray(format="rgb24")):
+                return f"frames differ at frame {i}"
+    return None
+
+
+def compare_episodes(dataset1, dataset2):
+    """Compare the single episode loaded in each dataset without decoding video when files are identical"""
+    start_time = time.perf_counter()
+    errors = []
+
+    ep1, ep2 = dataset1.episodes[0], dataset2.episodes[0]
+    errors.extend(compare_columns(episode_table(dataset1), episode_table(dataset2)))
+
+    tasks1 = dataset1.meta.episodes[ep1]["tasks"]
+    tasks2 = dataset2.meta.episodes[ep2]["tasks"]
+    if tasks1 != tasks2:
+        errors.append(f"Tasks differ: {tasks1} vs {tasks2}")
+
+    camera_keys = dataset1.meta.video_keys
+    if camera_keys != dataset2.meta.video_keys:
+        errors.append(f"Camera keys differ: {camera_keys} vs {dataset2.meta.video_keys}")
+    else:
+        for vid_key in tqdm(camera_keys, desc="Comparing videos", unit="video"):
+            error = compare_videos(
+                dataset1.root / dataset1.meta.get_video_file_path(ep1, vid_key),
+                dataset2.root / dataset2.meta.get_video_file_path(ep2, vid_key),
+            )
+            if error:
+                errors.append(f"{vid_key}: {error}")
+
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    if errors:
+        for error in errors:
+            print(f"✗ Comparison failed: {error}")
         return False
 
+    print(f"✓ All frames match perfectly! ({elapsed_ms:.1f} ms)")
+    return True
+
+def verify_episode(dataset_root: Path, info: dict, entry: dict, check_sources: bool = True) -> list[str]:
+    """Re-check one output episode against its manifest entry and, optionally, against its source"""
+    ep_idx = entry["episode_index"]
+    try:
+        output = file_fingerprint(dataset_root, info, ep_idx)
+    except FileNotFoundError as e:
+        return [f"missing file: {e.filename}"]
+
+    issues = []
+    if output["num_rows"] != entry["num_rows"]:
+        issues.append(f"row count {output['num_rows']} != manifest {entry['num_rows']}")
+    if output["parquet_sha256"] != entry["parquet_sha256"]:
+        issues.append("parquet content changed since the manifest was written")
+    for vid_key, sha256 in entry["videos"].items():
+        if output["videos"].get(vid_key) != sha256:
+            issues.append(f"{vid_key} video changed since the manifest was written")
+
+    if not check_sources:
+        return issues
+
+    source_root = Path(entry["source_root"])
+    if not source_root.exists():
+        return issues + [f"source {entry['source_repo_id']} not available at {source_root}"]
+    source_info = load_info(source_root)
+    source_ep_idx = entry["source_episode_index"]
+    try:
+        source = file_fingerprint(source_root, source_info, source_ep_idx)
+    except FileNotFoundError as e:
+        return issues + [f"missing source file: {e.filename}"]
+
+    if source["parquet_sha256"] != entry["source"]["parquet_sha256"]:
+        issues.append("source parquet changed since generation")
+    source_table = pq.read_table(episode_data_path(source_root, source_info, source_ep_idx))
+    output_table = pq.read_table(episode_data_path(dataset_root, info, ep_idx))
+    trim = entry.get("trim")
+    if trim:
+        # Trimmed episodes keep a slice of the source rows with re-based frame_index/timestamp
+        source_table = source_table.slice(trim["start"], trim["end"] - trim["start"])
+        source_table = source_table.drop(["frame_index", "timestamp"])
+        output_table = output_table.drop(["frame_index", "timestamp"])
+    issues.extend(f"source mismatch: {error}" for error in compare_columns(output_table, source_table))
+    if not trim and "transcoded" not in entry:
+        for vid_key, sha256 in output["videos"].items():
+            if source["videos"].get(vid_key) != sha256:
+                issues.append(f"{vid_key} video differs from source")
+    return issues
+
+
+def verify_dataset(dataset_root: Path, num_workers: int = 8, check_sources: bool = True) -> dict[int, list[str]]:
+    """Verify every episode of a filtered dataset in parallel, return the issues of drifted episodes"""
+    dataset_root = Path(dataset_root)
+    info = load_info(dataset_root)
+    entries = load_manifest(dataset_root)
+    episode_lengths = {ep["episode_index"]: ep["length"] for ep in load_jsonlines(dataset_root / EPISODES_FILE)}
+
+    drifted = {}
+    manifest_episodes = {entry["episode_index"] for entry in entries}
+    for ep_idx in sorted(set(episode_lengths) - manifest_episodes):
+        drifted[ep_idx] = ["episode not in manifest"]
+    for ep_idx in sorted(manifest_episodes - set(episode_lengths)):
+        drifted[ep_idx] = ["episode in manifest but not in episodes.jsonl"]
+
+    # Hashing and parquet reads release the GIL, so threads keep all cores busy
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        results = executor.map(lambda entry: verify_episode(dataset_root, info, entry, check_sources), entries)
+        for entry, issues in tqdm(zip(entries, results), total=len(entries), desc="Verifying", unit="episode"):
+            ep_idx = entry["episode_index"]
+            if ep_idx in episode_lengths and episode_lengths[ep_idx] != entry["num_rows"]:
+                issues.append(f"episodes.jsonl length {episode_lengths[ep_idx]} != manifest {entry['num_rows']}")
+            if issues:
+                drifted.setdefault(ep_idx, []).extend(issues)
+
+    print(f"\nVerified {len(entries)} episodes in {dataset_root}")
+    if not drifted:
+        print("🎉 All episodes match the manifest" + (" and their sources" if check_sources else ""))
+    for ep_idx in sorted(drifted):
+        print(f"✗ Episode {ep_idx}:")
+        for issue in drifted[ep_idx]:
+            print(f"    {issue}")
+    return drifted
+
+
 def main(new_repo_id: str, original_repo_id: str, new_episode: int, original_episode: int):
     print(f"New repo: {new_repo_id}")
     print(f"Original repo: {original_repo_id}")
@@ -68,18 +219,17 @@ def main(new_repo_id: str, original_repo_id: str, new_episode: int, original_epi
     print(ds_meta.tasks)
     
     # Load the specified episode from new dataset
+    # Constructing the datasets only downloads the episode files, nothing is decoded here
     print(f"\nLoading episode {new_episode} from new dataset...")
     new_dataset = LeRobotDataset(new_repo_id, episodes=[new_episode])
-    print(f"New dataset task: {new_dataset[0]['task']}")
-    print(f"New dataset keys: {new_dataset[0].keys()}")
-    print(f"New dataset action: {new_dataset[0]['action']}")
+    print(f"New dataset tasks: {new_dataset.meta.episodes[new_episode]['tasks']}")
+    print(f"New dataset features: {list(new_dataset.meta.features)}")
     
     # Load the specified episode from original dataset
     print(f"\nLoading episode {original_episode} from original dataset...")
     original_dataset = LeRobotDataset(original_repo_id, episodes=[original_episode])
-    print(f"Original dataset task: {original_dataset[0]['task']}")
-    print(f"Original dataset keys: {original_dataset[0].keys()}")
-    print(f"Original dataset action: {original_dataset[0]['action']}")
+    print(f"Original dataset tasks: {original_dataset.meta.episodes[original_episode]['tasks']}")
+    print(f"Original dataset features: {list(original_dataset.meta.features)}")
     
     # Compare datasets
     print(f"\nStarting comparison...")
@@ -95,21 +245,33 @@ def main(new_repo_id: str, original_repo_id: str, new_episode: int, original_epi
 
 def parse_args():
     parser = argparse.ArgumentParser(
-        description='Compare episodes between two LeRobot datasets',
+        description='Compare episodes between two LeRobot datasets, or verify a whole filtered dataset',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     
-    parser.add_argument('--new_repo_id', '-n', type=str, required=True,
+    parser.add_argument('--new_repo_id', '-n', type=str,
                        help='Repository ID of the new/filtered dataset')
-    parser.add_argument('--original_repo_id', '-o', type=str, required=True,
+    parser.add_argument('--original_repo_id', '-o', type=str,
                        help='Repository ID of the original dataset')
-    parser.add_argument('--new_episode', '-ne', type=int, required=True,
+    parser.add_argument('--new_episode', '-ne', type=int,
                        help='Episode number from the new dataset to compare')
-    parser.add_argument('--original_episode', '-oe', type=int, required=True,
+    parser.add_argument('--original_episode', '-oe', type=int,
                        help='Episode number from the original dataset to compare')
+    parser.add_argument('--verify', type=str, metavar='DATASET_ROOT',
+                       help='Verify every episode of a local filtered dataset against its meta/manifest.jsonl')
+    parser.add_argument('--no_sources', action='store_true',
+                       help='With --verify, only check against the manifest, not against the source datasets')
+    parser.add_argument('--num_workers', type=int, default=8,
+                       help='With --verify, number of parallel workers (default: 8)')
     
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.verify is None and None in (args.new_repo_id, args.original_repo_id, args.new_episode, args.original_episode):
+        parser.error('--new_repo_id, --original_repo_id, --new_episode and --original_episode are required without --verify')
+    return args
 
 if __name__ == "__main__":
     args = parse_args()
+    if args.verify:
+        drifted = verify_dataset(Path(args.verify), num_workers=args.num_workers, check_sources=not args.no_sources)
+        raise SystemExit(1 if drifted else 0)
     main(args.new_repo_id, args.original_repo_id, args.new_episode, args.original_episode)
@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+"""
+Zero-copy filtered datasets.
+
+A virtual dataset is a directory holding only meta/: the usual remapped
+info.json, episodes.jsonl, tasks.jsonl, episodes_stats.jsonl and stats.json,
+plus meta/virtual.json listing the (source repo, source root, source episode)
+behind every output episode. It is built from source metadata only, so creating
+a filtered view is instant and takes no extra disk.
+
+VirtualLeRobotDataset serves frames from the source datasets with the remapped
+episode_index/index/task_index, and `materialize` writes a regular physical
+LeRobot dataset when one is needed (e.g. to push to the hub).
+
+Usage:
+    python virtual_dataset.py create --repo_ids "repo1,repo2" --judge_file judge.jsonl --root ./filtered_dataset/view
+    python virtual_dataset.py materialize --root ./filtered_dataset/view --output_root ./filtered_dataset/so100_filtered_pick_green
+    python virtual_dataset.py check --root ./filtered_dataset/view --horizon 10
+"""
+
+import argparse
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import torch
+from lerobot.common.datasets.lerobot_dataset import LeRobotDataset, LeRobotDatasetMetadata
+from lerobot.common.datasets.utils import check_delta_timestamps, get_delta_indices
+
+from compute_stats import STATS_FILE, StatsAccumulator, serialize_stats
+from episode_io import (
+    EPISODES_FILE,
+    EPISODES_STATS_FILE,
+    INFO_FILE,
+    TASKS_FILE,
+    episode_data_path,
+    episode_video_path,
+    load_info,
+    load_json,
+    video_keys,
+    write_json,
+    write_jsonlines,
+)
+from generate_judge import load_all_meta, load_judged_episodes
+from manifest import write_manifest
+
+VIRTUAL_FILE = "meta/virtual.json"
+VIRTUAL_META_FILES = [INFO_FILE, EPISODES_FILE, TASKS_FILE, EPISODES_STATS_FILE, STATS_FILE]
+
+
+def remap_episode_stats(source_stats: dict, episode_index: int, task_index: int, index_offset: int, length: int) -> dict:
+    """Source episode stats with the stats of the re-indexed columns replaced by their new exact values"""
+    ep_stats = {key: dict(stats) for key, stats in source_stats.items()}
+    constants = {"episode_index": episode_index, "task_index": task_index}
+    for name, value in constants.items():
+        if name in ep_stats:
+            for key in ep_stats[name]:
+                if key != "count":
+                    ep_stats[name][key] = np.array([float(value)])
+            ep_stats[name]["std"] = np.array([0.0])
+    if "index" in ep_stats:
+        # index is index_offset + arange(length), a discrete uniform sequence
+        ep_stats["index"].update({
+            "min": np.array([index_offset]),
+            "max": np.array([index_offset + length - 1]),
+            "mean": np.array([index_offset + (length - 1) / 2]),
+            "std": np.array([np.sqrt((length**2 - 1) / 12)]),
+        })
+        # Linear-interpolation quantiles of the same sequence, keys as written by compute_stats.quantile_key
+        for key in ep_stats["index"]:
+            if key.startswith("q"):
+                ep_stats["index"][key] = np.array([index_offset + int(key[1:]) / 100 * (length - 1)])
+    return ep_stats
+
+
+def create_virtual_dataset(judge_jsonl_path, repo_ids, root: Path, num_workers: int = 8) -> Path:
+    """Write the remapped metadata and episode manifest of the judge=2 episodes, without touching data files"""
+    root = Path(root)
+    judge2_episodes = load_judged_episodes(judge_jsonl_path, judge=2)
+    repo_metas = [(repo_id, ds_meta) for repo_id, ds_meta, error in load_all_meta(repo_ids, num_workers) if error is None]
+
+    sources, entries, episodes, episodes_stats = [], [], [], []
+    task_to_index = {}
+    accumulator = StatsAccumulator()
+    total_frames = 0
+    for repo_id, ds_meta in repo_metas:
+        if repo_id not in judge2_episodes:
+            continue
+        sources.append({"repo_id": repo_id, "root": str(ds_meta.root), "revision": ds_meta.revision})
+        for ep_id in judge2_episodes[repo_id]:
+            new_ep_idx = len(entries)
+            task = ds_meta.episodes[ep_id]["tasks"][0]
+            task_index = task_to_index.setdefault(task, len(task_to_index))
+            length = ds_meta.episodes[ep_id]["length"]
+
+            ep_stats = remap_episode_stats(ds_meta.episodes_stats[ep_id], new_ep_idx, task_index, total_frames, length)
+            accumulator.update(ep_stats)
+
+            entries.append({
+                "episode_index": new_ep_idx,
+                "source": len(sources) - 1,
+                "source_episode_index": ep_id,
+                "task_index": task_index,
+                "index_offset": total_frames,
+            })
+            episodes.append({"episode_index": new_ep_idx, "tasks": [task], "length": length})
+            episodes_stats.append({"episode_index": new_ep_idx, "stats": serialize_stats(ep_stats)})
+            total_frames += length
+
+    if not entries:
+        print("Error: No judge=2 episodes found in the given repositories!")
+        return None
+
+    first_meta = repo_metas[0][1]
+    info = dict(first_meta.info)
+    num_videos = len(first_meta.video_keys)
+    info.update({
+        "total_episodes": len(entries),
+        "total_frames": total_frames,
+        "total_tasks": len(task_to_index),
+        "total_videos": len(entries) * num_videos,
+        "total_chunks": (len(entries) + info["chunks_size"] - 1) // info["chunks_size"],
+        "splits": {"train": f"0:{len(entries)}"},
+    })
+
+    if root.exists():
+        shutil.rmtree(root)
+    write_json(info, root / INFO_FILE)
+    write_jsonlines(episodes, root / EPISODES_FILE)
+    write_jsonlines([{"task_index": i, "task": task} for task, i in task_to_index.items()], root / TASKS_FILE)
+    write_jsonlines(episodes_stats, root / EPISODES_STATS_FILE)
+    write_json(serialize_stats(accumulator.result()), root / STATS_FILE)
+    write_json({"sources": sources, "episodes": entries}, root / VIRTUAL_FILE)
+
+    print(f"✓ Created virtual dataset at {root}: {len(entries)} episodes, {total_frames} frames, no data copied")
+    return root
+
+
+class VirtualLeRobotDataset(torch.utils.data.Dataset):
+    """LeRobotDataset-compatible view over episodes of several source datasets, without copying them
+
+    The sources are loaded with `episodes=` subsets, and LeRobotDataset looks up episode bounds by raw episode
+    id when building `delta_timestamps` windows, which is wrong for any subset that is not a prefix of the source.
+    The view therefore handles `delta_timestamps` itself: windows are clamped to the bounds of the episode in the
+    subset and padded frames are flagged in `<key>_is_pad`, as LeRobotDataset does for full datasets.
+    """
+
+    def __init__(self, root: Path, repo_id: str = "virtual", delta_timestamps: dict | None = None, **dataset_kwargs):
+        self.root = Path(root)
+        self.meta = LeRobotDatasetMetadata(repo_id, root=self.root)
+        manifest = load_json(self.root / VIRTUAL_FILE)
+        self.entries = manifest["episodes"]
+
+        self.delta_timestamps = delta_timestamps
+        self.delta_indices = None
+        if delta_timestamps is not None:
+            check_delta_timestamps(delta_timestamps, self.meta.fps, dataset_kwargs.get("tolerance_s", 1e-4))
+            self.delta_indices = get_delta_indices(delta_timestamps, self.meta.fps)
+
+        # One LeRobotDataset per source, restricted to the episodes of the view. episode_data_index follows the
+        # order of `episodes`, so the bounds of each source episode are its position in the subset.
+        self.sources = []
+        for source_idx, source in enumerate(manifest["sources"]):
+            episodes = sorted({e["source_episode_index"] for e in self.entries if e["source"] == source_idx})
+            dataset = LeRobotDataset(
+                source["repo_id"], root=source["root"], episodes=episodes, revision=source["revision"], **dataset_kwargs
+            )
+            bounds = {
+                ep: (int(start), int(end))
+                for ep, start, end in zip(episodes, dataset.episode_data_index["from"], dataset.episode_data_index["to"])
+            }
+            self.sources.append((dataset, bounds))
+
+        lengths = np.array([self.meta.episodes[e["episode_index"]]["length"] for e in self.entries])
+        self.episode_ends = np.cumsum(lengths)
+
+    @property
+    def fps(self) -> int:
+        return self.meta.fps
+
+    @property
+    def features(self) -> dict:
+        return self.meta.features
+
+    @property
+    def num_frames(self) -> int:
+        return int(self.episode_ends[-1]) if len(self.episode_ends) else 0
+
+    @property
+    def num_episodes(self) -> int:
+        return len(self.entries)
+
+    def __len__(self):
+        return self.num_frames
+
+    def _query_indices(self, row: int, ep_start: int, ep_end: int) -> tuple[dict, dict]:
+        """Rows of the source subset in each delta window, clamped to the episode, and their padding masks"""
+        query_indices = {
+            key: [max(ep_start, min(ep_end - 1, row + delta)) for delta in deltas]
+            for key, deltas in self.delta_indices.items()
+        }
+        padding = {
+            f"{key}_is_pad": torch.BoolTensor([not ep_start <= row + delta < ep_end for delta in deltas])
+            for key, deltas in self.delta_indices.items()
+        }
+        return query_indices, padding
+
+    def __getitem__(self, idx) -> dict:
+        idx = int(idx)
+        ep_pos = int(np.searchsorted(self.episode_ends, idx, side="right"))
+        entry = self.entries[ep_pos]
+        frame = idx - (self.episode_ends[ep_pos - 1] if ep_pos else 0)
+        dataset, bounds = self.sources[entry["source"]]
+        ep_start, ep_end = bounds[entry["source_episode_index"]]
+        row = ep_start + int(frame)
+
+        item = dataset.hf_dataset[row]
+        query_indices = None
+        if self.delta_indices is not None:
+            query_indices, padding = self._query_indices(row, ep_start, ep_end)
+            item = {**item, **padding}
+            item.update(dataset._query_hf_dataset(query_indices))
+
+        if dataset.meta.video_keys:
+            query_timestamps = dataset._get_query_timestamps(item["timestamp"].item(), query_indices)
+            item.update(dataset._query_videos(query_timestamps, entry["source_episode_index"]))
+
+        if dataset.image_transforms is not None:
+            for cam in dataset.meta.camera_keys:
+                item[cam] = dataset.image_transforms(item[cam])
+
+        item["episode_index"] = torch.tensor(entry["episode_index"])
+        item["index"] = torch.tensor(idx)
+        item["task_index"] = torch.tensor(entry["task_index"])
+        item["task"] = self.meta.tasks[entry["task_index"]]
+        return item
+
+
+def check_windows(view_root: Path, horizon: int = 10, num_samples: int = 200, seed: int = 0) -> bool:
+    """Compare `delta_timestamps` windows of a view with the same windows read from the full source datasets"""
+    view_root = Path(view_root)
+    meta = LeRobotDatasetMetadata("virtual", root=view_root)
+    keys = [key for key in ["observation.state", "action"] if key in meta.features]
+    delta_timestamps = {key: [t / meta.fps for t in range(-horizon, horizon + 1)] for key in keys}
+    view = VirtualLeRobotDataset(view_root, delta_timestamps=delta_timestamps)
+
+    subset_sources = sum(dataset.episodes != list(range(len(dataset.episodes))) for dataset, _ in view.sources)
+    if not subset_sources:
+        print("⚠️  Every source of this view is a prefix subset, the check cannot catch misplaced windows")
+
+    manifest = load_json(view_root / VIRTUAL_FILE)
+    full_sources = [
+        LeRobotDataset(s["repo_id"], root=s["root"], revision=s["revision"], delta_timestamps=delta_timestamps)
+        for s in manifest["sources"]
+    ]
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for idx in rng.integers(0, len(view), size=min(num_samples, len(view))):
+        idx = int(idx)
+        ep_pos = int(np.searchsorted(view.episode_ends, idx, side="right"))
+        entry = view.entries[ep_pos]
+        frame = idx - (int(view.episode_ends[ep_pos - 1]) if ep_pos else 0)
+        full = full_sources[entry["source"]]
+        full_row = int(full.episode_data_index["from"][entry["source_episode_index"]]) + frame
+
+        # Only the windows are compared, so skip decoding the camera frames
+        expected_indices, expected_padding = full._get_query_indices(full_row, entry["source_episode_index"])
+        expected = {**full._query_hf_dataset(expected_indices), **expected_padding}
+        dataset, bounds = view.sources[entry["source"]]
+        ep_start, ep_end = bounds[entry["source_episode_index"]]
+        query_indices, padding = view._query_indices(ep_start + frame, ep_start, ep_end)
+        actual = {**dataset._query_hf_dataset(query_indices), **padding}
+        if any(not torch.equal(actual[key], expected[key]) for key in expected):
+            mismatches += 1
+
+    if mismatches:
+        print(f"❌ {mismatches} of {min(num_samples, len(view))} windows differ from the source datasets")
+    else:
+        print(f"✓ {min(num_samples, len(view))} windows of ±{horizon} frames match the source datasets "
+              f"({subset_sources} of {len(view.sources)} sources are non-prefix subsets)")
+    return mismatches == 0
+
+
+def materialize_episode(output_root: Path, info: dict, entry: dict, ds_meta: LeRobotDatasetMetadata, link: bool):
+    """Write one episode of a view as physical parquet/mp4 files, downloading the source files if needed"""
+    source_root = Path(ds_meta.root)
+    source_info = ds_meta.info
+    source_ep_idx = entry["source_episode_index"]
+    data_file = str(ds_meta.get_data_file_path(source_ep_idx))
+    video_files = [str(ds_meta.get_video_file_path(source_ep_idx, key)) for key in video_keys(source_info)]
+    if not all((source_root / path).exists() for path in [data_file, *video_files]):
+        ds_meta.pull_from_repo(allow_patterns=[data_file, *video_files])
+
+    table = pq.read_table(episode_data_path(source_root, source_info, source_ep_idx))
+    replacements = {
+        "episode_index": np.full(len(table), entry["episode_index"]),
+        "index": entry["index_offset"] + np.arange(len(table)),
+        "task_index": np.full(len(table), entry["task_index"]),
+    }
+    for name, values in replacements.items():
+        col_idx = table.schema.get_field_index(name)
+        field = table.schema.field(col_idx)
+        table = table.set_column(col_idx, field, pa.array(values).cast(field.type))
+    data_path = episode_data_path(output_root, info, entry["episode_index"])
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, data_path)
+
+    for vid_key in video_keys(info):
+        src = episode_video_path(source_root, source_info, source_ep_idx, vid_key)
+        dst = episode_video_path(output_root, info, entry["episode_index"], vid_key)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if dst.exists():
+            dst.unlink()
+        if link:
+            os.link(src, dst)
+        else:
+            shutil.copy2(src, dst)
+
+
+def materialize(view_root: Path, output_root: Path, link: bool = False, num_workers: int = 8) -> Path:
+    """Write a physical LeRobot dataset from a virtual one, with the same metadata and a manifest"""
+    view_root, output_root = Path(view_root), Path(output_root)
+    manifest = load_json(view_root / VIRTUAL_FILE)
+    info = load_info(view_root)
+    sources = manifest["sources"]
+
+    if output_root.exists():
+        shutil.rmtree(output_root)
+    for meta_file in VIRTUAL_META_FILES:
+        (output_root / meta_file).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(view_root / meta_file, output_root / meta_file)
+
+    source_metas = [
+        LeRobotDatasetMetadata(source["repo_id"], root=source["root"], revision=source["revision"]) for source in sources
+    ]
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        list(executor.map(
+            lambda entry: materialize_episode(output_root, info, entry, source_metas[entry["source"]], link),
+            manifest["episodes"],
+        ))
+
+    mappings = [{
+        "new_episode_idx": entry["episode_index"],
+        "original_repo_id": sources[entry["source"]]["repo_id"],
+        "original_episode_idx": entry["source_episode_index"],
+    } for entry in manifest["episodes"]]
+    write_manifest(output_root, mappings, {s["repo_id"]: Path(s["root"]) for s in sources}, num_workers=num_workers)
+
+    print(f"✓ Materialized {len(manifest['episodes'])} episodes to {output_root}")
+    return output_root
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or materialize zero-copy filtered LeRobot datasets")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create_parser = subparsers.add_parser("create", help="Create a virtual dataset from a judge file")
+    create_parser.add_argument("--repo_ids", type=str, required=True,
+                               help="Comma-separated list of repository IDs (e.g., 'repo1,repo2,repo3')")
+    create_parser.add_argument("--judge_file", type=str, default="judge.jsonl",
+                               help="Path to the judge JSONL file (default: judge.jsonl)")
+    create_parser.add_argument("--root", type=str, required=True, help="Directory of the virtual dataset")
+
+    materialize_parser = subparsers.add_parser("materialize", help="Write a physical copy of a virtual dataset")
+    materialize_parser.add_argument("--root", type=str, required=True, help="Directory of the virtual dataset")
+    materialize_parser.add_argument("--output_root", type=str, required=True, help="Directory of the physical dataset")
+    materialize_parser.add_argument("--link", action="store_true",
+                                    help="Hard-link videos instead of copying them (same filesystem only)")
+
+    check_parser = subparsers.add_parser("check", help="Check delta_timestamps windows against the source datasets")
+    check_parser.add_argument("--root", type=str, required=True, help="Directory of the virtual dataset")
+    check_parser.add_argument("--horizon", type=int, default=10,
+                              help="Frames before and after each sampled frame in the windows (default: 10)")
+    check_parser.add_argument("--num_samples", type=int, default=200, help="Number of frames to check (default: 200)")
+
+    for sub in [create_parser, materialize_parser]:
+        sub.add_argument("--num_workers", type=int, default=8, help="Number of parallel workers (default: 8)")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        repo_ids = [repo_id.strip() for repo_id in args.repo_ids.split(',') if repo_id.strip()]
+        create_virtual_dataset(args.judge_file, repo_ids, Path(args.root), num_workers=args.num_workers)
+    elif args.command == "check":
+        if not check_windows(Path(args.root), horizon=args.horizon, num_samples=args.num_samples):
+            raise SystemExit(1)
+    else:
+        materialize(Path(args.root), Path(args.output_root), link=args.link, num_workers=args.num_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,25 +17,39 @@ from lerobot_client import LeRobotClient
 from datetime import datetime
 import os
 import shutil
+import sys
+
+SIMULATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simulation")
+
+
+def make_eval_robot(robot_type: str, fps: int):
+    """Real robot from lerobot, or the MuJoCo SO-ARM100 for robot_type "sim_so100" """
+    if robot_type == "sim_so100":
+        sys.path.insert(0, SIMULATION_DIR)
+        from sim_robot import SimRobot
+        return SimRobot(fps=fps)
+    return make_robot(robot_type)
 
 
 async def run_inference(task: str = None, 
                        inference_time_s: int = 30, fps: int = 25, device: str = "mps",
                        robot_type: str = "so100", output_dir: str = "images/",
-                       websocket_url: str = "ws://localhost:8765"):
+                       websocket_url: str = "ws://localhost:8765",
+                       save_images: bool = True, pacing: bool = True):
     """Main async inference function."""
     
     # Setup logging
     logging.basicConfig(level=logging.INFO)
 
     # Initialize robot (policy is handled by remote WebSocket server)
-    robot = make_robot(robot_type)
+    robot = make_eval_robot(robot_type, fps)
     robot.connect()
 
     # Setup output directory
-    if os.path.exists(output_dir):
-        shutil.rmtree(output_dir)
-    os.makedirs(output_dir)
+    if save_images:
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.makedirs(output_dir)
 
     # Performance tracking variables
     iteration_times = []
@@ -55,15 +69,16 @@ async def run_inference(task: str = None,
                 observation = robot.capture_observation()
                 
                 # Save images
-                image = observation['observation.images.phone']
-                np_image = np.array(image)
-                np_image = cv2.cvtColor(np_image, cv2.COLOR_RGB2BGR)
-                cv2.imwrite(os.path.join(output_dir, f"image_phone_{step}.jpg"), np_image)
-                
-                image = observation['observation.images.on_robot']
-                np_image = np.array(image)
-                np_image = cv2.cvtColor(np_image, cv2.COLOR_RGB2BGR)
-                cv2.imwrite(os.path.join(output_dir, f"image_on_robot_{step}.jpg"), np_image)
+                if save_images:
+                    image = observation['observation.images.phone']
+                    np_image = np.array(image)
+                    np_image = cv2.cvtColor(np_image, cv2.COLOR_RGB2BGR)
+                    cv2.imwrite(os.path.join(output_dir, f"image_phone_{step}.jpg"), np_image)
+                    
+                    image = observation['observation.images.on_robot']
+                    np_image = np.array(image)
+                    np_image = cv2.cvtColor(np_image, cv2.COLOR_RGB2BGR)
+                    cv2.imwrite(os.path.join(output_dir, f"image_on_robot_{step}.jpg"), np_image)
                 
                 print(f"Step {step}")
                 
@@ -121,8 +136,9 @@ async def run_inference(task: str = None,
                           f"Success: {successful_steps}/{step+1}")
                     continue
 
-                dt_s = time.perf_counter() - start_time
-                busy_wait(1 / fps - dt_s)
+                if pacing:
+                    dt_s = time.perf_counter() - start_time
+                    busy_wait(1 / fps - dt_s)
 
         finally:
             # Print final performance summary
@@ -176,11 +192,15 @@ def main():
     parser.add_argument("--device", default="mps",
                        help="Device to use (default: mps)")
     parser.add_argument("--robot-type", default="so100",
-                       help="Robot type (default: so100)")
+                       help="Robot type, sim_so100 for the MuJoCo simulation (default: so100)")
     parser.add_argument("--output-dir", default="images/",
                        help="Output directory for images (default: images/)")
     parser.add_argument("--websocket-url", default="ws://localhost:8765",
                        help="WebSocket server URL (default: ws://localhost:8765)")
+    parser.add_argument("--no-save-images", action="store_true",
+                       help="Do not write camera images to the output directory")
+    parser.add_argument("--no-pacing", action="store_true",
+                       help="Run the loop as fast as possible instead of at --fps (useful with sim_so100)")
     
     args = parser.parse_args()
     
@@ -192,7 +212,9 @@ def main():
             device=args.device,
             robot_type=args.robot_type,
             output_dir=args.output_dir,
-            websocket_url=args.websocket_url
+            websocket_url=args.websocket_url,
+            save_images=not args.no_save_images,
+            pacing=not args.no_pacing
         ))
     except KeyboardInterrupt:
         logging.info("Inference interrupted by user")
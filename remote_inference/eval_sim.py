@@ -0,0 +1,405 @@
+#!/usr/bin/env python
+"""
+Closed-loop policy evaluation on many randomized simulated SO-ARM100 episodes in parallel.
+
+Worker processes each own a slice of the environments (one SimRobot per env,
+rendering the phone/on_robot cameras headless) and write observations into
+shared memory. Every control tick the observations of all environments are sent
+to the policy as ONE batch, and the returned (num_envs, 6) actions are applied
+by all workers in parallel. Episodes run in rounds of num_workers x
+envs_per_worker environments until --num-episodes are done.
+
+Policies:
+- remote: a policy served by websocket_server.py, one select_action_batch call per tick
+- local: a lerobot policy loaded in this process (--model-type / --model-path)
+- hold: sends the current joint positions back, to measure the harness itself
+
+Each episode starts from the home pose plus Gaussian joint noise and gets a goal
+position for the end effector (--goal plus uniform --goal-noise). The goal is shown
+to the policy as the red sphere of the `goal` mocap body in scene.xml, moved to it
+before the first frame is rendered; it is not part of observation.state. An
+episode succeeds when the fixed-jaw tip comes within --success-radius of the
+marker; the run stops early once every environment of the round has succeeded. Success rate, time to success,
+distances and per-tick policy and simulation latency are reported.
+
+Usage:
+    MUJOCO_GL=egl python eval_sim.py --policy remote --websocket-url ws://localhost:8765 --num-episodes 100 --num-workers 8
+    MUJOCO_GL=egl python eval_sim.py --policy local --model-type act --model-path DanqingZ/act_so100_test --device cuda
+    MUJOCO_GL=egl python eval_sim.py --policy hold --num-episodes 100 --num-workers 1,2,4,8
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing as mp
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import mujoco
+import numpy as np
+import torch
+
+from lerobot_client import LeRobotClient
+
+SIMULATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simulation")
+sys.path.insert(0, SIMULATION_DIR)
+from batched_sim import split_range  # noqa: E402
+from ik import EE_BODY, EE_OFFSET  # noqa: E402
+from model_cache import SCENE_PATH, load_model  # noqa: E402
+from sim_robot import CAMERAS, SimRobot  # noqa: E402
+
+POLICIES = ["remote", "local", "hold"]
+STATE_KEY = "observation.state"
+GOAL_BODY = "goal"
+NUM_JOINTS = 6
+
+
+def shared_layout(num_envs: int, width: int, height: int) -> dict[str, tuple[tuple, str]]:
+    """Shape and dtype of every shared array: policy observations, actions and end-effector positions"""
+    layout = {
+        STATE_KEY: ((num_envs, NUM_JOINTS), "float32"),
+        "action": ((num_envs, NUM_JOINTS), "float32"),
+        "ee": ((num_envs, 3), "float64"),
+    }
+    for name in CAMERAS:
+        layout[f"observation.images.{name}"] = ((num_envs, height, width, 3), "uint8")
+    return layout
+
+
+def attach_arrays(layout: dict, shms: dict) -> dict[str, np.ndarray]:
+    return {key: np.ndarray(shape, dtype=dtype, buffer=shms[key].buf) for key, (shape, dtype) in layout.items()}
+
+
+def _env_worker(layout: dict, shm_names: dict, start: int, end: int, params: dict, conn):
+    """Own the SimRobots of envs [start, end): reset them with given seeds and goals or apply the shared actions"""
+    shms = {key: shared_memory.SharedMemory(name=name) for key, name in shm_names.items()}
+    arrays = attach_arrays(layout, shms)
+    robots = [SimRobot(fps=params["fps"], width=params["width"], height=params["height"]) for _ in range(start, end)]
+    for robot in robots:
+        robot.connect()
+    ee_body = robots[0].model.body(EE_BODY).id
+    goal_mocap = robots[0].model.body(GOAL_BODY).mocapid[0]
+
+    def write_observation(i: int, robot: SimRobot):
+        for key, value in robot.capture_observation().items():
+            arrays[key][i] = value.numpy()
+        arrays["ee"][i] = robot.data.xpos[ee_body] + robot.data.xmat[ee_body].reshape(3, 3) @ EE_OFFSET
+
+    try:
+        while True:
+            cmd, args = conn.recv()
+            if cmd == "close":
+                break
+            try:
+                if cmd == "reset":
+                    for i, robot, (seed, goal) in zip(range(start, end), robots, args):
+                        robot.reset()
+                        rng = np.random.default_rng(seed)
+                        robot.data.qpos[:robot.model.nu] += rng.normal(scale=params["init_noise"], size=robot.model.nu)
+                        robot.data.mocap_pos[goal_mocap] = goal
+                        mujoco.mj_forward(robot.model, robot.data)
+                        write_observation(i, robot)
+                else:
+                    for i, robot in enumerate(robots, start):
+                        robot.send_action(arrays["action"][i])
+                        write_observation(i, robot)
+                conn.send(None)
+            except Exception as e:
+                conn.send(e)
+    finally:
+        for robot in robots:
+            robot.disconnect()
+        del arrays
+        for shm in shms.values():
+            shm.close()
+
+
+class SimEnvPool:
+    """num_envs simulated robots spread over worker processes, observations and actions in shared memory"""
+
+    def __init__(self, num_envs: int, num_workers: int, params: dict):
+        self.num_envs = num_envs
+        self.layout = shared_layout(num_envs, params["width"], params["height"])
+        self.shms = {
+            key: shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            for key, (shape, dtype) in self.layout.items()
+        }
+        self.arrays = attach_arrays(self.layout, self.shms)
+        self.slices = split_range(num_envs, min(num_workers, num_envs))
+
+        load_model(SCENE_PATH)  # compiled once here, inherited by the forked workers
+        shm_names = {key: shm.name for key, shm in self.shms.items()}
+        self.conns, self.processes = [], []
+        for start, end in self.slices:
+            parent_conn, child_conn = mp.Pipe()
+            process = mp.Process(target=_env_worker, args=(self.layout, shm_names, start, end, params, child_conn), daemon=True)
+            process.start()
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+
+    def _run(self, cmd: str, worker_args: list):
+        for conn, args in zip(self.conns, worker_args):
+            conn.send((cmd, args))
+        for conn in self.conns:
+            error = conn.recv()
+            if error is not None:
+                raise error
+
+    def observation(self) -> dict[str, np.ndarray]:
+        """Batched policy observation, views into shared memory valid until the next step"""
+        return {key: array for key, array in self.arrays.items() if key.startswith("observation.")}
+
+    def reset(self, seeds: list[int], goals: np.ndarray) -> dict[str, np.ndarray]:
+        """Reset every env with its seed and move its goal marker, before the first frame is rendered"""
+        episodes = list(zip(seeds, goals))
+        self._run("reset", [episodes[start:end] for start, end in self.slices])
+        return self.observation()
+
+    def step(self, actions: np.ndarray) -> dict[str, np.ndarray]:
+        self.arrays["action"][:] = actions
+        self._run("step", [()] * len(self.slices))
+        return self.observation()
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(("close", ()))
+        for process in self.processes:
+            process.join()
+        del self.arrays
+        for shm in self.shms.values():
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HoldPolicy:
+    """Keep every joint where it is"""
+
+    async def reset(self):
+        pass
+
+    async def select_actions(self, observation: dict) -> np.ndarray:
+        return observation[STATE_KEY].copy()
+
+
+class LocalPolicy:
+    """lerobot policy loaded in this process"""
+
+    def __init__(self, model_type: str, model_path: str, device: str):
+        from websocket_server import convert_batch_observation, get_policy_class
+        self.convert = convert_batch_observation
+        self.policy = get_policy_class(model_type).from_pretrained(model_path)
+        self.policy.to(device)
+        self.policy.eval()
+        self.device = device
+
+    async def reset(self):
+        self.policy.reset()
+
+    async def select_actions(self, observation: dict) -> np.ndarray:
+        batch = {
+            key: value.to(self.device) if isinstance(value, torch.Tensor) else value
+            for key, value in self.convert(observation).items()
+        }
+        with torch.inference_mode():
+            return self.policy.select_action(batch).cpu().numpy()
+
+
+class RemotePolicy:
+    """Policy behind websocket_server.py, one batched request per tick"""
+
+    def __init__(self, client: LeRobotClient):
+        self.client = client
+
+    async def reset(self):
+        await self.client.reset()
+
+    async def select_actions(self, observation: dict) -> np.ndarray:
+        return await self.client.select_action_batch(observation)
+
+
+def latency_summary(values_ms: list[float]) -> dict | None:
+    if not values_ms:
+        return None
+    values = np.array(values_ms)
+    return {
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "max_ms": float(values.max()),
+    }
+
+
+async def evaluate(policy, num_episodes: int, num_workers: int, envs_per_worker: int, params: dict,
+                   episode_s: float, goal: np.ndarray, goal_noise: float, success_radius: float,
+                   task: str | None = None, seed: int = 0) -> dict:
+    """Run num_episodes closed-loop episodes in rounds of parallel environments and aggregate the metrics"""
+    num_envs = min(num_episodes, num_workers * envs_per_worker)
+    fps = params["fps"]
+    max_steps = int(episode_s * fps)
+    episodes, policy_ms, sim_ms = [], [], []
+
+    start = time.perf_counter()
+    with SimEnvPool(num_envs, num_workers, params) as pool:
+        for round_start in range(0, num_episodes, num_envs):
+            episode_ids = list(range(round_start, min(round_start + num_envs, num_episodes)))
+            num_active = len(episode_ids)
+            # The last round is padded with copies of its last episode, whose results are dropped
+            seeds = [seed + ep for ep in episode_ids] + [seed + episode_ids[-1]] * (num_envs - num_active)
+            # Drawn from the episode seed (a separate stream from the pose noise), so episode k gets the same goal
+            # whatever the number of workers
+            goals = np.stack([
+                goal + np.random.default_rng([env_seed, 1]).uniform(-goal_noise, goal_noise, size=3) for env_seed in seeds
+            ])
+            success_step = np.full(num_envs, -1)
+
+            observation = pool.reset(seeds, goals)
+            distance = np.linalg.norm(pool.arrays["ee"] - goals, axis=1)
+            min_distance = distance.copy()
+            num_ticks = 0
+            await policy.reset()
+            for step in range(max_steps):
+                tick_start = time.perf_counter()
+                batch = dict(observation)
+                if task:
+                    batch["task"] = [task] * num_envs
+                actions = await policy.select_actions(batch)
+                policy_done = time.perf_counter()
+                observation = pool.step(np.asarray(actions, dtype=np.float32).reshape(num_envs, -1))
+                policy_ms.append((policy_done - tick_start) * 1000)
+                sim_ms.append((time.perf_counter() - policy_done) * 1000)
+                num_ticks = step + 1
+
+                distance = np.linalg.norm(pool.arrays["ee"] - goals, axis=1)
+                min_distance = np.minimum(min_distance, distance)
+                success_step[(success_step < 0) & (distance < success_radius)] = step + 1
+                if (success_step[:num_active] >= 0).all():
+                    break
+
+            for env, ep_idx in enumerate(episode_ids):
+                episodes.append({
+                    "episode_index": ep_idx,
+                    "success": bool(success_step[env] >= 0),
+                    "time_to_success_s": float(success_step[env] / fps) if success_step[env] >= 0 else None,
+                    "min_distance_m": float(min_distance[env]),
+                    "final_distance_m": float(distance[env]),
+                    "goal": goals[env].tolist(),
+                })
+            round_success = np.mean([ep["success"] for ep in episodes[-num_active:]])
+            print(f"✓ Episodes {episode_ids[0]}-{episode_ids[-1]}: {round_success:.0%} success, {num_ticks} ticks")
+    elapsed = time.perf_counter() - start
+
+    successes = [ep for ep in episodes if ep["success"]]
+    return {
+        "num_episodes": num_episodes,
+        "num_workers": num_workers,
+        "num_envs": num_envs,
+        "wall_time_s": elapsed,
+        "episodes_per_min": num_episodes / elapsed * 60,
+        "success_rate": len(successes) / num_episodes,
+        "mean_time_to_success_s": float(np.mean([ep["time_to_success_s"] for ep in successes])) if successes else None,
+        "mean_min_distance_m": float(np.mean([ep["min_distance_m"] for ep in episodes])),
+        "policy_latency": latency_summary(policy_ms),
+        "sim_latency": latency_summary(sim_ms),
+        "episodes": episodes,
+    }
+
+
+def print_summary(result: dict):
+    print("\n" + "=" * 60)
+    print(f"📈 SIMULATED EVALUATION: {result['num_episodes']} episodes, {result['num_workers']} workers, {result['num_envs']} envs per tick")
+    print("=" * 60)
+    print(f"Success rate: {result['success_rate']:.1%}")
+    if result["mean_time_to_success_s"] is not None:
+        print(f"Mean time to success: {result['mean_time_to_success_s']:.2f}s")
+    print(f"Mean closest distance to goal: {result['mean_min_distance_m'] * 100:.1f} cm")
+    for name in ["policy_latency", "sim_latency"]:
+        latency = result[name]
+        if latency is None:
+            continue
+        print(f"{name.replace('_', ' ').capitalize()} per tick: mean {latency['mean_ms']:.1f}ms | p50 {latency['p50_ms']:.1f}ms"
+              f" | p95 {latency['p95_ms']:.1f}ms | max {latency['max_ms']:.1f}ms")
+    print(f"Wall-clock time: {result['wall_time_s']:.1f}s ({result['episodes_per_min']:.1f} episodes/min)")
+    print("=" * 60)
+
+
+async def run_evaluation(args) -> list[dict]:
+    params = {"fps": args.fps, "width": args.width, "height": args.height, "init_noise": args.init_noise}
+    goal = np.array([float(value) for value in args.goal.split(',')])
+    worker_counts = [int(n) for n in args.num_workers.split(',')]
+
+    async def evaluate_all(policy):
+        results = []
+        for num_workers in worker_counts:
+            result = await evaluate(policy, args.num_episodes, num_workers, args.envs_per_worker, params,
+                                    args.episode_time, goal, args.goal_noise, args.success_radius, args.task, args.seed)
+            print_summary(result)
+            results.append(result)
+        return results
+
+    if args.policy == "remote":
+        async with LeRobotClient(args.websocket_url) as client:
+            logging.info("✅ LeRobot client connected and ready")
+            results = await evaluate_all(RemotePolicy(client))
+    elif args.policy == "local":
+        results = await evaluate_all(LocalPolicy(args.model_type, args.model_path, args.device))
+    else:
+        results = await evaluate_all(HoldPolicy())
+
+    if len(results) > 1:
+        print(f"\n{'workers':>8} {'wall s':>8} {'episodes/min':>13} {'speedup':>8}")
+        for result in results:
+            speedup = results[0]["wall_time_s"] / result["wall_time_s"]
+            print(f"{result['num_workers']:>8} {result['wall_time_s']:>8.1f} {result['episodes_per_min']:>13.1f} {speedup:>7.1f}x")
+    return results
+
+
+def main():
+    """Entry point that runs the async evaluation."""
+    parser = argparse.ArgumentParser(description="Evaluate a policy on parallel simulated SO-ARM100 episodes")
+    parser.add_argument("--policy", choices=POLICIES, default="remote",
+                       help="Remote WebSocket server, local lerobot policy, or hold (harness only)")
+    parser.add_argument("--websocket-url", default="ws://localhost:8765",
+                       help="WebSocket server URL for --policy remote (default: ws://localhost:8765)")
+    parser.add_argument("--model-type", choices=['act', 'pi0', 'smolvla', 'pi0fast'], default="act",
+                       help="Model type for --policy local")
+    parser.add_argument("--model-path", help="Path or name of the pretrained model for --policy local")
+    parser.add_argument("--device", default="cuda", help="Device for --policy local (default: cuda)")
+    parser.add_argument("--task", help="Task description (required for certain models like PI0 and SmolVLA)")
+    parser.add_argument("--num-episodes", type=int, default=100, help="Number of episodes (default: 100)")
+    parser.add_argument("--num-workers", default=str(os.cpu_count() or 1),
+                       help="Simulation processes, comma-separated to compare several counts (default: all cores)")
+    parser.add_argument("--envs-per-worker", type=int, default=1, help="Environments per worker process (default: 1)")
+    parser.add_argument("--episode-time", type=float, default=10.0, help="Episode duration in seconds (default: 10)")
+    parser.add_argument("--fps", type=int, default=25, help="Control frequency (default: 25)")
+    parser.add_argument("--width", type=int, default=640, help="Camera width (default: 640)")
+    parser.add_argument("--height", type=int, default=480, help="Camera height (default: 480)")
+    parser.add_argument("--init-noise", type=float, default=0.05, help="Std of the initial joint perturbation in radians")
+    parser.add_argument("--goal", default="0.0,-0.25,0.1", help="End-effector goal x,y,z in meters")
+    parser.add_argument("--goal-noise", type=float, default=0.03, help="Uniform per-episode goal jitter in meters")
+    parser.add_argument("--success-radius", type=float, default=0.02, help="Goal distance counted as success in meters")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output-file", help="Write the metrics and per-episode results as JSON")
+
+    args = parser.parse_args()
+    if args.policy == "local" and not args.model_path:
+        parser.error("--policy local requires --model-path")
+    logging.basicConfig(level=logging.INFO)
+
+    results = asyncio.run(run_evaluation(args))
+    if args.output_file:
+        with open(args.output_file, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -113,3 +113,16 @@ class LeRobotClient:
             return action
         else:
             raise LeRobotClientError(f"Unexpected response: {response}")
+    
+    async def select_action_batch(self, observation: Dict[str, Any]) -> np.ndarray:
+        """Actions of shape (batch, action_dim) for observation arrays with a leading batch dimension"""
+        if not isinstance(observation, dict):
+            raise LeRobotClientError("Observation must be a dictionary")
+        
+        message = {"type": "select_action_batch", "observation": observation}
+        response = await self._send_message(message)
+
+        if response.get("type") == "action_response":
+            return response["action"]
+        else:
+            raise LeRobotClientError(f"Unexpected response: {response}")
@@ -46,6 +46,19 @@ def convert_observation(observation, device):
     return flat_observation
 
 
+def convert_batch_observation(observation):
+    """Like convert_observation, for arrays that already have a leading batch dimension"""
+    batch_observation = {}
+    for key, value in observation.items():
+        if isinstance(value, np.ndarray):
+            value = torch.from_numpy(value)
+            if "image" in key:
+                value = value.type(torch.float16) / 255
+                value = value.permute(0, 3, 1, 2).contiguous()
+        batch_observation[key] = value
+    return batch_observation
+
+
 class PolicyWebSocketServer:
     def __init__(self, policy: PreTrainedPolicy, device: str = "cuda", max_size: int = 100 * 1024 * 1024):
         self.policy = policy
@@ -98,6 +111,22 @@ class PolicyWebSocketServer:
                 
                 await websocket.send(packb(response))
                 
+            elif data.get("type") == "select_action_batch":
+                # One policy call for the observations of several environments (e.g. remote_inference/eval_sim.py)
+                start_time = time()
+                observation = convert_batch_observation(data["observation"])
+                observation = self._move_observation_to_device(observation)
+                with torch.inference_mode():
+                    action = self.policy.select_action(observation)
+                duration_ms = (time() - start_time) * 1000
+                print(f"Time taken to select batched action ({action.shape[0]} envs): {duration_ms} ms")
+                
+                response = {
+                    "type": "action_response",
+                    "action": action.cpu().numpy()
+                }
+                await websocket.send(packb(response))
+                
             elif data.get("type") == "reset":
                 self.policy.reset()
                 response = {"type": "reset_response", "status": "success"}
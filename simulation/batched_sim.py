@@ -0,0 +1,243 @@
+"""
+Headless batched MuJoCo engine for the SO-ARM100 model.
+
+BatchedSim holds N independent MjData instances of trs_so_arm100/so_arm100.xml
+and steps them without a viewer, either in a thread pool (mj_step releases the
+GIL, so threads run in parallel) or in worker processes that each own a slice
+of the environments and exchange controls/observations through shared memory.
+
+    with BatchedSim(num_envs=64, backend="thread", num_workers=8) as sim:
+        obs = sim.reset(keyframe="home")
+        obs = sim.step(actions)  # actions: (num_envs, nu) -> {"qpos": (num_envs, nq), "qvel": (num_envs, nv), "time": (num_envs,),
+                                 #                             "self_contacts": (num_envs,)}
+
+Usage:
+    python batched_sim.py --num_envs 1,8,64,256 --num_workers 1,2,4,8 --backend thread
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import mujoco
+import numpy as np
+
+from model_cache import MODEL_PATH, load_model
+
+BACKENDS = ["thread", "process"]
+
+
+def split_range(n: int, parts: int) -> list[tuple[int, int]]:
+    """Split range(n) into `parts` contiguous (start, end) slices of near-equal size"""
+    bounds = np.linspace(0, n, parts + 1).round().astype(int)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def array_layout(model: mujoco.MjModel) -> list[tuple[str, int]]:
+    return [("ctrl", model.nu), ("qpos", model.nq), ("qvel", model.nv), ("time", 1), ("self_contacts", 1)]
+
+
+def buffer_size(model: mujoco.MjModel, num_envs: int) -> int:
+    return num_envs * sum(width for _, width in array_layout(model)) * np.dtype(np.float64).itemsize
+
+
+def batch_arrays(model: mujoco.MjModel, num_envs: int, buffer=None) -> dict[str, np.ndarray]:
+    """(num_envs, width) float64 arrays for controls and observations, views into buffer if one is given"""
+    arrays, offset = {}, 0
+    for name, width in array_layout(model):
+        if buffer is None:
+            arrays[name] = np.zeros((num_envs, width))
+        else:
+            arrays[name] = np.ndarray((num_envs, width), dtype=np.float64, buffer=buffer, offset=offset)
+            offset += num_envs * width * np.dtype(np.float64).itemsize
+    return arrays
+
+
+def self_contact_count(model: mujoco.MjModel, data: mujoco.MjData) -> int:
+    """Number of active contacts between two geoms of the same (non-world) kinematic tree"""
+    if data.ncon == 0:
+        return 0
+    roots = model.body_rootid[model.geom_bodyid[data.contact.geom]]
+    return int(((roots[:, 0] == roots[:, 1]) & (roots[:, 0] != 0)).sum())
+
+
+def write_observation(model: mujoco.MjModel, arrays: dict, i: int, data: mujoco.MjData):
+    arrays["qpos"][i] = data.qpos
+    arrays["qvel"][i] = data.qvel
+    arrays["time"][i, 0] = data.time
+    arrays["self_contacts"][i, 0] = self_contact_count(model, data)
+
+
+def step_slice(model: mujoco.MjModel, datas: list, arrays: dict, start: int, substeps: int):
+    for i, data in enumerate(datas, start):
+        data.ctrl[:] = arrays["ctrl"][i]
+        for _ in range(substeps):
+            mujoco.mj_step(model, data)
+        write_observation(model, arrays, i, data)
+
+
+def reset_slice(model: mujoco.MjModel, datas: list, arrays: dict, start: int, keyframe_id: int, set_qpos: bool = False):
+    for i, data in enumerate(datas, start):
+        if keyframe_id < 0:
+            mujoco.mj_resetData(model, data)
+        else:
+            mujoco.mj_resetDataKeyframe(model, data, keyframe_id)
+        if set_qpos:
+            data.qpos[:] = arrays["qpos"][i]
+        mujoco.mj_forward(model, data)
+        arrays["ctrl"][i] = data.ctrl
+        write_observation(model, arrays, i, data)
+
+
+COMMANDS = {"step": step_slice, "reset": reset_slice}
+
+
+def _process_worker(model_path, shm_name: str, num_envs: int, start: int, end: int, conn):
+    """Own the MjData of envs [start, end) and run commands on them until told to close"""
+    # Forked workers inherit the parent's loaded model, spawned ones load the cached MJB
+    model = load_model(model_path)
+    datas = [mujoco.MjData(model) for _ in range(end - start)]
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = batch_arrays(model, num_envs, shm.buf)
+    try:
+        while True:
+            cmd, args = conn.recv()
+            if cmd == "close":
+                break
+            try:
+                COMMANDS[cmd](model, datas, arrays, start, *args)
+                conn.send(None)
+            except Exception as e:
+                conn.send(e)
+    finally:
+        del arrays
+        shm.close()
+
+
+class BatchedSim:
+    """N independent SO-ARM100 environments stepped together, headless"""
+
+    def __init__(self, num_envs: int, backend: str = "thread", num_workers: int | None = None, substeps: int = 1,
+                 model_path=MODEL_PATH):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, use one of {BACKENDS}")
+        self.model = load_model(model_path)
+        self.num_envs = num_envs
+        self.backend = backend
+        self.substeps = substeps
+        self.slices = split_range(num_envs, min(num_workers or os.cpu_count() or 1, num_envs))
+
+        if backend == "thread":
+            self.arrays = batch_arrays(self.model, num_envs)
+            self.datas = [mujoco.MjData(self.model) for _ in range(num_envs)]
+            self.executor = ThreadPoolExecutor(max_workers=len(self.slices))
+        else:
+            self.shm = shared_memory.SharedMemory(create=True, size=buffer_size(self.model, num_envs))
+            self.arrays = batch_arrays(self.model, num_envs, self.shm.buf)
+            self.conns, self.processes = [], []
+            for start, end in self.slices:
+                parent_conn, child_conn = mp.Pipe()
+                process = mp.Process(
+                    target=_process_worker, args=(model_path, self.shm.name, num_envs, start, end, child_conn), daemon=True
+                )
+                process.start()
+                self.conns.append(parent_conn)
+                self.processes.append(process)
+
+    def _run(self, cmd: str, *args):
+        if self.backend == "thread":
+            list(self.executor.map(
+                lambda s: COMMANDS[cmd](self.model, self.datas[s[0]:s[1]], self.arrays, s[0], *args), self.slices
+            ))
+            return
+        for conn in self.conns:
+            conn.send((cmd, args))
+        for conn in self.conns:
+            error = conn.recv()
+            if error is not None:
+                raise error
+
+    def observation(self) -> dict[str, np.ndarray]:
+        return {
+            "qpos": self.arrays["qpos"].copy(),
+            "qvel": self.arrays["qvel"].copy(),
+            "time": self.arrays["time"][:, 0].copy(),
+            "self_contacts": self.arrays["self_contacts"][:, 0].astype(int),
+        }
+
+    def reset(self, keyframe: str | None = None, qpos: np.ndarray | None = None) -> dict[str, np.ndarray]:
+        """Reset every env to the default state or to a named keyframe (e.g. "home"), then to (num_envs, nq) qpos if given"""
+        keyframe_id = -1 if keyframe is None else mujoco.mj_name2id(self.model, mujoco.mjtObj.mjOBJ_KEY, keyframe)
+        if qpos is not None:
+            self.arrays["qpos"][:] = qpos
+        self._run("reset", keyframe_id, qpos is not None)
+        return self.observation()
+
+    def step(self, actions: np.ndarray) -> dict[str, np.ndarray]:
+        """Apply (num_envs, nu) controls, advance every env by `substeps` physics steps"""
+        self.arrays["ctrl"][:] = actions
+        self._run("step", self.substeps)
+        return self.observation()
+
+    def close(self):
+        if self.backend == "thread":
+            self.executor.shutdown()
+            return
+        for conn in self.conns:
+            conn.send(("close", ()))
+        for process in self.processes:
+            process.join()
+        del self.arrays
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(num_envs_list: list[int], num_workers_list: list[int], backend: str, num_steps: int, substeps: int):
+    """Simulated steps per second for every (num_envs, num_workers) combination"""
+    print(f"\n=== BatchedSim benchmark ({backend}, {os.cpu_count()} cores, {num_steps} steps x {substeps} substeps) ===")
+    print(f"{'envs':>6} {'workers':>8} {'steps/s':>12} {'sim s / wall s':>15}")
+    results = []
+    for num_envs in num_envs_list:
+        for num_workers in num_workers_list:
+            if num_workers > num_envs:
+                continue
+            with BatchedSim(num_envs, backend, num_workers, substeps) as sim:
+                sim.reset(keyframe="home")
+                actions = sim.arrays["ctrl"].copy()
+                sim.step(actions)  # warm up worker pools
+                start = time.perf_counter()
+                for _ in range(num_steps):
+                    sim.step(actions)
+                elapsed = time.perf_counter() - start
+            steps_per_s = num_envs * num_steps * substeps / elapsed
+            results.append({"num_envs": num_envs, "num_workers": num_workers, "steps_per_s": steps_per_s})
+            print(f"{num_envs:>6} {num_workers:>8} {steps_per_s:>12.0f} {steps_per_s * sim.model.opt.timestep:>15.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the headless batched SO-ARM100 simulation')
+    parser.add_argument('--num_envs', type=str, default='1,8,64,256', help='Comma-separated numbers of environments')
+    parser.add_argument('--num_workers', type=str, default=None, help='Comma-separated numbers of workers (default: 1,2,4,... up to the core count)')
+    parser.add_argument('--backend', choices=BACKENDS, default='thread', help='Step environments in threads or processes')
+    parser.add_argument('--steps', type=int, default=1000, help='Batched steps per measurement')
+    parser.add_argument('--substeps', type=int, default=1, help='Physics steps per batched step')
+
+    args = parser.parse_args()
+
+    num_envs_list = [int(n) for n in args.num_envs.split(',')]
+    if args.num_workers:
+        num_workers_list = [int(n) for n in args.num_workers.split(',')]
+    else:
+        cores = os.cpu_count() or 1
+        num_workers_list = sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+    benchmark(num_envs_list, num_workers_list, args.backend, args.steps, args.substeps)
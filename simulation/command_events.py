@@ -0,0 +1,219 @@
+"""
+Event-driven command input for the interactive simulator.
+
+Commands arrive concurrently from any number of sources, each running in its
+own daemon thread so a blocking read never stalls the physics:
+
+- stdin_source: one command per line typed at the prompt
+- socket_source: one command per line from TCP clients on localhost, e.g.
+  `echo "q+" | nc localhost 5555`
+- script_source: one command per line from a file, with `sleep SECONDS` lines
+  for timing and `#` comments
+
+Sources append (source, command) events to a CommandQueue, a collections.deque:
+append and popleft are atomic in CPython, so producers never take a lock and the
+sim thread pops everything queued in drain() at the start of a control tick.
+AsyncLogger does the same for output: the sim thread only appends messages and
+a background thread prints them, so terminal I/O never delays a tick.
+
+    events = CommandQueue()
+    stop = threading.Event()
+    start_sources(events, stop, stdin=True, port=5555, script="demo.txt")
+    while running:
+        for source, cmd in events.drain():
+            process_command(cmd)
+        scheduler.tick(control_fn)
+
+Usage:
+    python command_events.py --rates 100,250,500,1000,2000,5000   # maximum stable control rate
+"""
+
+import argparse
+import copy
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+
+import mujoco
+import numpy as np
+
+from controller import JOINT_KEYS, BatchedController, apply_command
+from model_cache import MODEL_PATH, load_model
+from scheduler import SimScheduler
+
+
+class CommandQueue:
+    """Multi-producer, single-consumer command queue without locks on either side"""
+
+    def __init__(self):
+        self.events = deque()
+
+    def put(self, source: str, cmd: str):
+        self.events.append((source, cmd))
+
+    def drain(self) -> list[tuple[str, str]]:
+        """Pop every event queued so far, in arrival order"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.popleft())
+            except IndexError:
+                return events
+
+
+class AsyncLogger:
+    """print() on a background thread, log() only appends to a deque"""
+
+    def __init__(self, interval: float = 0.02):
+        self.messages = deque()
+        self.interval = interval
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def log(self, *args, **kwargs):
+        self.messages.append((args, kwargs))
+
+    def _flush(self):
+        while self.messages:
+            args, kwargs = self.messages.popleft()
+            print(*args, **kwargs)
+
+    def _run(self):
+        while self.running:
+            self._flush()
+            time.sleep(self.interval)
+        self._flush()
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+
+
+def stdin_source(events: CommandQueue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            cmd = input("> ").strip().lower()
+        except (EOFError, KeyboardInterrupt):
+            events.put("stdin", "quit")
+            return
+        events.put("stdin", cmd)
+
+
+def socket_source(events: CommandQueue, stop: threading.Event, port: int, host: str = "localhost"):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            source = f"socket:{self.client_address[1]}"
+            for line in self.rfile:
+                cmd = line.decode(errors="replace").strip().lower()
+                if cmd:
+                    events.put(source, cmd)
+
+    class Server(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    with Server((host, port), Handler) as server:
+        threading.Thread(target=lambda: (stop.wait(), server.shutdown()), daemon=True).start()
+        server.serve_forever(poll_interval=0.1)
+
+
+def script_source(events: CommandQueue, stop: threading.Event, path: str):
+    with open(path) as f:
+        lines = [line.strip().lower() for line in f]
+    for line in lines:
+        if stop.is_set():
+            return
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('sleep '):
+            stop.wait(float(line.split()[1]))
+        else:
+            events.put("script", line)
+
+
+def start_sources(events: CommandQueue, stop: threading.Event, stdin: bool = True, port: int | None = None,
+                  script: str | None = None) -> list[threading.Thread]:
+    """Start a daemon thread per enabled source, all feeding the same queue"""
+    targets = []
+    if stdin:
+        targets.append((stdin_source, (events, stop)))
+    if port is not None:
+        targets.append((socket_source, (events, stop, port)))
+    if script is not None:
+        targets.append((script_source, (events, stop, script)))
+    threads = [threading.Thread(target=target, args=args, daemon=True) for target, args in targets]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def benchmark_control_rate(rates: list[float], seconds: float = 2.0, command_hz: float = 200.0) -> float | None:
+    """Highest control rate that keeps real time while commands stream in and are logged (to os.devnull)"""
+    model = load_model(MODEL_PATH)
+    controller = BatchedController(mode="position")
+    commands = [f"{key}{sign}" for key in JOINT_KEYS for sign in "+-"]
+    print(f"\n=== Control rate benchmark ({seconds:.0f}s per rate, commands at {command_hz:.0f} Hz, realtime pacing) ===")
+    print(f"{'control Hz':>10} {'achieved Hz':>12} {'RTF':>6} {'late ticks':>11} {'events':>7} {'stable':>7}")
+
+    max_stable = None
+    for rate in rates:
+        run_model = copy.copy(model)
+        data = mujoco.MjData(run_model)
+        mujoco.mj_resetDataKeyframe(run_model, data, run_model.key("home").id)
+        mujoco.mj_forward(run_model, data)
+        targets = data.qpos[:run_model.nu].copy()
+        # Never advance more than one control period per tick
+        timestep = min(run_model.opt.timestep, 1.0 / rate)
+        scheduler = SimScheduler(run_model, data, control_hz=rate, timestep=timestep, display_hz=0, pacing="realtime")
+
+        events = CommandQueue()
+        logger = AsyncLogger()
+        stop = threading.Event()
+
+        def produce():
+            rng = np.random.default_rng(0)
+            while not stop.wait(1.0 / command_hz):
+                events.put("benchmark", str(rng.choice(commands)))
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        applied = 0
+
+        def control():
+            data.ctrl[:] = controller.compute(targets[None], data.qpos[None, :run_model.nu], data.qvel[None, :run_model.nu])[0]
+
+        scheduler.restart()
+        with open(os.devnull, "w") as devnull:
+            for _ in range(scheduler.ticks_for(seconds)):
+                for source, cmd in events.drain():
+                    apply_command(targets, cmd, 0.01)
+                    applied += 1
+                    # Formatting the array happens on the logger thread
+                    logger.log(f"{source}: {cmd} ->", targets.copy(), file=devnull)
+                scheduler.tick(control)
+            stats = scheduler.stats()
+            stop.set()
+            producer.join()
+            logger.close()
+
+        achieved = stats["ticks"] / stats["wall_time"]
+        stable = stats["late_ticks"] == 0 and stats["rtf"] >= 0.99
+        if stable:
+            max_stable = rate
+        print(f"{rate:>10.0f} {achieved:>12.0f} {stats['rtf']:>6.2f} {stats['late_ticks']:>11} {applied:>7} {'yes' if stable else 'no':>7}")
+
+    print(f"Maximum stable control rate: {max_stable:.0f} Hz" if max_stable else "No rate was stable")
+    return max_stable
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Find the maximum stable control rate with event-driven command input')
+    parser.add_argument('--rates', type=str, default='100,250,500,1000,2000,5000', help='Comma-separated control rates in Hz')
+    parser.add_argument('--seconds', type=float, default=2.0, help='Simulated seconds per rate')
+    parser.add_argument('--command_hz', type=float, default=200.0, help='Rate of the synthetic command stream')
+
+    args = parser.parse_args()
+    benchmark_control_rate([float(rate) for rate in args.rates.split(',')], args.seconds, args.command_hz)
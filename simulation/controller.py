@@ -0,0 +1,114 @@
+"""
+Vectorized joint controller for batches of SO-ARM100 environments.
+
+Control for all environments is computed in one NumPy operation over stacked
+(num_envs, 6) target/qpos/qvel arrays:
+
+- "position": the MJCF declares `position` actuators (kp=50, critically damped),
+  so the controller only clips the targets to JOINT_LIMITS and returns them as ctrl.
+- "torque": explicit PD torques kp * (target - qpos) - kd * qvel, clipped to the
+  actuator force range, for writing to qfrc_applied (or a model with motor actuators).
+
+Usage:
+    python controller.py --max_envs 1024
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+JOINT_NAMES = ["Rotation", "Pitch", "Elbow", "Wrist_Pitch", "Wrist_Roll", "Jaw"]
+JOINT_LIMITS = np.array([
+    (-2.2, 2.2),         # Rotation
+    (-3.14158, 0.2),     # Pitch
+    (0.0, 3.14158),      # Elbow
+    (-2.0, 1.8),         # Wrist_Pitch
+    (-3.14158, 3.14158), # Wrist_Roll
+    (-0.2, 2.0)          # Jaw
+])
+JOINT_KEYS = {'q': 0, 'w': 1, 'e': 2, 'r': 3, 't': 4, 'y': 5}
+MODES = ["position", "torque"]
+
+
+def clip_targets(targets: np.ndarray) -> np.ndarray:
+    """Clip (..., 6) joint targets to JOINT_LIMITS"""
+    return np.clip(targets, JOINT_LIMITS[:, 0], JOINT_LIMITS[:, 1])
+
+
+def apply_command(targets: np.ndarray, cmd: str, increment: float, home: np.ndarray | None = None) -> bool:
+    """Update targets in place for a joint command ('q+', 'w-', ...) or 'reset', return False for any other command"""
+    if cmd == 'reset':
+        targets[:] = 0.0 if home is None else home
+        return True
+    if len(cmd) == 2 and cmd[0] in JOINT_KEYS and cmd[1] in ['+', '-']:
+        joint_idx = JOINT_KEYS[cmd[0]]
+        delta = increment if cmd[1] == '+' else -increment
+        targets[joint_idx] = np.clip(targets[joint_idx] + delta, *JOINT_LIMITS[joint_idx])
+        return True
+    return False
+
+
+class BatchedController:
+    """Map (num_envs, 6) joint targets to (num_envs, 6) controls"""
+
+    def __init__(self, mode: str = "position", kp: float = 50.0, kd: float = 5.0, torque_limit: float = 35.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}, use one of {MODES}")
+        self.mode = mode
+        self.kp = kp
+        self.kd = kd
+        self.torque_limit = torque_limit
+
+    def compute(self, targets: np.ndarray, qpos: np.ndarray, qvel: np.ndarray) -> np.ndarray:
+        targets = clip_targets(targets)
+        if self.mode == "position":
+            return targets
+        torques = self.kp * (targets - qpos) - self.kd * qvel
+        return np.clip(torques, -self.torque_limit, self.torque_limit)
+
+    def compute_loop(self, targets: np.ndarray, qpos: np.ndarray, qvel: np.ndarray) -> np.ndarray:
+        """Reference per-env Python loop, same result as compute"""
+        ctrl = np.empty_like(targets)
+        for env in range(len(targets)):
+            for j in range(targets.shape[1]):
+                target = min(max(targets[env, j], JOINT_LIMITS[j, 0]), JOINT_LIMITS[j, 1])
+                if self.mode == "position":
+                    ctrl[env, j] = target
+                else:
+                    torque = self.kp * (target - qpos[env, j]) - self.kd * qvel[env, j]
+                    ctrl[env, j] = min(max(torque, -self.torque_limit), self.torque_limit)
+        return ctrl
+
+
+def benchmark(max_envs: int = 1024, repeats: int = 100, seed: int = 0):
+    """Time the vectorized controller against the per-env loop for 1..max_envs environments"""
+    rng = np.random.default_rng(seed)
+    print(f"\n=== Controller benchmark ({repeats} calls each) ===")
+    print(f"{'mode':>8} {'envs':>6} {'loop us':>10} {'vector us':>10} {'speedup':>8}")
+    for mode in MODES:
+        controller = BatchedController(mode)
+        num_envs = 1
+        while num_envs <= max_envs:
+            targets = rng.uniform(JOINT_LIMITS[:, 0] - 0.5, JOINT_LIMITS[:, 1] + 0.5, size=(num_envs, len(JOINT_NAMES)))
+            qpos = rng.uniform(JOINT_LIMITS[:, 0], JOINT_LIMITS[:, 1], size=targets.shape)
+            qvel = rng.normal(size=targets.shape)
+            assert np.allclose(controller.compute(targets, qpos, qvel), controller.compute_loop(targets, qpos, qvel))
+
+            timings = []
+            for fn in (controller.compute_loop, controller.compute):
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    fn(targets, qpos, qvel)
+                timings.append((time.perf_counter() - start) / repeats * 1e6)
+            print(f"{mode:>8} {num_envs:>6} {timings[0]:>10.1f} {timings[1]:>10.1f} {timings[0] / timings[1]:>7.1f}x")
+            num_envs *= 4
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized joint controller')
+    parser.add_argument('--max_envs', type=int, default=1024, help='Largest number of environments')
+    parser.add_argument('--repeats', type=int, default=100, help='Calls timed per measurement')
+
+    args = parser.parse_args()
+    benchmark(args.max_envs, args.repeats)
@@ -0,0 +1,253 @@
+"""
+Generate scripted or randomized SO-ARM100 demonstrations as a LeRobot v2.1 dataset.
+
+Episodes are built from the joint command vocabulary of test_mujoco.py
+(q+/q- ... y+/y-, reset): every command moves one joint target by --increment
+radians and is held for --command_s seconds. With --script the same command
+sequence is replayed in every episode (from a slightly perturbed home pose),
+otherwise random commands are sampled per episode.
+
+A pool of headless SimRobot workers renders the phone/on_robot cameras and
+streams every episode straight to disk: one parquet file (observation.state,
+action in degrees, timestamp, indices) and one mp4 per camera, in the same
+layout data_cleaning.py produces. meta/ and the stats are written at the end
+with dataset_cleaning/compute_stats.py.
+
+Usage:
+    MUJOCO_GL=egl python generate_demos.py --output_root ./sim_dataset --num_episodes 100 --num_workers 8
+    MUJOCO_GL=egl python generate_demos.py --output_root ./sim_dataset --script "w- w- e+ y+ y- reset"
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import av
+import mujoco
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from controller import JOINT_KEYS, apply_command
+from model_cache import SCENE_PATH, load_model
+from sim_robot import SimRobot
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "dataset_cleaning"))
+from compute_stats import compute_dataset_stats  # noqa: E402
+from episode_io import (  # noqa: E402
+    EPISODES_FILE,
+    INFO_FILE,
+    TASKS_FILE,
+    episode_data_path,
+    episode_video_path,
+    write_json,
+    write_jsonlines,
+)
+
+CHUNKS_SIZE = 1000
+DATA_PATH = "data/chunk-{episode_chunk:03d}/episode_{episode_index:06d}.parquet"
+VIDEO_PATH = "videos/chunk-{episode_chunk:03d}/{video_key}/episode_{episode_index:06d}.mp4"
+MOTOR_NAMES = ["main_shoulder_pan", "main_shoulder_lift", "main_elbow_flex", "main_wrist_flex", "main_wrist_roll", "main_gripper"]
+CODEC_NAMES = {"libsvtav1": "av1", "libx264": "h264", "libx265": "hevc"}
+RANDOM_COMMANDS = [f"{key}{sign}" for key in JOINT_KEYS for sign in "+-"]
+
+_robot = None
+
+
+def dataset_info(fps: int, width: int, height: int, camera_names: list[str], codec: str, pix_fmt: str) -> dict:
+    features = {
+        "action": {"dtype": "float32", "shape": [len(MOTOR_NAMES)], "names": MOTOR_NAMES},
+        "observation.state": {"dtype": "float32", "shape": [len(MOTOR_NAMES)], "names": MOTOR_NAMES},
+    }
+    for name in camera_names:
+        features[f"observation.images.{name}"] = {
+            "dtype": "video",
+            "shape": [height, width, 3],
+            "names": ["height", "width", "channels"],
+            "info": {
+                "video.fps": float(fps),
+                "video.height": height,
+                "video.width": width,
+                "video.channels": 3,
+                "video.codec": codec,
+                "video.pix_fmt": pix_fmt,
+                "video.is_depth_map": False,
+                "has_audio": False,
+            },
+        }
+    for name, dtype in [("timestamp", "float32"), ("frame_index", "int64"), ("episode_index", "int64"),
+                        ("index", "int64"), ("task_index", "int64")]:
+        features[name] = {"dtype": dtype, "shape": [1], "names": None}
+    return {
+        "codebase_version": "v2.1",
+        "robot_type": "sim_so100",
+        "total_episodes": 0,
+        "total_frames": 0,
+        "total_tasks": 1,
+        "total_videos": 0,
+        "total_chunks": 0,
+        "chunks_size": CHUNKS_SIZE,
+        "fps": fps,
+        "splits": {"train": "0:0"},
+        "data_path": DATA_PATH,
+        "video_path": VIDEO_PATH,
+        "features": features,
+    }
+
+
+def episode_commands(script: list[str] | None, num_commands: int, rng: np.random.Generator) -> list[str]:
+    if script:
+        return [script[i % len(script)] for i in range(num_commands)]
+    return list(rng.choice(RANDOM_COMMANDS, size=num_commands))
+
+
+class VideoWriter:
+    """Encode rgb24 frames into an mp4 one at a time"""
+
+    def __init__(self, path: Path, fps: int, width: int, height: int, codec: str, pix_fmt: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.container = av.open(str(path), "w")
+        self.stream = self.container.add_stream(codec, rate=fps)
+        self.stream.width, self.stream.height, self.stream.pix_fmt = width, height, pix_fmt
+
+    def write(self, image: np.ndarray):
+        frame = av.VideoFrame.from_ndarray(image, format="rgb24")
+        for packet in self.stream.encode(frame):
+            self.container.mux(packet)
+
+    def close(self):
+        for packet in self.stream.encode():
+            self.container.mux(packet)
+        self.container.close()
+
+
+def generate_episode(output_root: Path, info: dict, ep_idx: int, params: dict) -> dict:
+    """Roll out one episode in this worker's SimRobot and write its parquet and mp4 files"""
+    global _robot
+    if _robot is None:
+        _robot = SimRobot(fps=info["fps"], width=params["width"], height=params["height"])
+        _robot.connect()
+    robot = _robot
+    rng = np.random.default_rng(params["seed"] + ep_idx)
+
+    robot.reset()
+    home = robot.data.qpos[:robot.model.nu].copy()
+    robot.data.qpos[:robot.model.nu] += rng.normal(scale=params["init_noise"], size=robot.model.nu)
+    mujoco.mj_forward(robot.model, robot.data)
+    targets = robot.data.qpos[:robot.model.nu].copy()
+
+    fps = info["fps"]
+    length = int(params["episode_s"] * fps)
+    frames_per_command = max(1, int(params["command_s"] * fps))
+    commands = episode_commands(params["script"], -(-length // frames_per_command), rng)
+
+    camera_keys = [key for key, ft in info["features"].items() if ft["dtype"] == "video"]
+    writers = {
+        key: VideoWriter(episode_video_path(output_root, info, ep_idx, key), fps, params["width"], params["height"],
+                         params["encoder"], params["pix_fmt"])
+        for key in camera_keys
+    }
+    states = np.empty((length, robot.model.nu), dtype=np.float32)
+    actions = np.empty((length, robot.model.nu), dtype=np.float32)
+    for frame_index in range(length):
+        if frame_index % frames_per_command == 0:
+            apply_command(targets, commands[frame_index // frames_per_command], params["increment"], home)
+        observation = robot.capture_observation()
+        states[frame_index] = observation["observation.state"].numpy()
+        for key, writer in writers.items():
+            writer.write(observation[key].numpy())
+        actions[frame_index] = robot.send_action(np.degrees(targets)).numpy()
+    for writer in writers.values():
+        writer.close()
+
+    num_motors = robot.model.nu
+    table = pa.table({
+        "action": pa.FixedSizeListArray.from_arrays(pa.array(actions.ravel()), num_motors),
+        "observation.state": pa.FixedSizeListArray.from_arrays(pa.array(states.ravel()), num_motors),
+        "timestamp": pa.array(np.arange(length, dtype=np.float32) / fps),
+        "frame_index": pa.array(np.arange(length, dtype=np.int64)),
+        "episode_index": pa.array(np.full(length, ep_idx, dtype=np.int64)),
+        "index": pa.array(np.arange(ep_idx * length, (ep_idx + 1) * length, dtype=np.int64)),
+        "task_index": pa.array(np.zeros(length, dtype=np.int64)),
+    })
+    data_path = episode_data_path(output_root, info, ep_idx)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, data_path)
+    return {"episode_index": ep_idx, "length": length}
+
+
+def generate_dataset(output_root: Path, num_episodes: int, params: dict, task: str, fps: int = 30, num_workers: int = 8) -> dict:
+    """Generate num_episodes episodes in a process pool and write the dataset metadata and stats"""
+    output_root = Path(output_root)
+    camera_names = ["phone", "on_robot"]
+    info = dataset_info(fps, params["width"], params["height"], camera_names,
+                        CODEC_NAMES.get(params["encoder"], params["encoder"]), params["pix_fmt"])
+
+    start = time.perf_counter()
+    load_model(SCENE_PATH)  # compiled once here, inherited by the forked workers
+    episodes = []
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(generate_episode, output_root, info, ep_idx, params) for ep_idx in range(num_episodes)]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Generating episodes"):
+            episode = future.result()
+            episodes.append({"episode_index": episode["episode_index"], "tasks": [task], "length": episode["length"]})
+    elapsed = time.perf_counter() - start
+    episodes.sort(key=lambda ep: ep["episode_index"])
+
+    total_frames = sum(ep["length"] for ep in episodes)
+    info.update({
+        "total_episodes": num_episodes,
+        "total_frames": total_frames,
+        "total_videos": num_episodes * len(camera_names),
+        "total_chunks": (num_episodes + CHUNKS_SIZE - 1) // CHUNKS_SIZE,
+        "splits": {"train": f"0:{num_episodes}"},
+    })
+    write_json(info, output_root / INFO_FILE)
+    write_jsonlines(episodes, output_root / EPISODES_FILE)
+    write_jsonlines([{"task_index": 0, "task": task}], output_root / TASKS_FILE)
+    compute_dataset_stats(output_root, num_workers=num_workers)
+
+    minutes = elapsed / 60
+    print(f"✓ Generated {num_episodes} episodes ({total_frames} frames) in {elapsed:.1f}s: "
+          f"{num_episodes / minutes:.1f} episodes/min, {num_episodes / minutes / num_workers:.1f} episodes/min/core, "
+          f"{total_frames / elapsed:.0f} frames/s")
+    return info
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate scripted SO-ARM100 demonstrations as a LeRobot dataset')
+    parser.add_argument('--output_root', type=str, required=True, help='Root directory of the generated dataset')
+    parser.add_argument('--num_episodes', type=int, default=50, help='Number of episodes')
+    parser.add_argument('--num_workers', type=int, default=os.cpu_count() or 1, help='Number of simulation processes')
+    parser.add_argument('--script', type=str, default=None, help="Space-separated commands replayed in every episode, e.g. 'w- e+ y+ reset' (default: random)")
+    parser.add_argument('--task', type=str, default="Move the arm.", help='Task description stored in tasks.jsonl')
+    parser.add_argument('--fps', type=int, default=30, help='Frames per second')
+    parser.add_argument('--episode_s', type=float, default=10.0, help='Episode duration in seconds')
+    parser.add_argument('--command_s', type=float, default=0.5, help='Seconds each command is held')
+    parser.add_argument('--increment', type=float, default=0.3, help='Joint target change per command in radians')
+    parser.add_argument('--init_noise', type=float, default=0.05, help='Std of the initial joint perturbation in radians')
+    parser.add_argument('--width', type=int, default=640, help='Camera width')
+    parser.add_argument('--height', type=int, default=480, help='Camera height')
+    parser.add_argument('--encoder', type=str, default='libsvtav1', choices=list(CODEC_NAMES), help='Video encoder')
+    parser.add_argument('--pix_fmt', type=str, default='yuv420p', help='Video pixel format')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+    args = parser.parse_args()
+
+    params = {
+        "script": args.script.split() if args.script else None,
+        "episode_s": args.episode_s,
+        "command_s": args.command_s,
+        "increment": args.increment,
+        "init_noise": args.init_noise,
+        "width": args.width,
+        "height": args.height,
+        "encoder": args.encoder,
+        "pix_fmt": args.pix_fmt,
+        "seed": args.seed,
+    }
+    generate_dataset(Path(args.output_root), args.num_episodes, params, args.task, args.fps, args.num_workers)
@@ -0,0 +1,189 @@
+"""
+Damped-least-squares inverse kinematics for the SO-ARM100 end effector.
+
+The end-effector point is the tip of the fixed jaw (EE_OFFSET in the Fixed_Jaw
+body frame). Each iteration computes its position with mj_kinematics, the 3 x 5
+positional Jacobian of the arm joints (Rotation ... Wrist_Roll) with mj_jac, and
+takes the damped least-squares step
+
+    dq = J^T (J J^T + damping^2 I)^-1 (target - position)
+
+capped at max_step radians. Joint limits come from JOINT_LIMITS: joints at a limit
+that the step would push further out are frozen (their Jacobian column zeroed)
+and the step is recomputed, then the result is clipped to the limits. The Jaw
+is not used and keeps its value.
+
+IKSolver.solve warm starts from the previous solution, so a teleop loop that
+moves the target a little every tick converges in one or two iterations.
+IKSolver.solve_batch solves many targets at once: the forward kinematics run per
+target, the linear algebra for all unconverged targets in one batched NumPy solve.
+
+    solver = IKSolver(model)
+    q, converged, iterations = solver.solve(np.array([0.0, -0.25, 0.15]), q0=current_targets)
+
+Usage:
+    python ik.py --num_targets 1000 --batch_sizes 1,16,256
+"""
+
+import argparse
+import time
+
+import mujoco
+import numpy as np
+
+from controller import JOINT_LIMITS
+from model_cache import MODEL_PATH, load_model
+
+EE_BODY = "Fixed_Jaw"
+EE_OFFSET = np.array([0.01, -0.1, 0.0])  # tip of the fixed jaw, in the Fixed_Jaw frame
+ARM_DOFS = 5  # Rotation, Pitch, Elbow, Wrist_Pitch, Wrist_Roll; the Jaw does not move the end effector
+
+
+def dls_step(J: np.ndarray, err: np.ndarray, q: np.ndarray, damping: float, max_step: float) -> np.ndarray:
+    """Damped least-squares step for (B, 3, dofs) Jacobians and (B, 3) errors, freezing joints pushed past a limit"""
+    lower, upper = JOINT_LIMITS[:ARM_DOFS, 0], JOINT_LIMITS[:ARM_DOFS, 1]
+    regularizer = damping ** 2 * np.eye(J.shape[1])
+    for _ in range(2):
+        Jt = J.transpose(0, 2, 1)
+        dq = (Jt @ np.linalg.solve(J @ Jt + regularizer, err[..., None]))[..., 0]
+        blocked = ((q <= lower) & (dq < 0)) | ((q >= upper) & (dq > 0))
+        if not blocked.any():
+            break
+        J = J * ~blocked[:, None, :]
+    norms = np.linalg.norm(dq, axis=1, keepdims=True)
+    return dq * np.minimum(1.0, max_step / np.maximum(norms, 1e-12))
+
+
+class IKSolver:
+    """Position IK for the end-effector point of one model, with warm start and a batched variant"""
+
+    def __init__(self, model: mujoco.MjModel, damping: float = 0.05, tol: float = 1e-3, max_iters: int = 50,
+                 max_step: float = 0.2, ee_body: str = EE_BODY, ee_offset: np.ndarray = EE_OFFSET):
+        self.model = model
+        self.data = mujoco.MjData(model)
+        self.body_id = model.body(ee_body).id
+        self.ee_offset = np.asarray(ee_offset, dtype=np.float64)
+        self.damping = damping
+        self.tol = tol
+        self.max_iters = max_iters
+        self.max_step = max_step
+        self.jacp = np.zeros((3, model.nv))
+        self.q_prev = None
+
+    def forward(self, q: np.ndarray) -> np.ndarray:
+        """End-effector position for joint positions q (leaves self.data at q)"""
+        self.data.qpos[:len(q)] = q
+        mujoco.mj_kinematics(self.model, self.data)
+        mujoco.mj_comPos(self.model, self.data)
+        return self.data.xpos[self.body_id] + self.data.xmat[self.body_id].reshape(3, 3) @ self.ee_offset
+
+    def forward_jacobian(self, qs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(B, 3) end-effector positions and (B, 3, ARM_DOFS) positional Jacobians for (B, nq) joint positions"""
+        positions = np.empty((len(qs), 3))
+        jacobians = np.empty((len(qs), 3, ARM_DOFS))
+        for k, q in enumerate(qs):
+            positions[k] = self.forward(q)
+            mujoco.mj_jac(self.model, self.data, self.jacp, None, positions[k], self.body_id)
+            jacobians[k] = self.jacp[:, :ARM_DOFS]
+        return positions, jacobians
+
+    def solve_batch(self, targets: np.ndarray, q0: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Solve (B, 3) targets from (B, nq) initial joint positions, return (q, converged, iterations)"""
+        q = np.array(q0, dtype=np.float64)
+        targets = np.asarray(targets, dtype=np.float64)
+        active = np.ones(len(q), dtype=bool)
+        iterations = np.zeros(len(q), dtype=int)
+        for it in range(self.max_iters + 1):
+            idx = np.flatnonzero(active)
+            if len(idx) == 0:
+                break
+            positions, J = self.forward_jacobian(q[idx])
+            err = targets[idx] - positions
+            done = np.linalg.norm(err, axis=1) < self.tol
+            active[idx[done]] = False
+            if it == self.max_iters:
+                break
+            idx, err, J = idx[~done], err[~done], J[~done]
+            if len(idx) == 0:
+                break
+            dq = dls_step(J, err, q[idx, :ARM_DOFS], self.damping, self.max_step)
+            q[idx, :ARM_DOFS] = np.clip(q[idx, :ARM_DOFS] + dq, JOINT_LIMITS[:ARM_DOFS, 0], JOINT_LIMITS[:ARM_DOFS, 1])
+            iterations[idx] += 1
+        return q, ~active, iterations
+
+    def solve(self, target: np.ndarray, q0: np.ndarray | None = None) -> tuple[np.ndarray, bool, int]:
+        """Solve one target, warm starting from q0 or else from the previous solution"""
+        if q0 is None:
+            q0 = self.q_prev if self.q_prev is not None else np.zeros(self.model.nq)
+        q, converged, iterations = self.solve_batch(np.asarray(target)[None], np.asarray(q0)[None])
+        self.q_prev = q[0]
+        return q[0], bool(converged[0]), int(iterations[0])
+
+
+def random_configurations(num: int, nq: int, rng: np.random.Generator) -> np.ndarray:
+    q = np.zeros((num, nq))
+    q[:, :ARM_DOFS] = rng.uniform(JOINT_LIMITS[:ARM_DOFS, 0], JOINT_LIMITS[:ARM_DOFS, 1], size=(num, ARM_DOFS))
+    return q
+
+
+def benchmark(num_targets: int = 1000, batch_sizes: list[int] = (1, 16, 256), seed: int = 0, **solver_kwargs):
+    """Solves per second and convergence rate for cold, warm-started and batched solves of reachable targets"""
+    model = load_model(MODEL_PATH)
+    solver = IKSolver(model, **solver_kwargs)
+    rng = np.random.default_rng(seed)
+
+    # Reachable targets: forward kinematics of random configurations, and of a slow random walk for warm starts
+    q_random = random_configurations(num_targets, model.nq, rng)
+    q_walk = np.zeros((num_targets, model.nq))
+    q_walk[:, :ARM_DOFS] = np.clip(np.cumsum(rng.normal(scale=0.01, size=(num_targets, ARM_DOFS)), axis=0),
+                                   JOINT_LIMITS[:ARM_DOFS, 0], JOINT_LIMITS[:ARM_DOFS, 1])
+    random_targets = np.array([solver.forward(q) for q in q_random])
+    walk_targets = np.array([solver.forward(q) for q in q_walk])
+
+    print(f"\n=== IK benchmark ({num_targets} targets, tol {solver.tol * 1000:.1f} mm, max {solver.max_iters} iterations) ===")
+    print(f"{'mode':>12} {'batch':>6} {'solves/s':>10} {'us/solve':>9} {'converged':>10} {'mean iters':>11}")
+
+    def report(mode, batch, elapsed, converged, iterations):
+        solves_per_s = len(converged) / elapsed
+        print(f"{mode:>12} {batch:>6} {solves_per_s:>10.0f} {1e6 / solves_per_s:>9.1f} {np.mean(converged):>10.1%} {np.mean(iterations):>11.1f}")
+
+    results = {}
+    for mode, targets in [("cold", random_targets), ("warm", walk_targets)]:
+        solver.q_prev = q_walk[0] if mode == "warm" else None
+        converged, iterations = [], []
+        start = time.perf_counter()
+        for target in targets:
+            _, ok, iters = solver.solve(target, np.zeros(model.nq) if mode == "cold" else None)
+            converged.append(ok)
+            iterations.append(iters)
+        elapsed = time.perf_counter() - start
+        report(mode, 1, elapsed, converged, iterations)
+        results[mode] = num_targets / elapsed
+
+    for batch_size in batch_sizes:
+        converged, iterations = [], []
+        start = time.perf_counter()
+        for batch_start in range(0, num_targets, batch_size):
+            targets = random_targets[batch_start:batch_start + batch_size]
+            _, ok, iters = solver.solve_batch(targets, np.zeros((len(targets), model.nq)))
+            converged.extend(ok)
+            iterations.extend(iters)
+        elapsed = time.perf_counter() - start
+        report("cold batched", batch_size, elapsed, converged, iterations)
+        results[f"batch_{batch_size}"] = num_targets / elapsed
+
+    print(f"Warm-started solve: {1000 / results['warm']:.2f} ms, {results['warm'] / 100:.0f} solves fit in one 100 Hz control tick")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the damped least-squares IK of the SO-ARM100')
+    parser.add_argument('--num_targets', type=int, default=1000, help='Number of reachable targets solved per measurement')
+    parser.add_argument('--batch_sizes', type=str, default='1,16,256', help='Comma-separated batch sizes for solve_batch')
+    parser.add_argument('--damping', type=float, default=0.05, help='Damping factor')
+    parser.add_argument('--tol', type=float, default=1e-3, help='Position tolerance in meters')
+    parser.add_argument('--max_iters', type=int, default=50, help='Maximum iterations per solve')
+
+    args = parser.parse_args()
+    benchmark(args.num_targets, [int(n) for n in args.batch_sizes.split(',')],
+              damping=args.damping, tol=args.tol, max_iters=args.max_iters)
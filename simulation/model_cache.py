@@ -0,0 +1,106 @@
+"""
+Compiled MJB cache for the SO-ARM100 MuJoCo models.
+
+Compiling trs_so_arm100/*.xml parses the XML and loads and processes every STL
+mesh in assets/. load_model compiles once and saves the result as an MJB
+binary keyed by a hash of the model directory (XML and asset files) and the
+MuJoCo version; later launches and worker processes load the binary instead.
+
+Loaded models are also memoized per process, so load the model in the parent
+before forking workers (e.g. BatchedSim's process backend on Linux) and the
+children reuse it without loading anything. The memoized model is shared:
+copy.copy it before changing fields such as opt.timestep.
+
+Usage:
+    python model_cache.py            # time startup with and without the cache
+    python model_cache.py --clear    # delete the cached binaries
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import time
+from pathlib import Path
+
+import mujoco
+
+MODEL_DIR = Path(__file__).resolve().parent / "trs_so_arm100"
+MODEL_PATH = MODEL_DIR / "so_arm100.xml"
+SCENE_PATH = MODEL_DIR / "scene.xml"
+CACHE_DIR = Path(os.environ.get("MUJOCO_MODEL_CACHE", Path.home() / ".cache" / "mujoco_models"))
+
+_models = {}
+
+
+def model_hash(xml_path: Path) -> str:
+    """Hash of every file next to and below the XML (includes, meshes, textures) and the MuJoCo version"""
+    digest = hashlib.sha256(mujoco.__version__.encode())
+    model_dir = Path(xml_path).resolve().parent
+    for path in sorted(p for p in model_dir.rglob("*") if p.is_file()):
+        digest.update(str(path.relative_to(model_dir)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def cache_path(xml_path: Path, cache_dir: Path = CACHE_DIR) -> Path:
+    return Path(cache_dir) / f"{Path(xml_path).stem}-{model_hash(xml_path)[:16]}.mjb"
+
+
+def compile_model(xml_path: Path, cache_dir: Path = CACHE_DIR, use_cache: bool = True) -> mujoco.MjModel:
+    """Load the MJB binary of xml_path if it is cached, otherwise compile the XML and cache it"""
+    if not use_cache:
+        return mujoco.MjModel.from_xml_path(str(xml_path))
+    mjb_path = cache_path(xml_path, cache_dir)
+    if mjb_path.exists():
+        return mujoco.MjModel.from_binary_path(str(mjb_path))
+    model = mujoco.MjModel.from_xml_path(str(xml_path))
+    mjb_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = mjb_path.with_name(f"{mjb_path.name}.{os.getpid()}.tmp")
+    mujoco.mj_saveModel(model, str(tmp_path), None)
+    os.replace(tmp_path, mjb_path)
+    return model
+
+
+def load_model(xml_path=MODEL_PATH, use_cache: bool = True) -> mujoco.MjModel:
+    """Process-wide shared model for xml_path, compiled at most once per model version"""
+    key = (str(Path(xml_path).resolve()), use_cache)
+    if key not in _models:
+        _models[key] = compile_model(Path(xml_path), use_cache=use_cache)
+    return _models[key]
+
+
+def clear_cache(cache_dir: Path = CACHE_DIR):
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def benchmark(xml_paths: list[Path], repeats: int = 5):
+    """Startup time of compiling the XML vs loading the cached MJB"""
+    print(f"\n=== Model load benchmark (MuJoCo {mujoco.__version__}, {repeats} loads each) ===")
+    for xml_path in xml_paths:
+        compile_model(xml_path)  # make sure the cache exists
+        timings = {}
+        for name, use_cache in [("xml", False), ("mjb cache", True)]:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                compile_model(xml_path, use_cache=use_cache)
+            timings[name] = (time.perf_counter() - start) / repeats * 1000
+        start = time.perf_counter()
+        model_hash(xml_path)
+        hash_ms = (time.perf_counter() - start) * 1000
+        print(f"{xml_path.name:15s}: xml {timings['xml']:8.1f} ms | mjb cache {timings['mjb cache']:8.1f} ms"
+              f" (of which hashing {hash_ms:.1f} ms) | {timings['xml'] / timings['mjb cache']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compiled MJB model cache for the SO-ARM100')
+    parser.add_argument('--clear', action='store_true', help='Delete the cached binaries')
+    parser.add_argument('--repeats', type=int, default=5, help='Loads timed per measurement')
+
+    args = parser.parse_args()
+
+    if args.clear:
+        clear_cache()
+        print(f"🧹 Cleared {CACHE_DIR}")
+    else:
+        benchmark([MODEL_PATH, SCENE_PATH], args.repeats)
@@ -0,0 +1,227 @@
+"""
+Replay the recorded actions of a local LeRobot dataset in simulation to validate them.
+
+The action column of every episode is read as one (length, 6) NumPy array and
+replayed open loop, as joint targets for the position actuators of
+trs_so_arm100/so_arm100.xml, one control period (1 / fps) per frame. Episodes
+are replayed side by side in a headless BatchedSim (one env per episode,
+--batch_size episodes at a time), starting from the episode's first
+observation.state. Per episode it reports:
+
+- tracking_error: mean / max |qpos - target| after each control period, in degrees
+- limit_violations: frames whose action exceeds JOINT_LIMITS by more than --limit_margin
+- self_collisions: frames with contacts between two links of the arm
+
+Judges are suggested in the judge.jsonl format of dataset_cleaning/auto_judge.py,
+so the output can be reviewed and fed to data_cleaning.py like any judge file.
+
+Actions are expected in the joint order of the MJCF (shoulder pan, shoulder lift,
+elbow, wrist flex, wrist roll, gripper). Real so100 recordings are in degrees
+relative to their calibration, which need not coincide with the MJCF zero pose;
+pass per-joint --offsets (in --units) to line them up.
+
+Usage:
+    python replay_actions.py --dataset_root ./sim_dataset --output_file replay_judge.jsonl
+    python replay_actions.py --dataset_root ~/.cache/huggingface/lerobot/DanqingZ/so100_test_pick_green_4 \\
+        --batch_size 64 --num_workers 8 --offsets "0,0,0,0,0,0"
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from batched_sim import BACKENDS, BatchedSim
+from controller import JOINT_LIMITS, JOINT_NAMES, clip_targets
+from model_cache import MODEL_PATH, load_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "dataset_cleaning"))
+from episode_io import episode_data_path, load_info, read_episode_columns  # noqa: E402
+
+UNITS = ["degrees", "radians"]
+
+# Tracking errors and limit margins are in degrees
+DEFAULT_THRESHOLDS = {
+    "tracking_error_soft": 5.0,
+    "tracking_error_hard": 15.0,
+    "limit_margin": 1.0,
+    "violation_fraction_hard": 0.05,
+    "collision_frames_hard": 5,
+}
+
+
+def load_episode_actions(dataset_root: Path, info: dict, ep_idx: int, units: str, offsets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the (length, 6) actions and the (6,) initial joint positions of an episode in radians"""
+    columns = ["action", "observation.state"] if "observation.state" in info["features"] else ["action"]
+    values = read_episode_columns(episode_data_path(dataset_root, info, ep_idx), columns)
+    actions = values["action"].astype(np.float64) + offsets
+    initial = values["observation.state"][0].astype(np.float64) + offsets if "observation.state" in values else actions[0]
+    if units == "degrees":
+        actions, initial = np.radians(actions), np.radians(initial)
+    return actions, initial
+
+
+def replay_batch(sim: BatchedSim, actions: list[np.ndarray], initial: np.ndarray, limit_margin: float) -> list[dict]:
+    """Replay up to sim.num_envs episodes in lockstep and return their signals"""
+    num_envs, nu = sim.num_envs, sim.model.nu
+    lengths = np.array([len(a) for a in actions])
+    num_steps = int(lengths.max())
+
+    # (num_steps, num_envs, nu) targets, shorter episodes hold their last action
+    targets = np.empty((num_steps, num_envs, nu))
+    for env, episode_actions in enumerate(actions):
+        targets[:len(episode_actions), env] = episode_actions
+        targets[len(episode_actions):, env] = episode_actions[-1]
+    overshoot = np.degrees(np.maximum(JOINT_LIMITS[:, 0] - targets, targets - JOINT_LIMITS[:, 1]).max(axis=2))
+    clipped = clip_targets(targets)
+
+    qpos = np.zeros((num_envs, sim.model.nq))
+    qpos[:, :nu] = clip_targets(initial)
+    sim.reset(qpos=qpos)
+    errors = np.empty((num_steps, num_envs, nu))
+    contacts = np.empty((num_steps, num_envs), dtype=int)
+    for t in range(num_steps):
+        obs = sim.step(clipped[t])
+        errors[t] = np.abs(obs["qpos"][:, :nu] - clipped[t])
+        contacts[t] = obs["self_contacts"]
+    errors = np.degrees(errors)
+
+    signals = []
+    for env, length in enumerate(lengths[:len(actions)]):
+        env_errors = errors[:length, env]
+        worst_joint = int(env_errors.max(axis=0).argmax())
+        signals.append({
+            "length": int(length),
+            "tracking_error": float(env_errors.mean()),
+            "tracking_error_max": float(env_errors.max()),
+            "worst_joint": JOINT_NAMES[worst_joint],
+            "limit_violations": int(np.count_nonzero(overshoot[:length, env] > limit_margin)),
+            "limit_overshoot_max": float(max(overshoot[:length, env].max(), 0.0)),
+            "self_collisions": int(np.count_nonzero(contacts[:length, env])),
+        })
+    return signals
+
+
+def suggest_judge(signals: dict, thresholds: dict) -> tuple[int, list[str]]:
+    """Turn replay signals into a 0/1/2 judge and the reasons behind it"""
+    hard, soft = [], []
+    if signals["tracking_error"] > thresholds["tracking_error_hard"]:
+        hard.append(f"simulated arm did not track actions (error {signals['tracking_error']:.1f} deg)")
+    elif signals["tracking_error"] > thresholds["tracking_error_soft"]:
+        soft.append(f"high simulated tracking error ({signals['tracking_error']:.1f} deg, worst {signals['worst_joint']})")
+    if signals["limit_violations"] > thresholds["violation_fraction_hard"] * signals["length"]:
+        hard.append(f"{signals['limit_violations']} actions beyond joint limits (up to {signals['limit_overshoot_max']:.1f} deg)")
+    elif signals["limit_violations"] > 0:
+        soft.append(f"{signals['limit_violations']} actions beyond joint limits (up to {signals['limit_overshoot_max']:.1f} deg)")
+    if signals["self_collisions"] >= thresholds["collision_frames_hard"]:
+        hard.append(f"self-collision in {signals['self_collisions']} frames")
+    elif signals["self_collisions"] > 0:
+        soft.append(f"self-collision in {signals['self_collisions']} frames")
+
+    if hard:
+        return 0, hard + soft
+    if soft:
+        return 1, soft
+    return 2, []
+
+
+def replay_dataset(dataset_root: Path, episodes: list[int] | None = None, batch_size: int = 64, num_workers: int = 8,
+                   backend: str = "thread", units: str = "degrees", offsets: np.ndarray | None = None,
+                   thresholds: dict = DEFAULT_THRESHOLDS, repo_id: str | None = None) -> list[dict]:
+    """Replay the episodes of a local dataset in batches of batched simulations and judge them"""
+    dataset_root = Path(dataset_root)
+    info = load_info(dataset_root)
+    model = load_model(MODEL_PATH)
+    if info["features"]["action"]["shape"][0] != model.nu:
+        raise ValueError(f"Expected {model.nu}-dimensional actions, got shape {info['features']['action']['shape']}")
+    if episodes is None:
+        episodes = list(range(info["total_episodes"]))
+    if not episodes:
+        return []
+    offsets = np.zeros(model.nu) if offsets is None else np.asarray(offsets, dtype=np.float64)
+    substeps = max(1, round(1.0 / (info["fps"] * model.opt.timestep)))
+    repo_id = repo_id or dataset_root.name
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        loaded = list(executor.map(lambda ep_idx: load_episode_actions(dataset_root, info, ep_idx, units, offsets), episodes))
+    load_s = time.perf_counter() - start
+
+    results = []
+    batch_size = min(batch_size, len(episodes))
+    with BatchedSim(batch_size, backend, num_workers, substeps) as sim:
+        for batch_start in range(0, len(episodes), batch_size):
+            batch = loaded[batch_start:batch_start + batch_size]
+            actions = [episode_actions for episode_actions, _ in batch]
+            initial = np.stack([batch_initial for _, batch_initial in batch])
+            # Pad the last batch up to the env count with copies of its last episode
+            padded_actions = actions + [actions[-1]] * (batch_size - len(batch))
+            padded_initial = np.concatenate([initial, np.repeat(initial[-1:], batch_size - len(batch), axis=0)])
+            signals = replay_batch(sim, padded_actions, padded_initial, thresholds["limit_margin"])[:len(batch)]
+            for ep_idx, episode_signals in zip(episodes[batch_start:], signals):
+                judge, reasons = suggest_judge(episode_signals, thresholds)
+                results.append({"repo_id": repo_id, "episode_id": ep_idx, "judge": judge, "reasons": reasons, "signals": episode_signals})
+            print(f"✓ Replayed episodes {episodes[batch_start]}-{episodes[batch_start + len(batch) - 1]}")
+    elapsed = time.perf_counter() - start
+
+    total_frames = sum(result["signals"]["length"] for result in results)
+    sim_seconds = total_frames / info["fps"]
+    print(f"📈 {len(results)} episodes ({total_frames} frames, {sim_seconds:.0f}s of robot time) in {elapsed:.1f}s"
+          f" (loading {load_s:.1f}s): {len(results) / elapsed:.1f} episodes/s, {sim_seconds / elapsed:.0f}x real time")
+    return results
+
+
+def parse_offsets(text: str | None, num_joints: int) -> np.ndarray | None:
+    if text is None:
+        return None
+    offsets = np.array([float(value) for value in text.split(',')])
+    if len(offsets) != num_joints:
+        raise ValueError(f"Expected {num_joints} offsets, got {len(offsets)}")
+    return offsets
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay dataset actions in a batched SO-ARM100 simulation and judge them')
+    parser.add_argument('--dataset_root', type=str, required=True, help='Root directory of a local LeRobot v2.1 dataset')
+    parser.add_argument('--repo_id', type=str, default=None, help='repo_id written to the judge file (default: dataset directory name)')
+    parser.add_argument('--episodes', type=str, default=None, help='Comma-separated episode indices (default: all)')
+    parser.add_argument('--output_file', type=str, default='replay_judge.jsonl', help='Output JSONL file name')
+    parser.add_argument('--overwrite', action='store_true', help='Overwrite the output file if it already exists')
+    parser.add_argument('--batch_size', type=int, default=64, help='Episodes replayed side by side')
+    parser.add_argument('--num_workers', type=int, default=os.cpu_count() or 1, help='Simulation workers')
+    parser.add_argument('--backend', choices=BACKENDS, default='thread', help='Step environments in threads or processes')
+    parser.add_argument('--units', choices=UNITS, default='degrees', help='Units of the action and observation.state columns')
+    parser.add_argument('--offsets', type=str, default=None, help='Comma-separated per-joint offsets added to the recorded values, in --units')
+    for name, default in DEFAULT_THRESHOLDS.items():
+        parser.add_argument(f"--{name}", type=type(default), default=default, help=f"(default: {default})")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output_file) and not args.overwrite:
+        print(f"Judge file {args.output_file} already exists, use --overwrite to replace it")
+        return
+
+    episodes = [int(ep) for ep in args.episodes.split(',')] if args.episodes else None
+    thresholds = {name: getattr(args, name) for name in DEFAULT_THRESHOLDS}
+    results = replay_dataset(Path(args.dataset_root), episodes, args.batch_size, args.num_workers, args.backend,
+                             args.units, parse_offsets(args.offsets, len(JOINT_NAMES)), thresholds, args.repo_id)
+
+    with open(args.output_file, 'w') as f:
+        for result in results:
+            f.write(json.dumps(result) + '\n')
+
+    print(f"\nSuggested judge distribution over {len(results)} episodes:")
+    for judge in [0, 1, 2]:
+        print(f"Judge = {judge}: {sum(r['judge'] == judge for r in results)}")
+    for result in results:
+        if result["judge"] < 2:
+            print(f"  episode {result['episode_id']}: {'; '.join(result['reasons'])}")
+    print(f"Generated {args.output_file}")
+
+
+if __name__ == "__main__":
+    main()
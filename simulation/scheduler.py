@@ -0,0 +1,109 @@
+"""
+Control-tick scheduler decoupling physics rate, viewer sync rate and wall-clock pacing.
+
+Every tick applies the control once and advances the physics by
+control_dt / timestep substeps of mj_step. The viewer (if any) is synced at most
+display_hz times per second, independently of the physics rate. Pacing is
+deadline based: tick k is due at wall_start + sim_time / rtf, so sleep jitter
+does not accumulate. pacing="realtime" runs at rtf=1, pacing="rtf" at a fixed
+real-time factor and pacing="max" as fast as possible.
+
+    scheduler = SimScheduler(model, data, control_hz=100, display_hz=60, pacing="realtime", viewer=viewer)
+    while viewer.is_running():
+        scheduler.tick(lambda: apply_pd_control(data, current_targets))
+    scheduler.report()
+"""
+
+import time
+
+import mujoco
+
+PACING_MODES = ["realtime", "rtf", "max"]
+
+# A tick later than this behind its deadline resets the schedule instead of running a catch-up burst
+MAX_LAG = 0.1
+
+
+def sleep_until(deadline: float, spin: float = 0.002):
+    """Sleep until the perf_counter deadline, spinning for the last `spin` seconds for accuracy"""
+    remaining = deadline - time.perf_counter()
+    if remaining > spin:
+        time.sleep(remaining - spin)
+    while time.perf_counter() < deadline:
+        pass
+
+
+class SimScheduler:
+    """Step model/data in control ticks, sync a viewer at a capped rate and pace against wall-clock deadlines"""
+
+    def __init__(self, model: mujoco.MjModel, data: mujoco.MjData, control_hz: float = 100.0, timestep: float | None = None,
+                 display_hz: float = 60.0, pacing: str = "realtime", rtf: float = 1.0, viewer=None):
+        if pacing not in PACING_MODES:
+            raise ValueError(f"Unknown pacing {pacing!r}, use one of {PACING_MODES}")
+        if timestep is not None:
+            model.opt.timestep = timestep
+        self.model = model
+        self.data = data
+        self.control_dt = 1.0 / control_hz
+        self.substeps = max(1, round(self.control_dt / model.opt.timestep))
+        self.display_period = 1.0 / display_hz if display_hz > 0 else None
+        self.rtf = {"realtime": 1.0, "rtf": rtf, "max": None}[pacing]
+        self.viewer = viewer
+        self.restart()
+
+    def restart(self):
+        """Start measuring (and pacing) from the current sim time"""
+        self.wall_start = self.pace_start = time.perf_counter()
+        self.sim_start = self.pace_sim_start = self.data.time
+        self.next_sync = self.wall_start
+        self.ticks = 0
+        self.syncs = 0
+        self.late_ticks = 0
+
+    def ticks_for(self, seconds: float) -> int:
+        """Number of ticks covering `seconds` of simulated time"""
+        return max(1, round(seconds / self.control_dt))
+
+    def tick(self, control_fn=None):
+        """Apply the control, run the physics substeps, sync the viewer if due and wait for the tick deadline"""
+        if control_fn is not None:
+            control_fn()
+        for _ in range(self.substeps):
+            mujoco.mj_step(self.model, self.data)
+        self.ticks += 1
+
+        now = time.perf_counter()
+        if self.viewer is not None and self.display_period is not None and now >= self.next_sync:
+            self.viewer.sync()
+            self.syncs += 1
+            self.next_sync = now + self.display_period
+
+        if self.rtf is None:
+            return
+        deadline = self.pace_start + (self.data.time - self.pace_sim_start) / self.rtf
+        now = time.perf_counter()
+        if now > deadline + MAX_LAG:
+            self.late_ticks += 1
+            self.pace_start, self.pace_sim_start = now, self.data.time
+        else:
+            sleep_until(deadline)
+
+    def stats(self) -> dict:
+        wall = time.perf_counter() - self.wall_start
+        sim = self.data.time - self.sim_start
+        return {
+            "ticks": self.ticks,
+            "sim_time": sim,
+            "wall_time": wall,
+            "rtf": sim / wall if wall > 0 else 0.0,
+            "viewer_syncs": self.syncs,
+            "late_ticks": self.late_ticks,
+        }
+
+    def report(self):
+        stats = self.stats()
+        target = "max" if self.rtf is None else f"{self.rtf:g}"
+        print(f"📈 {stats['ticks']} ticks x {self.substeps} substeps | sim {stats['sim_time']:.2f}s in {stats['wall_time']:.2f}s wall"
+              f" | real-time factor {stats['rtf']:.2f} (target {target}) | {stats['viewer_syncs']} viewer syncs"
+              f" | {stats['late_ticks']} late ticks")
+        return stats
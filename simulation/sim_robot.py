@@ -0,0 +1,117 @@
+"""
+Simulated SO-100 with the robot interface used by remote_inference/eval_robot.py.
+
+SimRobot implements connect / capture_observation / send_action / disconnect on
+top of trs_so_arm100/scene.xml, so the remote inference loop can be tested end
+to end without hardware:
+
+- observation.state: the 6 joint positions, in degrees like the real so100 recordings
+- observation.images.phone: a fixed camera looking at the workspace
+- observation.images.on_robot: a camera tracking the Fixed_Jaw body (wrist camera)
+- send_action: 6 joint targets in degrees, clipped to JOINT_LIMITS and sent to the
+  position actuators, then the physics advances by one control period (1 / fps)
+
+Each camera owns one mujoco.Renderer and a preallocated (height, width, 3) uint8
+buffer that is rendered into in place, so the returned image tensors are views
+overwritten by the next capture_observation. Simulated time only advances in
+send_action, so the loop runs as fast as rendering allows unless it is paced.
+
+Headless machines need an offscreen GL backend, e.g. MUJOCO_GL=egl.
+"""
+
+import copy
+
+import mujoco
+import numpy as np
+import torch
+
+from controller import BatchedController
+from model_cache import SCENE_PATH, load_model
+
+CAMERAS = {
+    "phone": {"lookat": [0.0, -0.2, 0.05], "distance": 0.7, "azimuth": 90.0, "elevation": -40.0},
+    "on_robot": {"track_body": "Fixed_Jaw", "distance": 0.2, "azimuth": 90.0, "elevation": -60.0},
+}
+
+
+def make_camera(model: mujoco.MjModel, spec: dict) -> mujoco.MjvCamera:
+    """Free camera at a fixed pose, or a tracking camera following spec["track_body"]"""
+    camera = mujoco.MjvCamera()
+    if "track_body" in spec:
+        camera.type = mujoco.mjtCamera.mjCAMERA_TRACKING
+        camera.trackbodyid = mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_BODY, spec["track_body"])
+    else:
+        camera.type = mujoco.mjtCamera.mjCAMERA_FREE
+        camera.lookat[:] = spec["lookat"]
+    camera.distance = spec["distance"]
+    camera.azimuth = spec["azimuth"]
+    camera.elevation = spec["elevation"]
+    return camera
+
+
+class SimRobot:
+    """MuJoCo SO-ARM100 exposing the same surface as the lerobot so100 robot used by eval_robot"""
+
+    robot_type = "sim_so100"
+
+    def __init__(self, fps: int = 30, width: int = 640, height: int = 480, cameras: dict | None = None,
+                 model_path=SCENE_PATH, keyframe: str | None = "home"):
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.camera_specs = CAMERAS if cameras is None else cameras
+        self.model_path = model_path
+        self.keyframe = keyframe
+        self.controller = BatchedController(mode="position")
+        self.is_connected = False
+
+    def connect(self):
+        # Own copy of the shared cached model, the offscreen buffer size is changed below
+        self.model = copy.copy(load_model(self.model_path))
+        self.model.vis.global_.offwidth = max(self.model.vis.global_.offwidth, self.width)
+        self.model.vis.global_.offheight = max(self.model.vis.global_.offheight, self.height)
+        self.data = mujoco.MjData(self.model)
+        self.substeps = max(1, round(1.0 / (self.fps * self.model.opt.timestep)))
+
+        self.cameras = {name: make_camera(self.model, spec) for name, spec in self.camera_specs.items()}
+        self.renderers = {name: mujoco.Renderer(self.model, self.height, self.width) for name in self.cameras}
+        self.buffers = {name: np.empty((self.height, self.width, 3), dtype=np.uint8) for name in self.cameras}
+        self.state = np.empty(self.model.nu, dtype=np.float32)
+        self.reset()
+        self.is_connected = True
+
+    def reset(self):
+        if self.keyframe is None:
+            mujoco.mj_resetData(self.model, self.data)
+        else:
+            mujoco.mj_resetDataKeyframe(self.model, self.data, self.model.key(self.keyframe).id)
+        mujoco.mj_forward(self.model, self.data)
+
+    def render(self, name: str) -> np.ndarray:
+        renderer = self.renderers[name]
+        renderer.update_scene(self.data, camera=self.cameras[name])
+        renderer.render(out=self.buffers[name])
+        return self.buffers[name]
+
+    def capture_observation(self) -> dict[str, torch.Tensor]:
+        np.degrees(self.data.qpos[:self.model.nu], out=self.state)
+        observation = {"observation.state": torch.from_numpy(self.state)}
+        for name in self.cameras:
+            observation[f"observation.images.{name}"] = torch.from_numpy(self.render(name))
+        return observation
+
+    def send_action(self, action: torch.Tensor) -> torch.Tensor:
+        """Apply joint targets in degrees for one control period, return the (clipped) action actually sent"""
+        targets = np.radians(np.asarray(action, dtype=np.float64).reshape(1, -1))
+        self.data.ctrl[:] = self.controller.compute(
+            targets, self.data.qpos[None, :self.model.nu], self.data.qvel[None, :self.model.nu]
+        )[0]
+        for _ in range(self.substeps):
+            mujoco.mj_step(self.model, self.data)
+        return torch.from_numpy(np.degrees(self.data.ctrl).astype(np.float32))
+
+    def disconnect(self):
+        for renderer in self.renderers.values():
+            renderer.close()
+        self.renderers = {}
+        self.is_connected = False
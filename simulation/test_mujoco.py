@@ -5,11 +5,14 @@ Real user input that actually works on macOS with MuJoCo.
 Uses threading to handle input without blocking the viewer.
 
 Usage:
+    mjpython script.py --control event --socket_port 5555 --script commands.txt
     mjpython script.py --control threaded_input
     mjpython script.py --control pause_input
     mjpython script.py --control continuous
+    mjpython script.py --control continuous --pacing max --control_hz 50 --display_hz 30
 """
 
+import copy
 import mujoco
 import mujoco.viewer
 import numpy as np
@@ -19,9 +22,27 @@ import threading
 import queue
 import sys
 
-# Load the XML model
-model = mujoco.MjModel.from_xml_path("trs_so_arm100/so_arm100.xml")
-data = mujoco.MjData(model)
+from command_events import AsyncLogger, CommandQueue, start_sources
+from controller import JOINT_KEYS, JOINT_LIMITS, JOINT_NAMES, BatchedController
+from ik import IKSolver
+from model_cache import MODEL_PATH, load_model
+from scheduler import PACING_MODES, SimScheduler
+
+# Model, data and IK solver are created by load_simulation(), not on import
+model = None
+data = None
+ik_solver = None
+
+def load_simulation(use_cache=True):
+    """Load the model (from the compiled MJB cache unless use_cache is False) and create its data"""
+    global model, data, ik_solver
+    start = time.perf_counter()
+    # Copy the shared cached model: the scheduler may change opt.timestep
+    model = copy.copy(load_model(MODEL_PATH, use_cache=use_cache))
+    data = mujoco.MjData(model)
+    ik_solver = IKSolver(model)
+    source = "MJB cache" if use_cache else "XML"
+    print(f"⏱️ Model loaded from {source} in {(time.perf_counter() - start) * 1000:.1f} ms")
 
 def reset_simulation():
     """Reset the simulation to initial state"""
@@ -31,31 +52,18 @@ def reset_simulation():
 # Global variables for control
 current_targets = np.zeros(6)
 control_increment = 0.05
+cartesian_increment = 0.01  # meters per cx+/cy+/cz+ command
 simulation_running = True
-joint_limits = [
-    (-2.2, 2.2),         # Rotation
-    (-3.14158, 0.2),     # Pitch
-    (0.0, 3.14158),      # Elbow
-    (-2.0, 1.8),         # Wrist_Pitch
-    (-3.14158, 3.14158), # Wrist_Roll
-    (-0.2, 2.0)          # Jaw
-]
 
-joint_names = ["Rotation", "Pitch", "Elbow", "Wrist_Pitch", "Wrist_Roll", "Jaw"]
+# Command feedback goes through log(); the event front end swaps in an AsyncLogger so the sim thread never prints
+log = print
 
-def apply_pd_control():
-    """Apply PD control to reach target positions"""
-    kp = 50.0  # Proportional gain
-    kd = 5.0   # Derivative gain
-    
-    current_pos = data.qpos[:model.nv]
-    current_vel = data.qvel[:model.nv]
-    
-    position_error = current_targets[:len(current_pos)] - current_pos
-    velocity_error = -current_vel
-    
-    control_torques = kp * position_error + kd * velocity_error
-    data.ctrl[:] = control_torques[:model.nu]
+# The MJCF declares position actuators with their own kp, so ctrl takes the (clipped) joint targets
+controller = BatchedController(mode="position")
+
+def apply_pd_control(data, targets):
+    """Write the control for reaching the target positions into data.ctrl"""
+    data.ctrl[:] = controller.compute(targets[None], data.qpos[None, :model.nu], data.qvel[None, :model.nu])[0]
 
 def update_joint_target(joint_idx, direction):
     """Update target position for a specific joint"""
@@ -66,10 +74,18 @@ def update_joint_target(joint_idx, direction):
         new_target = current_targets[joint_idx] + delta
         
         # Apply joint limits
-        min_limit, max_limit = joint_limits[joint_idx]
+        min_limit, max_limit = JOINT_LIMITS[joint_idx]
         current_targets[joint_idx] = np.clip(new_target, min_limit, max_limit)
         
-        print(f"🎮 {joint_names[joint_idx]}: {current_targets[joint_idx]:.3f}")
+        log(f"🎮 {JOINT_NAMES[joint_idx]}: {current_targets[joint_idx]:.3f}")
+
+def update_cartesian_target(target):
+    """Move the end effector to a world position (m) by solving IK from the current targets"""
+    q, converged, iterations = ik_solver.solve(np.asarray(target, dtype=np.float64), q0=current_targets)
+    current_targets[:] = q[:len(current_targets)]
+    reached = ik_solver.forward(current_targets)
+    status = "✅" if converged else "⚠️ closest reachable"
+    log(f"🎯 End effector -> [{reached[0]:.3f}, {reached[1]:.3f}, {reached[2]:.3f}] {status} ({iterations} iterations)")
 
 def input_thread(command_queue):
     """Background thread to handle user input"""
@@ -97,69 +113,86 @@ def process_command(cmd, command_queue):
     global control_increment, current_targets, simulation_running
     
     if cmd == 'help':
-        print("\n" + "="*50)
-        print("🎮 ROBOT CONTROL COMMANDS")
-        print("="*50)
-        print("Joint Controls:")
-        print("  q+ / q-  : Rotation joint")
-        print("  w+ / w-  : Pitch joint")
-        print("  e+ / e-  : Elbow joint")
-        print("  r+ / r-  : Wrist Pitch joint")
-        print("  t+ / t-  : Wrist Roll joint")
-        print("  y+ / y-  : Jaw joint")
-        print("\nUtility Commands:")
-        print("  reset    : Reset all joints to zero")
-        print("  status   : Show current positions")
-        print("  speed X  : Set speed (e.g., 'speed 0.1')")
-        print("  help     : Show this help")
-        print("  quit     : Exit")
-        print("="*50)
+        log("\n" + "="*50)
+        log("🎮 ROBOT CONTROL COMMANDS")
+        log("="*50)
+        log("Joint Controls:")
+        log("  q+ / q-  : Rotation joint")
+        log("  w+ / w-  : Pitch joint")
+        log("  e+ / e-  : Elbow joint")
+        log("  r+ / r-  : Wrist Pitch joint")
+        log("  t+ / t-  : Wrist Roll joint")
+        log("  y+ / y-  : Jaw joint")
+        log("\nCartesian Controls (inverse kinematics):")
+        log("  cx+ / cx- / cy+ / cy- / cz+ / cz- : Move end effector by 1 cm")
+        log("  goto X Y Z : Move end effector to a world position in meters")
+        log("\nUtility Commands:")
+        log("  reset    : Reset all joints to zero")
+        log("  status   : Show current positions")
+        log("  speed X  : Set speed (e.g., 'speed 0.1')")
+        log("  help     : Show this help")
+        log("  quit     : Exit")
+        log("="*50)
         
     elif cmd in ['quit', 'exit']:
-        print("🛑 Exiting...")
+        log("🛑 Exiting...")
         simulation_running = False
         return False
         
     elif cmd == 'reset':
         current_targets.fill(0)
-        print("🔄 Reset all joints to zero")
+        log("🔄 Reset all joints to zero")
         
     elif cmd == 'status':
-        print(f"📊 Target positions:")
-        for i, name in enumerate(joint_names):
+        log(f"📊 Target positions:")
+        for i, name in enumerate(JOINT_NAMES):
             if i < len(current_targets):
-                print(f"   {name}: {current_targets[i]:.3f}")
-        print(f"📊 Current positions: {data.qpos[:model.nv]}")
-        print(f"📊 Control speed: {control_increment}")
+                log(f"   {name}: {current_targets[i]:.3f}")
+        log(f"📊 Current positions: {data.qpos[:model.nv]}")
+        log(f"📊 Control speed: {control_increment}")
+        log(f"📊 End effector target: {np.round(ik_solver.forward(current_targets), 3)}")
         
     elif cmd.startswith('speed '):
         try:
             new_speed = float(cmd.split()[1])
             control_increment = max(0.001, min(0.2, new_speed))
-            print(f"⚡ Speed set to: {control_increment}")
+            log(f"⚡ Speed set to: {control_increment}")
         except:
-            print("❌ Invalid speed. Use: speed 0.05")
+            log("❌ Invalid speed. Use: speed 0.05")
+            
+    elif len(cmd) == 3 and cmd[0] == 'c' and cmd[1] in 'xyz' and cmd[2] in ['+', '-']:
+        target = ik_solver.forward(current_targets)
+        target['xyz'.index(cmd[1])] += cartesian_increment if cmd[2] == '+' else -cartesian_increment
+        update_cartesian_target(target)
+        
+    elif cmd.startswith('goto '):
+        try:
+            position = [float(value) for value in cmd.split()[1:]]
+            if len(position) != 3:
+                raise ValueError(cmd)
+            update_cartesian_target(position)
+        except ValueError:
+            log("❌ Invalid position. Use: goto 0.0 -0.25 0.15")
             
     elif len(cmd) == 2 and cmd[1] in ['+', '-']:
         # Joint control commands
         joint_char = cmd[0]
         direction = 1 if cmd[1] == '+' else -1
         
-        joint_map = {'q': 0, 'w': 1, 'e': 2, 'r': 3, 't': 4, 'y': 5}
-        if joint_char in joint_map:
-            update_joint_target(joint_map[joint_char], direction)
+        if joint_char in JOINT_KEYS:
+            update_joint_target(JOINT_KEYS[joint_char], direction)
         else:
-            print("❌ Unknown joint. Use: q, w, e, r, t, y")
+            log("❌ Unknown joint. Use: q, w, e, r, t, y")
             
     elif cmd == '':
         pass  # Empty command, do nothing
         
     else:
-        print("❌ Unknown command. Type 'help' for available commands.")
+        log("❌ Unknown command. Type 'help' for available commands.")
     
     return True
 
-def threaded_input_control():
+def threaded_input_control(scheduler_kwargs):
     """Method 1: Threaded input control - Real user input with continuous simulation"""
     print("\n=== Threaded Input Control ===")
     print("This runs the simulation continuously while accepting your commands.")
@@ -177,6 +210,7 @@ def threaded_input_control():
     input_thread_obj.start()
     
     with mujoco.viewer.launch_passive(model, data) as viewer:
+        scheduler = SimScheduler(model, data, viewer=viewer, **scheduler_kwargs)
         step = 0
         last_status_time = time.time()
         
@@ -191,10 +225,8 @@ def threaded_input_control():
             except queue.Empty:
                 pass
             
-            # Apply control and step simulation
-            apply_pd_control()
-            mujoco.mj_step(model, data)
-            viewer.sync()
+            # Apply control, step the physics and pace the tick
+            scheduler.tick(lambda: apply_pd_control(data, current_targets))
             
             # Occasional status update
             if time.time() - last_status_time > 10.0:
@@ -202,11 +234,12 @@ def threaded_input_control():
                 last_status_time = time.time()
             
             step += 1
-            time.sleep(0.01)
+        
+        scheduler.report()
     
     simulation_running = False
 
-def pause_input_control():
+def pause_input_control(scheduler_kwargs):
     """Method 2: Pause-and-input control - Simulation pauses for each command"""
     print("\n=== Pause Input Control ===")
     print("Simulation pauses while you enter commands, then runs the action.")
@@ -216,6 +249,7 @@ def pause_input_control():
     current_targets = data.qpos[:model.nu].copy()
     
     with mujoco.viewer.launch_passive(model, data) as viewer:
+        scheduler = SimScheduler(model, data, viewer=viewer, **scheduler_kwargs)
         print("\n🚀 Simulation started!")
         print("Type 'help' for commands.")
         
@@ -232,15 +266,14 @@ def pause_input_control():
             
             # Run simulation for a bit to show the change
             print("⚙️  Applying command...")
-            for _ in range(200):  # Run for 2 seconds at 100Hz
+            scheduler.restart()
+            for _ in range(scheduler.ticks_for(2.0)):  # Run for 2 simulated seconds
                 if not viewer.is_running():
                     return
-                apply_pd_control()
-                mujoco.mj_step(model, data)
-                viewer.sync()
-                time.sleep(0.01)
+                scheduler.tick(lambda: apply_pd_control(data, current_targets))
+            scheduler.report()
 
-def continuous_control():
+def continuous_control(scheduler_kwargs):
     """Method 3: Continuous movement control"""
     print("\n=== Continuous Control ===")
     print("Enter a sequence of commands to execute continuously.")
@@ -278,6 +311,7 @@ def continuous_control():
     print(f"\n🚀 Executing sequence: {' '.join(commands)}")
     
     with mujoco.viewer.launch_passive(model, data) as viewer:
+        scheduler = SimScheduler(model, data, viewer=viewer, **scheduler_kwargs)
         for cmd in commands:
             if not viewer.is_running():
                 break
@@ -286,42 +320,98 @@ def continuous_control():
             process_command(cmd, None)
             
             # Run simulation for each command
-            for _ in range(300):  # 3 seconds per command
+            for _ in range(scheduler.ticks_for(3.0)):  # 3 simulated seconds per command
                 if not viewer.is_running():
                     return
-                apply_pd_control()
-                mujoco.mj_step(model, data)
-                viewer.sync()
-                time.sleep(0.01)
+                scheduler.tick(lambda: apply_pd_control(data, current_targets))
         
         print("\n✅ Sequence completed!")
+        scheduler.report()
         print("Simulation will continue running. Close viewer to exit.")
         
         # Keep running
         while viewer.is_running():
-            apply_pd_control()
-            mujoco.mj_step(model, data)
-            viewer.sync()
-            time.sleep(0.01)
+            scheduler.tick(lambda: apply_pd_control(data, current_targets))
+
+def event_control(scheduler_kwargs, socket_port=None, script=None):
+    """Method 4: Event-driven control - stdin, a local socket and a script feed one queue applied at tick boundaries"""
+    print("\n=== Event Control ===")
+    print("The simulation never waits for input: commands are applied at the next control tick.")
+    if socket_port is not None:
+        print(f"📡 Also accepting commands on localhost:{socket_port} (e.g. echo 'q+' | nc localhost {socket_port})")
+    if script is not None:
+        print(f"📜 Playing commands from {script}")
+    
+    reset_simulation()
+    global current_targets, log
+    current_targets = data.qpos[:model.nu].copy()
+    
+    events = CommandQueue()
+    logger = AsyncLogger()
+    log = logger.log
+    stop = threading.Event()
+    start_sources(events, stop, stdin=True, port=socket_port, script=script)
+    
+    try:
+        with mujoco.viewer.launch_passive(model, data) as viewer:
+            scheduler = SimScheduler(model, data, viewer=viewer, **scheduler_kwargs)
+            print("\n🚀 Simulation started! Type 'help' for commands.")
+            while viewer.is_running() and simulation_running:
+                for source, cmd in events.drain():
+                    if source != "stdin":
+                        log(f"📨 [{source}] {cmd}")
+                    process_command(cmd, None)
+                scheduler.tick(lambda: apply_pd_control(data, current_targets))
+            scheduler.report()
+    finally:
+        stop.set()
+        logger.close()
+        log = print
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='MuJoCo Robot Control - Working Input Methods')
     parser.add_argument('--control', 
-                       choices=['threaded_input', 'pause_input', 'continuous'], 
-                       default='threaded_input', 
+                       choices=['event', 'threaded_input', 'pause_input', 'continuous'], 
+                       default='event', 
                        help='Control method to use')
+    parser.add_argument('--timestep', type=float, default=None,
+                       help='Physics timestep in seconds (default: the MJCF value)')
+    parser.add_argument('--control_hz', type=float, default=100.0,
+                       help='Control ticks per simulated second, each running several physics substeps')
+    parser.add_argument('--display_hz', type=float, default=60.0,
+                       help='Maximum viewer sync rate')
+    parser.add_argument('--pacing', choices=PACING_MODES, default='realtime',
+                       help='Run at real time, at a fixed real-time factor (--rtf) or as fast as possible')
+    parser.add_argument('--rtf', type=float, default=1.0,
+                       help='Real-time factor used with --pacing rtf')
+    parser.add_argument('--socket_port', type=int, default=None,
+                       help='Also accept newline-separated commands on this localhost TCP port (event control)')
+    parser.add_argument('--script', type=str, default=None,
+                       help="File of commands, one per line, with 'sleep SECONDS' lines (event control)")
+    parser.add_argument('--no_model_cache', action='store_true',
+                       help='Compile the XML instead of loading the cached MJB binary')
     
     args = parser.parse_args()
+    load_simulation(use_cache=not args.no_model_cache)
+    scheduler_kwargs = {
+        "control_hz": args.control_hz,
+        "timestep": args.timestep,
+        "display_hz": args.display_hz,
+        "pacing": args.pacing,
+        "rtf": args.rtf,
+    }
     
     print(f"🎮 Starting {args.control} control method...")
     
     try:
-        if args.control == 'threaded_input':
-            threaded_input_control()
+        if args.control == 'event':
+            event_control(scheduler_kwargs, args.socket_port, args.script)
+        elif args.control == 'threaded_input':
+            threaded_input_control(scheduler_kwargs)
         elif args.control == 'pause_input':
-            pause_input_control()
+            pause_input_control(scheduler_kwargs)
         elif args.control == 'continuous':
-            continuous_control()
+            continuous_control(scheduler_kwargs)
             
     except KeyboardInterrupt:
         print("\n🛑 Control interrupted by user")